@@ -1,10 +1,12 @@
 from fastapi import FastAPI, APIRouter, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
 from time import time
 from collections import defaultdict
 import os
@@ -12,16 +14,23 @@ import io
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 import uuid
 from datetime import datetime, timezone, timedelta
 import json
 import base64
 import asyncio
+import threading
+import queue
+from contextlib import contextmanager
 from enum import Enum
 import random
 import math
-from collections import Counter, defaultdict
+import bisect
+from collections import Counter, OrderedDict, defaultdict
+import hashlib
+import zipfile
+import tempfile
 import re
 from dateutil import parser as date_parser
 import statistics
@@ -195,6 +204,265 @@ def _excel_to_records(excel_path: Path) -> List[Dict[str, Any]]:
         out.append(doc)
     return out
 
+# ===================== IN-PROCESS CACHE =====================
+class _TTLCache:
+    """
+    Small thread-safe LRU cache with a per-entry TTL.
+    Used for hot, bounded lookups (e.g. reference face embeddings); not a shared/distributed cache.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if self.ttl_seconds > 0 and expires_at < time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._data), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+# ===================== LLM GATEWAY =====================
+class _LLMGateway:
+    """
+    Single entry point for LLM calls (Gemini OCR, chatbot).
+    - Bounded concurrency: at most `max_concurrency` upstream calls in flight; the rest queue
+    - Per-call timeout (queue wait + upstream call) -> 504 instead of piling up requests
+    - Coalescing: identical keyed requests (same prompt + image hash) share one upstream call
+    - Result cache for keyed requests (`_TTLCache`)
+    - Token streaming (`stream`) for the chatbot
+    Transport: if LLM_GATEWAY_URL is set, an OpenAI-compatible `/chat/completions` endpoint over a shared
+    httpx client (also how tests point it at a local fake server); otherwise `emergentintegrations`.
+    """
+
+    def __init__(self, max_concurrency: int, timeout_seconds: float, cache: _TTLCache):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout_seconds = float(timeout_seconds)
+        self.cache = cache
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, list] = {}  # key -> [upstream task, number of callers waiting on it]
+        self._http = None
+
+    @staticmethod
+    def request_key(provider: str, model: str, system_message: str, text: str, image_base64: Optional[str] = None) -> str:
+        h = hashlib.sha256()
+        for part in (provider, model, system_message, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        if image_base64:
+            h.update(hashlib.sha256(image_base64.encode("ascii")).digest())
+        return h.hexdigest()
+
+    @staticmethod
+    def is_configured() -> bool:
+        return bool(os.environ.get("LLM_GATEWAY_URL") or os.environ.get("EMERGENT_LLM_KEY"))
+
+    async def complete(
+        self,
+        provider: str,
+        model: str,
+        system_message: str,
+        text: str,
+        image_base64: Optional[str] = None,
+        cache: bool = True,
+    ) -> str:
+        """Send one prompt (optionally with an image) and return the response text."""
+        if not cache:
+            return await self._bounded_send(provider, model, system_message, text, image_base64)
+
+        key = self.request_key(provider, model, system_message, text, image_base64)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # The upstream call runs as its own task, not inside the first caller's request, so a caller
+        # that disconnects only stops waiting; it is cancelled once nobody is waiting for it any more.
+        entry = self._inflight.get(key)
+        if entry is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.get_running_loop().create_task(
+                self._fill(key, provider, model, system_message, text, image_base64)
+            )
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())  # retrieved even with no waiters left
+            entry = self._inflight[key] = [task, 0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+
+    async def _fill(self, key, provider, model, system_message, text, image_base64) -> str:
+        try:
+            result = await self._bounded_send(provider, model, system_message, text, image_base64)
+            self.cache.set(key, result)
+            return result
+        finally:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is asyncio.current_task():
+                del self._inflight[key]
+
+    async def _bounded_send(self, provider, model, system_message, text, image_base64) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _run():
+            async with self._semaphore:
+                self.upstream_calls += 1
+                if os.environ.get("LLM_GATEWAY_URL"):
+                    return await self._send_http(model, system_message, text, image_base64)
+                return await self._send_emergent(provider, model, system_message, text, image_base64)
+
+        try:
+            return await asyncio.wait_for(_run(), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"LLM request timed out after {self.timeout_seconds:g}s.")
+
+    async def stream(self, provider: str, model: str, system_message: str, text: str) -> AsyncIterator[str]:
+        """
+        Yield the response text incrementally as the upstream produces it (never cached or coalesced).
+        Holds a concurrency slot until the stream ends; waiting longer than the timeout for a slot -> 504.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail=f"LLM request timed out after {self.timeout_seconds:g}s.")
+        try:
+            self.upstream_calls += 1
+            if os.environ.get("LLM_GATEWAY_URL"):
+                async for chunk in self._stream_http(model, system_message, text):
+                    yield chunk
+            else:
+                # emergentintegrations has no token streaming: deliver the reply as a single chunk
+                yield await asyncio.wait_for(
+                    self._send_emergent(provider, model, system_message, text, None), timeout=self.timeout_seconds
+                )
+        finally:
+            self._semaphore.release()
+
+    def _client(self):
+        import httpx
+
+        if self._http is None:
+            api_key = os.environ.get("LLM_GATEWAY_API_KEY") or os.environ.get("EMERGENT_LLM_KEY", "")
+            self._http = httpx.AsyncClient(
+                base_url=os.environ["LLM_GATEWAY_URL"].rstrip("/"),
+                headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=self.max_concurrency),
+            )
+        return self._http
+
+    @staticmethod
+    def _chat_payload(model, system_message, text, image_base64=None) -> Dict[str, Any]:
+        content: Any = text
+        if image_base64:
+            content = [
+                {"type": "text", "text": text},
+                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}},
+            ]
+        return {
+            "model": model,
+            "messages": [{"role": "system", "content": system_message}, {"role": "user", "content": content}],
+        }
+
+    async def _send_http(self, model, system_message, text, image_base64) -> str:
+        resp = await self._client().post("/chat/completions", json=self._chat_payload(model, system_message, text, image_base64))
+        resp.raise_for_status()
+        return resp.json()["choices"][0]["message"]["content"]
+
+    async def _stream_http(self, model, system_message, text) -> AsyncIterator[str]:
+        payload = {**self._chat_payload(model, system_message, text), "stream": True}
+        async with self._client().stream("POST", "/chat/completions", json=payload) as resp:
+            resp.raise_for_status()
+            # OpenAI-style SSE: "data: {chunk}" lines, terminated by "data: [DONE]"
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = (json.loads(data).get("choices") or [{}])[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+    async def _send_emergent(self, provider, model, system_message, text, image_base64) -> str:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent  # type: ignore[import-not-found]
+
+        api_key = os.environ.get("EMERGENT_LLM_KEY", "")
+        if not api_key:
+            raise HTTPException(status_code=503, detail="LLM is not configured. Set EMERGENT_LLM_KEY or LLM_GATEWAY_URL.")
+        # One-shot prompt: the session id only needs to be unique per call
+        chat = LlmChat(api_key=api_key, session_id=f"gw_{uuid.uuid4()}", system_message=system_message)
+        chat.with_model(provider, model)
+        files = [ImageContent(image_base64=image_base64)] if image_base64 else None
+        message = UserMessage(text=text, file_contents=files) if files else UserMessage(text=text)
+        return await chat.send_message(message)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight_keys": len(self._inflight),
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "cache": self.cache.stats(),
+        }
+
+_llm_gateway = _LLMGateway(
+    max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "8")),
+    timeout_seconds=float(os.environ.get("LLM_TIMEOUT_SECONDS", "30")),
+    cache=_TTLCache(
+        max_entries=int(os.environ.get("LLM_CACHE_SIZE", "512")),
+        ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", "3600")),
+    ),
+)
+
 # ===================== OEM / MAKER HELPERS =====================
 # In this dataset, `maker` is a numeric code. We infer a human-readable OEM label from `maker_model`.
 _BRAND_RULES = [
@@ -268,7 +536,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     
     async def dispatch(self, request: Request, call_next):
         # Skip rate limiting if disabled or for health checks
-        if not self.enabled or request.url.path in ["/health", "/api/health"]:
+        if not self.enabled or request.url.path in ["/health", "/api/health", "/ready", "/api/ready"]:
             return await call_next(request)
         
         # Get client IP
@@ -367,6 +635,7 @@ async def health_check():
                 "error": mongo_error
             },
             "collections": collections_status if mongo_status == "connected" else {},
+            "models": _model_readiness(),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
     except Exception as e:
@@ -455,6 +724,8 @@ class TicketKPIs(BaseModel):
     by_status: Dict[str, int]
     sentiment_distribution: Dict[str, int]
     monthly_trend: List[Dict[str, Any]]
+    resolution_percentiles_days: Dict[str, float] = {}
+    backlog_age: Dict[str, int] = {}
 
 # Ticket Models
 class TicketCreate(BaseModel):
@@ -499,6 +770,7 @@ class TranscriptionResponse(BaseModel):
     language: str
     confidence: float
     duration: float
+    demo: bool = False  # True when no STT engine is available and a sample transcription is returned
 
 # OCR Models
 class OCRRequest(BaseModel):
@@ -578,6 +850,27 @@ class FacialVerificationResponse(BaseModel):
     verify_face_box: Optional[Dict[str, float]] = None
     detected_faces_ref: Optional[int] = None
     detected_faces_verify: Optional[int] = None
+    reference_cached: Optional[bool] = None
+
+# Face Gallery Models
+class FaceEnrollResponse(BaseModel):
+    citizen_id: str
+    enrolled: bool
+    gallery_size: int
+    face_box: Optional[Dict[str, float]] = None
+    detected_faces: Optional[int] = None
+
+class FaceIdentifyMatch(BaseModel):
+    citizen_id: str
+    similarity: float
+    is_match: bool
+
+class FaceIdentifyResponse(BaseModel):
+    matches: List[FaceIdentifyMatch]
+    gallery_size: int
+    threshold: float
+    face_box: Optional[Dict[str, float]] = None
+    search_ms: float
 
 # Vehicle Detection Models
 class VehicleDetectionResponse(BaseModel):
@@ -586,6 +879,35 @@ class VehicleDetectionResponse(BaseModel):
     bounding_box: Optional[Dict[str, int]] = None
     additional_info: Dict[str, Any]
 
+class VehicleBox(BaseModel):
+    vehicle_class: str
+    coco_class: str
+    confidence: float
+    bounding_box: Dict[str, int]
+
+class VehicleImageDetections(BaseModel):
+    filename: str
+    detections: List[VehicleBox] = []
+    vehicle_counts: Dict[str, int] = {}
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    error: Optional[str] = None
+
+class VehicleVideoDetectionResponse(BaseModel):
+    frames_processed: int
+    frames_detected: int
+    fps: Optional[float] = None
+    vehicle_counts: Dict[str, int]
+    frames: List[Dict[str, Any]] = []
+    elapsed_ms: float
+
+class VehicleBatchDetectionResponse(BaseModel):
+    results: List[VehicleImageDetections]
+    total_images: int
+    total_vehicles: int
+    batch_size: int
+    elapsed_ms: float
+
 # ===================== DATA LOADING =====================
 async def load_vahan_data():
     """Load Vahan Excel data into MongoDB"""
@@ -611,6 +933,67 @@ async def load_vahan_data():
     except Exception as e:
         logger.error(f"Error loading Vahan data: {e}")
 
+# Ticket sentiment lexicon (substring match on the lower-cased ticket text; each phrase counts once)
+_SENTIMENT_NEGATIVE = (
+    "problem", "issue", "error", "fail", "failed", "pending", "delay", "delayed",
+    "complaint", "not working", "unable", "bug", "stuck", "rejected",
+    "urgent", "emergency", "critical", "backlog", "slow",
+)
+_SENTIMENT_POSITIVE = ("resolved", "fixed", "success", "working", "completed", "done", "thanks", "thank you")
+_SENTIMENT_WEIGHTS = {**{w: -1 for w in _SENTIMENT_NEGATIVE}, **{w: 1 for w in _SENTIMENT_POSITIVE}}
+# One alternation, longest phrase first
+_SENTIMENT_RE = re.compile("|".join(re.escape(w) for w in sorted(_SENTIMENT_WEIGHTS, key=len, reverse=True)))
+# A matched phrase also contains every shorter lexicon phrase inside it ("failed" -> fail, "not working" -> working)
+_SENTIMENT_IMPLIED = {w: frozenset(o for o in _SENTIMENT_WEIGHTS if o in w) for w in _SENTIMENT_WEIGHTS}
+_SENTIMENT_TEXT_FIELDS = ("Subject", "Issue Category", "category", "description", "ModuleName", "Priority", "Status")
+
+def _sentiment_score(text: Any) -> float:
+    """Lexicon score in [-1, 1]: +1 per positive phrase present, -1 per negative, divided by 5."""
+    if not text:
+        return 0.0
+    t = str(text).lower()
+    found: set = set()
+    m = _SENTIMENT_RE.search(t)
+    while m:
+        found |= _SENTIMENT_IMPLIED[m.group()]
+        # Resume one past the match start so phrases overlapping it are still seen
+        m = _SENTIMENT_RE.search(t, m.start() + 1)
+    score = sum(_SENTIMENT_WEIGHTS[w] for w in found)
+    if score == 0:
+        return 0.0
+    return max(-1.0, min(1.0, score / 5.0))
+
+def _sentiment_bucket(score: float) -> str:
+    if score >= 0.2:
+        return "positive"
+    if score <= -0.2:
+        return "negative"
+    return "neutral"
+
+def _ticket_sentiment(row: Dict[str, Any]) -> Dict[str, Any]:
+    """`sentiment_score`/`sentiment` fields for a ticket document."""
+    text = " ".join(str(row[col]) for col in _SENTIMENT_TEXT_FIELDS if row.get(col))
+    s = float(_sentiment_score(text))
+    return {"sentiment_score": round(s, 2), "sentiment": _sentiment_bucket(s)}
+
+async def rescore_ticket_sentiment(batch_size: int = 1000) -> Dict[str, int]:
+    """Re-score every ticket, streaming the collection and writing only changed rows in batched bulk_writes."""
+    projection = {col: 1 for col in _SENTIMENT_TEXT_FIELDS}
+    projection.update({"sentiment": 1, "sentiment_score": 1})
+    scanned = updated = 0
+    ops: List[UpdateOne] = []
+    async for doc in db.tickets_data.find({}, projection).batch_size(batch_size):
+        scanned += 1
+        fields = _ticket_sentiment(doc)
+        if doc.get("sentiment") != fields["sentiment"] or doc.get("sentiment_score") != fields["sentiment_score"]:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        if len(ops) >= batch_size:
+            updated += (await db.tickets_data.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        updated += (await db.tickets_data.bulk_write(ops, ordered=False)).modified_count
+    return {"scanned": scanned, "updated": updated}
+
 async def load_tickets_data():
     """Load Tickets Excel data into MongoDB"""
     try:
@@ -629,51 +1012,17 @@ async def load_tickets_data():
         records = _excel_to_records(excel_path)
 
         # Add sentiment analysis (deterministic heuristic; avoids randomness)
-        def _simple_sentiment_score(text: str) -> float:
-            if not text:
-                return 0.0
-            t = str(text).lower()
-            negative = [
-                "problem", "issue", "error", "fail", "failed", "pending", "delay", "delayed",
-                "complaint", "not working", "unable", "bug", "stuck", "rejected",
-                "urgent", "emergency", "critical", "backlog", "slow",
-            ]
-            positive = ["resolved", "fixed", "success", "working", "completed", "done", "thanks", "thank you"]
-            score = 0
-            for w in negative:
-                if w in t:
-                    score -= 1
-            for w in positive:
-                if w in t:
-                    score += 1
-            # Normalize to [-1, 1]
-            if score == 0:
-                return 0.0
-            return max(-1.0, min(1.0, score / 5.0))
-
-        def _sentiment_bucket(score: float) -> str:
-            if score >= 0.2:
-                return "positive"
-            if score <= -0.2:
-                return "negative"
-            return "neutral"
-
-        def _ticket_text(row) -> str:
-            parts = []
-            for col in ("Subject", "Issue Category", "ModuleName", "Priority", "Status"):
-                if col in row and row[col]:
-                    parts.append(str(row[col]))
-            return " ".join(parts)
-
         for r in records:
-            s = float(_simple_sentiment_score(_ticket_text(r)))
-            r["sentiment_score"] = round(s, 2)
-            r["sentiment"] = _sentiment_bucket(s)
+            r.update(_ticket_sentiment(r))
+            r["search_tokens"] = _ticket_search_tokens(r.get("Subject"))
 
-        await db.tickets_data.delete_many({})
-        if records:
-            await db.tickets_data.insert_many(records)
-            logger.info(f"Loaded {len(records)} Tickets records")
+        async with _ticket_kpi_lock:
+            await db.tickets_data.delete_many({})
+            if records:
+                await db.tickets_data.insert_many(records)
+                logger.info(f"Loaded {len(records)} Tickets records")
+            await _rebuild_ticket_kpi_summary_locked()
+            await _rebuild_sentiment_rollup_locked()
     except Exception as e:
         logger.error(f"Error loading Tickets data: {e}")
 
@@ -2038,67 +2387,451 @@ async def get_registration_delay_stats(state_cd: Optional[str] = None, c_distric
         raise HTTPException(status_code=500, detail=str(e))
 
 # ===================== TICKETS ENDPOINTS =====================
+# The one open/closed classification used by every KPI counter (rebuild, `$inc` and the endpoint)
+_TICKET_CLOSED_STATUSES = ("Closed", "Resolved")
+_TICKET_RESOLUTION_CAP_DAYS = 365
+_TICKET_BACKLOG_BUCKETS = ((7, "0-7d"), (30, "8-30d"), (90, "31-90d"), (180, "91-180d"), (None, "180d+"))
+_TICKET_KPI_SUMMARY_ID = "tickets"
+
+# Serialises full rebuilds (KPI summary, sentiment rollup) with per-ticket `$inc`s, so a ticket
+# created mid-rebuild is counted exactly once
+_ticket_kpi_lock = asyncio.Lock()
+
+def _ticket_is_closed(status: Any) -> bool:
+    return status in _TICKET_CLOSED_STATUSES
+
+def _kpi_key(value: Any) -> str:
+    """Map-safe key for the KPI summary document (Mongo field names cannot contain '.' or start with '$')."""
+    return str(value).replace(".", "_").lstrip("$") or "unknown"
+
+def _iso_day(value: Any) -> Optional[str]:
+    return value[:10] if isinstance(value, str) and len(value) >= 10 else None
+
+def _ticket_kpi_pipeline() -> List[Dict[str, Any]]:
+    """Every ticket KPI counter in a single `$facet` pass over tickets_data."""
+    def _count_by(expr: Any, match: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        stages = [{"$match": match}] if match else []
+        return stages + [{"$group": {"_id": expr, "n": {"$sum": 1}}}]
+
+    def _ts(field: str) -> Dict[str, Any]:
+        # ISO strings; seconds precision is enough and ignores mixed tz/fraction suffixes
+        return {"$dateFromString": {"dateString": {"$substrCP": [f"${field}", 0, 19]}, "onError": None}}
+
+    has_created = {"Created": {"$type": "string"}}
+    return [{"$facet": {
+        "total": [{"$count": "n"}],
+        "by_status": _count_by("$Status"),
+        "by_priority": _count_by("$Priority"),
+        "sentiment": _count_by("$sentiment"),
+        "created_by_month": _count_by({"$substrCP": ["$Created", 0, 7]}, has_created),
+        "closed_by_month": _count_by({"$substrCP": ["$Closed", 0, 7]}, {"Closed": {"$type": "string"}}),
+        "open_by_day": _count_by(
+            {"$substrCP": ["$Created", 0, 10]},
+            {**has_created, "Status": {"$nin": list(_TICKET_CLOSED_STATUSES)}},
+        ),
+        "resolution_days": [
+            {"$match": {**has_created, "Closed": {"$type": "string"}}},
+            {"$project": {"ms": {"$subtract": [_ts("Closed"), _ts("Created")]}}},
+            {"$match": {"ms": {"$gte": 0}}},
+            {"$group": {
+                "_id": {"$min": [{"$floor": {"$divide": ["$ms", 86400000]}}, _TICKET_RESOLUTION_CAP_DAYS]},
+                "n": {"$sum": 1},
+                "ms": {"$sum": "$ms"},
+            }},
+        ],
+    }}]
+
+async def _rebuild_ticket_kpi_summary() -> Dict[str, Any]:
+    """Recompute the summary from tickets_data and swap it in with one upsert (no delete/empty window)."""
+    async with _ticket_kpi_lock:
+        return await _rebuild_ticket_kpi_summary_locked()
+
+async def _rebuild_ticket_kpi_summary_locked() -> Dict[str, Any]:
+    out = (await db.tickets_data.aggregate(_ticket_kpi_pipeline()).to_list(1))[0]
+
+    def _counts(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        return {_kpi_key(r["_id"]): r["n"] for r in rows if r["_id"] not in (None, "")}
+
+    resolution = [r for r in out["resolution_days"] if r["_id"] is not None]
+    summary = {
+        "total": out["total"][0]["n"] if out["total"] else 0,
+        "by_status": _counts(out["by_status"]),
+        "by_priority": _counts(out["by_priority"]),
+        "sentiment": _counts(out["sentiment"]),
+        "created_by_month": _counts(out["created_by_month"]),
+        "closed_by_month": _counts(out["closed_by_month"]),
+        "open_by_day": _counts(out["open_by_day"]),
+        "resolution_days": {str(int(r["_id"])): r["n"] for r in resolution},
+        "resolution_total_days": sum(r["ms"] for r in resolution) / 86400000.0,
+        "resolution_count": sum(r["n"] for r in resolution),
+        "rebuilt_at": datetime.now(timezone.utc).isoformat(),
+    }
+    await db.ticket_kpi_summary.replace_one({"_id": _TICKET_KPI_SUMMARY_ID}, summary, upsert=True)
+    return summary
+
+async def _record_ticket_created(ticket_doc: Dict[str, Any]) -> None:
+    """Keep the KPI summary current for a new ticket (a single `$inc`; no rescans)."""
+    inc = {
+        "total": 1,
+        f"by_status.{_kpi_key(ticket_doc['Status'])}": 1,
+        f"by_priority.{_kpi_key(ticket_doc['Priority'])}": 1,
+    }
+    if ticket_doc.get("sentiment"):
+        inc[f"sentiment.{_kpi_key(ticket_doc['sentiment'])}"] = 1
+    day = _iso_day(ticket_doc.get("Created"))
+    if day:
+        inc[f"created_by_month.{day[:7]}"] = 1
+        if not _ticket_is_closed(ticket_doc["Status"]):
+            inc[f"open_by_day.{day}"] = 1
+    # No summary yet: the next read rebuilds it from the collection, including this ticket
+    await db.ticket_kpi_summary.update_one({"_id": _TICKET_KPI_SUMMARY_ID}, {"$inc": inc})
+
+_SENTIMENT_BUCKETS = ("positive", "neutral", "negative")
+# Rollup dimensions: overall + optional per-field breakdowns
+_SENTIMENT_ROLLUP_FIELDS = ("ModuleName", "Project")
+
+def _sentiment_rollup_id(dimension: str, key: str, month: str) -> str:
+    return f"{dimension}|{key}|{month}"
+
+async def _rebuild_sentiment_rollup() -> int:
+    """
+    Recompute `ticket_sentiment_rollup` (per dimension/key/month: sentiment counts and score sums) in one
+    `$facet` pass. Held under `_ticket_kpi_lock` with ticket inserts, so a concurrent create is counted once.
+    """
+    async with _ticket_kpi_lock:
+        return await _rebuild_sentiment_rollup_locked()
+
+async def _rebuild_sentiment_rollup_locked() -> int:
+    def _group(key: Any) -> List[Dict[str, Any]]:
+        return [{"$group": {
+            "_id": {"m": {"$substrCP": [{"$ifNull": ["$Created", ""]}, 0, 7]}, "k": key, "s": "$sentiment"},
+            "n": {"$sum": 1},
+            "score": {"$sum": {"$ifNull": ["$sentiment_score", 0]}},
+        }}]
+
+    facets = {"all": _group(None)}
+    facets.update({field: _group(f"${field}") for field in _SENTIMENT_ROLLUP_FIELDS})
+    out = (await db.tickets_data.aggregate([{"$facet": facets}]).to_list(1))[0]
+
+    rollup: Dict[str, Dict[str, Any]] = {}
+    for dimension, rows in out.items():
+        for r in rows:
+            month = r["_id"].get("m") or "unknown"
+            key = "all" if dimension == "all" else str(r["_id"].get("k") or "unknown")
+            doc_id = _sentiment_rollup_id(dimension, key, month)
+            doc = rollup.setdefault(doc_id, {
+                "_id": doc_id, "dimension": dimension, "key": key, "month": month,
+                "count": 0, "score_sum": 0.0,
+                **{b: 0 for b in _SENTIMENT_BUCKETS},
+                **{f"{b}_score": 0.0 for b in _SENTIMENT_BUCKETS},
+            })
+            doc["count"] += r["n"]
+            doc["score_sum"] += float(r["score"] or 0)
+            if r["_id"].get("s") in _SENTIMENT_BUCKETS:
+                doc[r["_id"]["s"]] += r["n"]
+                doc[f"{r['_id']['s']}_score"] += float(r["score"] or 0)
+
+    # Replace in place, then drop rows that no longer exist: readers never see an empty rollup
+    if rollup:
+        await db.ticket_sentiment_rollup.bulk_write(
+            [ReplaceOne({"_id": doc_id}, doc, upsert=True) for doc_id, doc in rollup.items()], ordered=False
+        )
+    await db.ticket_sentiment_rollup.delete_many({"_id": {"$nin": list(rollup)}})
+    return len(rollup)
+
+async def _record_ticket_sentiment(ticket_doc: Dict[str, Any]) -> None:
+    """
+    Fold a new ticket into the sentiment rollup (one upsert per dimension, single round trip).
+    Call under `_ticket_kpi_lock`, together with the ticket insert.
+    """
+    day = _iso_day(ticket_doc.get("Created"))
+    month = day[:7] if day else "unknown"
+    score = float(ticket_doc.get("sentiment_score") or 0)
+    inc: Dict[str, Any] = {"count": 1, "score_sum": score}
+    if ticket_doc.get("sentiment") in _SENTIMENT_BUCKETS:
+        inc[ticket_doc["sentiment"]] = 1
+        inc[f"{ticket_doc['sentiment']}_score"] = score
+    keys = [("all", "all")] + [(f, str(ticket_doc.get(f) or "unknown")) for f in _SENTIMENT_ROLLUP_FIELDS]
+    ops = [
+        UpdateOne(
+            {"_id": _sentiment_rollup_id(dimension, key, month)},
+            {"$inc": inc, "$setOnInsert": {"dimension": dimension, "key": key, "month": month}},
+            upsert=True,
+        )
+        for dimension, key in keys
+    ]
+    await db.ticket_sentiment_rollup.bulk_write(ops, ordered=False)
+
+def _sentiment_trend(docs: List[Dict[str, Any]], months: int) -> List[Dict[str, Any]]:
+    dated = sorted((d for d in docs if d["month"] != "unknown"), key=lambda d: d["month"])[-months:]
+    return [
+        {
+            "date": d["month"],
+            **{b: d.get(b, 0) for b in _SENTIMENT_BUCKETS},
+            "count": d["count"],
+            "avg_score": round(d["score_sum"] / d["count"], 2) if d["count"] else 0.0,
+        }
+        for d in dated
+    ]
+
+def _histogram_percentile(hist: Dict[str, int], total: int, q: float) -> float:
+    if total <= 0:
+        return 0.0
+    target = q * total
+    seen = 0
+    for day, n in sorted(((int(k), v) for k, v in hist.items())):
+        seen += n
+        if seen >= target:
+            return float(day)
+    return float(_TICKET_RESOLUTION_CAP_DAYS)
+
+def _backlog_age_buckets(open_by_day: Dict[str, int], today: Optional[datetime] = None) -> Dict[str, int]:
+    today_date = (today or datetime.now(timezone.utc)).date()
+    buckets = {label: 0 for _limit, label in _TICKET_BACKLOG_BUCKETS}
+    for day, n in open_by_day.items():
+        try:
+            age = (today_date - datetime.strptime(day, "%Y-%m-%d").date()).days
+        except ValueError:
+            continue
+        for limit, label in _TICKET_BACKLOG_BUCKETS:
+            if limit is None or age <= limit:
+                buckets[label] += n
+                break
+    return buckets
+
 @tickets_router.get("/kpis", response_model=TicketKPIs)
-async def get_ticket_kpis():
-    """Get ticket dashboard KPIs"""
+async def get_ticket_kpis(months: int = 12):
+    """Get ticket dashboard KPIs (served from the incrementally maintained summary document)"""
     try:
-        total = await db.tickets_data.count_documents({})
-        
-        # Status counts
-        status_pipeline = [{"$group": {"_id": "$Status", "count": {"$sum": 1}}}]
-        status_result = await db.tickets_data.aggregate(status_pipeline).to_list(10)
-        by_status = {r["_id"]: r["count"] for r in status_result if r["_id"]}
-        
-        open_count = by_status.get("New", 0) + by_status.get("In Progress", 0)
-        closed_count = by_status.get("Closed", 0)
-        
-        # Priority counts
-        priority_pipeline = [{"$group": {"_id": "$Priority", "count": {"$sum": 1}}}]
-        priority_result = await db.tickets_data.aggregate(priority_pipeline).to_list(10)
-        by_priority = {r["_id"]: r["count"] for r in priority_result if r["_id"]}
-        
-        # Sentiment distribution
-        sentiment_pipeline = [{"$group": {"_id": "$sentiment", "count": {"$sum": 1}}}]
-        sentiment_result = await db.tickets_data.aggregate(sentiment_pipeline).to_list(10)
-        sentiment_dist = {r["_id"]: r["count"] for r in sentiment_result if r["_id"]}
-        
-        # Monthly trend (mock)
-        months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
-        monthly_trend = [{"month": m, "created": random.randint(30, 80), "closed": random.randint(20, 70)} for m in months]
-        
+        summary = await db.ticket_kpi_summary.find_one({"_id": _TICKET_KPI_SUMMARY_ID})
+        if summary is None:
+            summary = await _rebuild_ticket_kpi_summary()
+
+        total = summary.get("total", 0)
+        by_status = summary.get("by_status", {})
+        by_priority = summary.get("by_priority", {})
+        closed_count = sum(n for st, n in by_status.items() if _ticket_is_closed(st))
+        open_count = sum(n for st, n in by_status.items() if not _ticket_is_closed(st))
+
+        created = summary.get("created_by_month", {})
+        closed = summary.get("closed_by_month", {})
+        month_keys = sorted(set(created) | set(closed))[-max(1, int(months)):]
+        monthly_trend = [{"month": m, "created": created.get(m, 0), "closed": closed.get(m, 0)} for m in month_keys]
+
+        resolved = summary.get("resolution_count", 0)
+        hist = summary.get("resolution_days", {})
         closure_rate = (closed_count / total * 100) if total > 0 else 0
-        
+
         return TicketKPIs(
             total_tickets=total,
             open_tickets=open_count,
             closed_tickets=closed_count,
             closure_rate=round(closure_rate, 2),
-            avg_resolution_days=round(random.uniform(3, 10), 1),
+            avg_resolution_days=round(summary.get("resolution_total_days", 0.0) / resolved, 1) if resolved else 0.0,
             by_priority=by_priority,
             by_status=by_status,
-            sentiment_distribution=sentiment_dist,
-            monthly_trend=monthly_trend
+            sentiment_distribution=summary.get("sentiment", {}),
+            monthly_trend=monthly_trend,
+            resolution_percentiles_days={
+                f"p{int(q * 100)}": _histogram_percentile(hist, resolved, q) for q in (0.5, 0.9, 0.95)
+            },
+            backlog_age=_backlog_age_buckets(summary.get("open_by_day", {})),
         )
     except Exception as e:
         logger.error(f"Error getting ticket KPIs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+_TICKET_LIST_SORT = [("Created", -1), ("_id", -1)]
+_TICKET_TEXT_FIELDS = ("Subject", "Issue Category", "ModuleName", "Project")
+_TICKET_FACET_FIELDS = ("Status", "Priority", "ModuleName", "sentiment")
+# Identifiers embedded in subjects: vehicle/application/TR numbers, user ids (any token with a digit)
+_TICKET_ID_TOKEN_RE = re.compile(r"[A-Z0-9]*\d[A-Z0-9]*")
+# Vehicle numbers written with separators, e.g. "AP 16 BZ 3423" / "AP-16-BZ-3423"
+_TICKET_SPACED_REGN_RE = re.compile(r"\b[A-Z]{2}[\s-]?\d{1,2}[\s-]?[A-Z]{0,3}[\s-]?\d{3,4}\b")
+
+def _ticket_search_tokens(subject: Any) -> List[str]:
+    """Upper-cased identifier tokens of a subject, stored on the ticket for indexed prefix search."""
+    if not subject or not isinstance(subject, str):
+        return []
+    text = subject.upper()
+    tokens = {t for t in _TICKET_ID_TOKEN_RE.findall(text) if len(t) >= 3}
+    tokens.update(re.sub(r"[\s-]", "", m) for m in _TICKET_SPACED_REGN_RE.findall(text))
+    return sorted(tokens)
+_ticket_count_cache = _TTLCache(
+    max_entries=256,
+    ttl_seconds=float(os.environ.get("TICKETS_COUNT_CACHE_TTL_SECONDS", "30")),
+)
+
+async def _ensure_ticket_indexes() -> None:
+    """Indexes backing `/tickets/list` keyset pagination (newest first, optional Status/Priority filter)."""
+    await db.tickets_data.create_index(_TICKET_LIST_SORT, name="created_id_desc")
+    await db.tickets_data.create_index([("Status", 1)] + _TICKET_LIST_SORT, name="status_created_id_desc")
+    await db.tickets_data.create_index([("Priority", 1)] + _TICKET_LIST_SORT, name="priority_created_id_desc")
+    # Search: word index over the descriptive fields + multikey index for identifier prefixes
+    await db.tickets_data.create_index(
+        [(f, "text") for f in _TICKET_TEXT_FIELDS], name="tickets_text", default_language="none"
+    )
+    await db.tickets_data.create_index("search_tokens", name="search_tokens")
+    await db.ticket_sentiment_rollup.create_index([("dimension", 1), ("month", 1)], name="dimension_month")
+    # Backfill tokens for tickets stored before search existed
+    ops = []
+    async for doc in db.tickets_data.find({"search_tokens": {"$exists": False}}, {"_id": 1, "Subject": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_tokens": _ticket_search_tokens(doc.get("Subject"))}}))
+        if len(ops) >= 1000:
+            await db.tickets_data.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await db.tickets_data.bulk_write(ops, ordered=False)
+
+def _encode_ticket_cursor(doc: Dict[str, Any]) -> str:
+    payload = json.dumps({"c": doc.get("Created"), "i": str(doc["_id"])}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _ticket_cursor_query(cursor: str) -> Dict[str, Any]:
+    """Mongo filter for the rows strictly after `cursor` in (Created desc, _id desc) order."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created, oid = payload["c"], ObjectId(payload["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if created is None:
+        # Already in the trailing block of tickets without a Created timestamp (sorted last)
+        return {"Created": None, "_id": {"$lt": oid}}
+    return {"$or": [
+        {"Created": {"$lt": created}},
+        {"Created": created, "_id": {"$lt": oid}},
+        {"Created": None},
+    ]}
+
+async def _ticket_total(query: Dict[str, Any]) -> int:
+    """Unfiltered totals come from collection metadata; filtered counts are cached briefly."""
+    if not query:
+        return await db.tickets_data.estimated_document_count()
+    key = json.dumps(query, sort_keys=True)
+    total = _ticket_count_cache.get(key)
+    if total is None:
+        total = await db.tickets_data.count_documents(query)
+        _ticket_count_cache.set(key, total)
+    return total
+
 @tickets_router.get("/list")
-async def get_tickets(skip: int = 0, limit: int = 50, status: Optional[str] = None, priority: Optional[str] = None):
-    """Get list of tickets with pagination"""
-    query = {}
+async def get_tickets(
+    skip: int = 0,
+    limit: int = 50,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+):
+    """
+    Get list of tickets, newest first.
+    Pass `next_cursor` from the previous page as `cursor` for constant-time paging (keyset on the
+    indexed (Created, _id) sort; unaffected by tickets created meanwhile). `skip` still works for
+    shallow pages. `total` is estimated/cached; set `include_total=false` to skip it.
+    """
+    limit = max(1, min(int(limit), 500))
+    query: Dict[str, Any] = {}
     if status:
         query["Status"] = status
     if priority:
         query["Priority"] = priority
-    
-    tickets = await db.tickets_data.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    total = await db.tickets_data.count_documents(query)
-    
+
+    page_query = dict(query)
+    if cursor:
+        page_query.update(_ticket_cursor_query(cursor))
+    find = db.tickets_data.find(page_query, {"search_tokens": 0}).sort(_TICKET_LIST_SORT)
+    if skip and not cursor:
+        find = find.skip(skip)
+    tickets = await find.limit(limit).to_list(limit)
+
+    next_cursor = _encode_ticket_cursor(tickets[-1]) if len(tickets) == limit else None
+    for t in tickets:
+        t.pop("_id", None)
+    total = await _ticket_total(query) if include_total else None
+
     # Clean NaN values from tickets
     cleaned_tickets = clean_nan_values(tickets)
     
-    return {"tickets": cleaned_tickets, "total": total, "skip": skip, "limit": limit}
+    return {"tickets": cleaned_tickets, "total": total, "skip": skip, "limit": limit, "next_cursor": next_cursor}
+
+def _ticket_search_match(q: str) -> Dict[str, Any]:
+    """
+    Split a query into identifier prefixes (terms containing a digit, e.g. `AP16BZ`) matched against
+    `search_tokens`, and words/phrases handed to the `$text` index. Vehicle numbers written with
+    separators ("AP 16 BZ 3423") are joined first, exactly as `_ticket_search_tokens` stores them.
+    """
+    words: List[str] = []
+    clauses: List[Dict[str, Any]] = []
+    text = q.upper()
+    for m in _TICKET_SPACED_REGN_RE.findall(text):
+        ident = re.sub(r"[\s-]", "", m)
+        clauses.append({"search_tokens": {"$regex": f"^{ident}"}})
+    for term in _TICKET_SPACED_REGN_RE.sub(" ", text).split():
+        ident = re.sub(r"[^A-Z0-9]", "", term.upper())
+        if ident and any(ch.isdigit() for ch in ident):
+            clauses.append({"search_tokens": {"$regex": f"^{ident}"}})
+        else:
+            words.append(term)
+    match: Dict[str, Any] = {}
+    if words:
+        match["$text"] = {"$search": " ".join(words)}
+    if clauses:
+        match["$and"] = clauses
+    return match
+
+@tickets_router.get("/search")
+async def search_tickets(
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    module: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+):
+    """
+    Search tickets by words (text index over Subject/Issue Category/ModuleName/Project) and/or
+    identifier prefixes such as vehicle numbers (`AP16BZ3423`, `AP16`). Returns the page plus
+    Status/Priority/ModuleName/sentiment facet counts for the whole match, computed in one `$facet`.
+    """
+    try:
+        limit = max(1, min(int(limit), 200))
+        skip = max(0, int(skip))
+        match = _ticket_search_match(q) if q and q.strip() else {}
+        for field, value in (("Status", status), ("Priority", priority), ("ModuleName", module), ("sentiment", sentiment)):
+            if value:
+                match[field] = value
+
+        pipeline: List[Dict[str, Any]] = [{"$match": match}]
+        if "$text" in match:
+            pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+            order = {"score": -1, "Created": -1, "_id": -1}
+        else:
+            order = dict(_TICKET_LIST_SORT)
+        facets: Dict[str, Any] = {
+            "results": [{"$sort": order}, {"$skip": skip}, {"$limit": limit}, {"$project": {"_id": 0, "search_tokens": 0}}],
+            "total": [{"$count": "count"}],
+        }
+        for field in _TICKET_FACET_FIELDS:
+            facets[field] = [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1}}]
+        pipeline.append({"$facet": facets})
+
+        out = (await db.tickets_data.aggregate(pipeline).to_list(1))[0]
+        return {
+            "tickets": clean_nan_values(out["results"]),
+            "total": out["total"][0]["count"] if out["total"] else 0,
+            "skip": skip,
+            "limit": limit,
+            "facets": {
+                field: {str(r["_id"]): r["count"] for r in out[field] if r["_id"] is not None}
+                for field in _TICKET_FACET_FIELDS
+            },
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching tickets: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @tickets_router.post("/create")
 async def create_ticket(ticket: TicketCreate):
@@ -2112,134 +2845,844 @@ async def create_ticket(ticket: TicketCreate):
         "Priority": ticket.priority.value,
         "category": ticket.category,
         "ModuleName": ticket.module_name,
-        "sentiment": random.choice(["positive", "neutral", "negative"]),
         "Created": datetime.now(timezone.utc).isoformat(),
-        "Updated": datetime.now(timezone.utc).isoformat()
+        "Updated": datetime.now(timezone.utc).isoformat(),
+        "search_tokens": _ticket_search_tokens(ticket.subject),
     }
-    await db.tickets_data.insert_one(ticket_doc)
+    ticket_doc.update(_ticket_sentiment(ticket_doc))
+    async with _ticket_kpi_lock:
+        await db.tickets_data.insert_one(ticket_doc)
+        await _record_ticket_created(ticket_doc)
+        await _record_ticket_sentiment(ticket_doc)
+    _ticket_count_cache.clear()
+    for token in ticket_doc["search_tokens"]:
+        _chatbot_tool_cache.pop(("ticket_vehicle", token))
     return {"id": ticket_doc["id"], "message": "Ticket created successfully"}
 
+@tickets_router.post("/sentiment/rescore")
+async def rescore_tickets_sentiment(batch_size: int = 1000):
+    """Re-apply the sentiment lexicon to all stored tickets (e.g. after the lexicon changes)"""
+    try:
+        result = await rescore_ticket_sentiment(max(1, min(int(batch_size), 10000)))
+        if result["updated"]:
+            await _rebuild_ticket_kpi_summary()
+            await _rebuild_sentiment_rollup()
+        return result
+    except Exception as e:
+        logger.error(f"Error rescoring ticket sentiment: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @tickets_router.get("/sentiment-analysis")
-async def get_sentiment_analysis():
-    """Get overall sentiment analysis"""
-    pipeline = [
-        {"$group": {"_id": "$sentiment", "count": {"$sum": 1}, "avg_score": {"$avg": "$sentiment_score"}}}
-    ]
-    result = await db.tickets_data.aggregate(pipeline).to_list(10)
-    
-    # Trend data (mock)
-    trend_data = [
-        {"date": "2023-01", "positive": 45, "neutral": 35, "negative": 20},
-        {"date": "2023-02", "positive": 48, "neutral": 32, "negative": 20},
-        {"date": "2023-03", "positive": 42, "neutral": 38, "negative": 20},
-        {"date": "2023-04", "positive": 50, "neutral": 30, "negative": 20},
-        {"date": "2023-05", "positive": 55, "neutral": 28, "negative": 17},
-        {"date": "2023-06", "positive": 52, "neutral": 33, "negative": 15}
-    ]
-    
-    return {
-        "distribution": {r["_id"]: {"count": r["count"], "avg_score": round(r["avg_score"] or 0, 2)} for r in result if r["_id"]},
-        "trend": trend_data,
-        "overall_sentiment": "neutral",
-        "sentiment_score": round(random.uniform(-0.2, 0.3), 2)
-    }
+async def get_sentiment_analysis(breakdown: Optional[str] = None, months: int = 12):
+    """
+    Get overall sentiment analysis: distribution, monthly trend and overall score, served from the
+    `ticket_sentiment_rollup` collection. `breakdown=ModuleName|Project` adds per-value trends.
+    """
+    if breakdown and breakdown not in _SENTIMENT_ROLLUP_FIELDS:
+        raise HTTPException(status_code=400, detail=f"breakdown must be one of: {', '.join(_SENTIMENT_ROLLUP_FIELDS)}")
+    try:
+        months = max(1, min(int(months), 120))
+        overall = await db.ticket_sentiment_rollup.find({"dimension": "all"}).to_list(None)
+
+        total = sum(d["count"] for d in overall)
+        score_sum = sum(d["score_sum"] for d in overall)
+        distribution = {}
+        for b in _SENTIMENT_BUCKETS:
+            count = sum(d.get(b, 0) for d in overall)
+            if count:
+                bucket_score = sum(d.get(f"{b}_score", 0.0) for d in overall)
+                distribution[b] = {"count": count, "avg_score": round(bucket_score / count, 2)}
+        overall_score = score_sum / total if total else 0.0
+
+        response: Dict[str, Any] = {
+            "distribution": distribution,
+            "trend": _sentiment_trend(overall, months),
+            "overall_sentiment": _sentiment_bucket(overall_score),
+            "sentiment_score": round(overall_score, 2),
+        }
+        if breakdown:
+            docs = await db.ticket_sentiment_rollup.find({"dimension": breakdown}).to_list(None)
+            by_key: Dict[str, List[Dict[str, Any]]] = {}
+            for d in docs:
+                by_key.setdefault(d["key"], []).append(d)
+            response["breakdown"] = {key: _sentiment_trend(rows, months) for key, rows in sorted(by_key.items())}
+        return response
+    except Exception as e:
+        logger.error(f"Error getting sentiment analysis: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ===================== CHAT SESSION STORE =====================
+class _MemoryChatSessionStore:
+    """
+    Per-process session history: LRU over sessions, each expiring `ttl_seconds` after its last message,
+    history capped at `max_messages`. Not shared between workers; lost on restart.
+    """
+
+    def __init__(self, max_sessions: int, max_messages: int, ttl_seconds: float):
+        self.max_sessions = max(1, int(max_sessions))
+        self.max_messages = max(1, int(max_messages))
+        self.ttl_seconds = float(ttl_seconds)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def ensure_indexes(self) -> None:
+        return None
+
+    def _live(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        item = self._sessions.get(session_id)
+        if item is None:
+            return None
+        expires_at, messages = item
+        if expires_at < time():
+            self._sessions.pop(session_id, None)
+            return None
+        return messages
+
+    async def append(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            history = (self._live(session_id) or []) + list(messages)
+            self._sessions[session_id] = (time() + self.ttl_seconds, history[-self.max_messages:])
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    async def history(self, session_id: str, skip: int = 0, limit: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+        with self._lock:
+            messages = self._live(session_id) or []
+            return [dict(m) for m in messages[skip:skip + limit]], len(messages)
+
+class _MongoChatSessionStore:
+    """
+    One `chat_sessions` document per session: messages capped via `$push`/`$slice`, expired by a TTL
+    index on `updated_at`; past `max_sessions`, creating a session evicts the least recently updated ones.
+    Shared by all workers and survives restarts.
+    """
+
+    def __init__(self, max_sessions: int, max_messages: int, ttl_seconds: float, collection: str = "chat_sessions"):
+        self.max_sessions = max(1, int(max_sessions))
+        self.max_messages = max(1, int(max_messages))
+        self.ttl_seconds = float(ttl_seconds)
+        self.collection = collection
+
+    async def ensure_indexes(self) -> None:
+        await db[self.collection].create_index(
+            "updated_at", name="updated_at_ttl", expireAfterSeconds=int(self.ttl_seconds)
+        )
+
+    async def append(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        result = await db[self.collection].update_one(
+            {"_id": session_id},
+            {
+                "$push": {"messages": {"$each": list(messages), "$slice": -self.max_messages}},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            },
+            upsert=True,
+        )
+        if result.upserted_id is not None:
+            await self._evict_oldest()
+
+    async def _evict_oldest(self) -> None:
+        # Only new sessions can push the count over the cap; the TTL index on updated_at serves the sort
+        excess = await db[self.collection].estimated_document_count() - self.max_sessions
+        if excess > 0:
+            oldest = await db[self.collection].find({}, {"_id": 1}).sort("updated_at", 1).limit(excess).to_list(excess)
+            await db[self.collection].delete_many({"_id": {"$in": [d["_id"] for d in oldest]}})
+
+    async def history(self, session_id: str, skip: int = 0, limit: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+        rows = await db[self.collection].aggregate([
+            {"$match": {"_id": session_id}},
+            {"$project": {"_id": 0, "total": {"$size": "$messages"}, "messages": {"$slice": ["$messages", skip, limit]}}},
+        ]).to_list(1)
+        if not rows:
+            return [], 0
+        return rows[0]["messages"], rows[0]["total"]
+
+_CHAT_SESSION_STORES = {
+    "memory": _MemoryChatSessionStore,
+    "mongo": _MongoChatSessionStore,
+}
+
+def _create_chat_session_store():
+    """Chat history backend from `CHAT_SESSION_STORE` (`mongo` | `memory`)."""
+    name = os.environ.get("CHAT_SESSION_STORE", "mongo").strip().lower()
+    store_cls = _CHAT_SESSION_STORES.get(name)
+    if store_cls is None:
+        logger.warning(f"Unknown CHAT_SESSION_STORE '{name}', using memory")
+        store_cls = _MemoryChatSessionStore
+    return store_cls(
+        max_sessions=int(os.environ.get("CHAT_SESSION_MAX_SESSIONS", "10000")),
+        max_messages=int(os.environ.get("CHAT_SESSION_MAX_MESSAGES", "100")),
+        ttl_seconds=float(os.environ.get("CHAT_SESSION_TTL_SECONDS", "86400")),
+    )
+
+_chat_sessions = _create_chat_session_store()
 
 # ===================== CHATBOT ENDPOINTS =====================
-chat_sessions: Dict[str, List[Dict]] = {}
+# Keyword-matched answers when the LLM is unavailable
+_CHATBOT_FALLBACK_RESPONSES = {
+    "license": "To check your Driving License status, please provide your DL number. You can also visit the official Parivahan portal at parivahan.gov.in for online DL services including:\n• DL Application Status\n• DL Renewal\n• Duplicate DL\n• International Driving Permit",
+    "rc": "For RC (Registration Certificate) queries, please provide your vehicle registration number. Services available:\n• RC Status Check\n• RC Transfer\n• Duplicate RC\n• Address Change in RC\n\nVisit parivahan.gov.in or your nearest RTO.",
+    "challan": "To pay traffic challans online:\n1. Visit echallan.parivahan.gov.in\n2. Enter your vehicle number or challan number\n3. View pending challans\n4. Make payment using UPI/Card/Net Banking\n\nNeed help with a specific challan?",
+    "grievance": "I can help you register a grievance. To file a complaint:\n1. Describe your issue in detail\n2. Provide relevant documents (vehicle number, DL number, etc.)\n3. We will create a ticket and track it\n\nWhat issue would you like to report?",
+    "status": "To check application status, please provide:\n• Application Number, OR\n• Vehicle Registration Number, OR\n• DL Number\n\nI can help you track pending applications.",
+    "rto": "To find your nearest RTO:\n1. Visit parivahan.gov.in\n2. Go to RTO locator\n3. Enter your district\n\nRTO offices typically operate Mon-Sat, 10 AM to 5 PM.",
+    "default": "Hello! I'm your Citizen Assistance Bot for Transport Services. I can help you with:\n\n• Driving License (DL) queries\n• Vehicle Registration (RC)\n• Traffic Challan payments\n• Grievance registration\n• Application status tracking\n• RTO locations\n\nHow can I assist you today?"
+}
+
+_CHATBOT_SYSTEM_MESSAGE = """You are a helpful Citizen Assistance Chatbot for the Transport Department.
+You help citizens with:
+- Driving License status and applications
+- Vehicle Registration (RC) queries
+- Traffic challan payments
+- Grievance registration and tracking
+- Policy and scheme explanations
+
+Be polite, concise, and helpful. If you don't know something, suggest visiting the nearest RTO office or parivahan.gov.in"""
+
+# Intent router: keyword tokens -> intent, in priority order (first listed wins when several match)
+_CHATBOT_INTENT_KEYWORDS = (
+    ("ticket_status", ("ticket", "tickets")),
+    ("driving_license", ("license", "licence", "licenses", "dl", "driving", "learner", "llr")),
+    ("vehicle_registration", ("rc", "registration", "vehicle", "vehicles", "regn")),
+    ("challan", ("challan", "challans", "echallan", "fine", "fines", "penalty")),
+    ("grievance", ("grievance", "complaint", "complain", "issue", "problem")),
+    ("application_status", ("status", "track", "tracking", "pending")),
+    ("rto_locator", ("rto", "office", "location", "nearest", "locator")),
+)
+_CHATBOT_KEYWORD_INTENT = {kw: intent for intent, kws in _CHATBOT_INTENT_KEYWORDS for kw in kws}
+_CHATBOT_INTENT_PRIORITY = {intent: i for i, (intent, _kws) in enumerate(_CHATBOT_INTENT_KEYWORDS)}
+_CHATBOT_INTENT_FALLBACK = {
+    "driving_license": "license",
+    "vehicle_registration": "rc",
+    "challan": "challan",
+    "grievance": "grievance",
+    "application_status": "status",
+    "rto_locator": "rto",
+    "ticket_status": "status",
+    "general_query": "default",
+}
+_CHAT_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# DL: state + RTO code + issue year + 7-digit serial, e.g. MH14 20110062821
+_DL_NO_RE = re.compile(r"\b([A-Z]{2})[\s-]?(\d{2})[\s-]?((?:19|20)\d{2})[\s-]?(\d{7})\b")
+# Registration: state + RTO + series + number (DL3CAB1234, AP 16 BZ 3423) or Bharat series (22BH1234AB)
+_REGN_NO_RE = re.compile(
+    r"\b(?:([A-Z]{2})[\s-]?(\d{1,2})[\s-]?([A-Z]{0,3})[\s-]?(\d{4})|(\d{2})[\s-]?(BH)[\s-]?(\d{4})[\s-]?([A-Z]{1,2}))\b"
+)
+
+# Ticket ids issued by /tickets/create
+_TICKET_ID_RE = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE)
+
+def _extract_chat_entities(message: str) -> Dict[str, List[str]]:
+    """Ticket ids, registration and DL numbers in a chat message, normalised (upper case, no separators)."""
+    entities: Dict[str, List[str]] = {}
+    ticket_ids = [m.group().lower() for m in _TICKET_ID_RE.finditer(message)]
+    if ticket_ids:
+        entities["ticket_ids"] = list(dict.fromkeys(ticket_ids))
+    text = _TICKET_ID_RE.sub(" ", message).upper()
+    dl_numbers = ["".join(m.groups()) for m in _DL_NO_RE.finditer(text)]
+    if dl_numbers:
+        entities["dl_numbers"] = list(dict.fromkeys(dl_numbers))
+        # A DL number also looks like "<state><rto> <year>"; keep it out of the registration scan
+        text = _DL_NO_RE.sub(" ", text)
+    regn_numbers = ["".join(g for g in m.groups() if g) for m in _REGN_NO_RE.finditer(text)]
+    if regn_numbers:
+        entities["registration_numbers"] = list(dict.fromkeys(regn_numbers))
+    return entities
+
+def _route_chat_message(message: str) -> Tuple[str, Dict[str, List[str]]]:
+    """(intent, entities) for a chat message: whole-token keyword match, then entity-implied intent."""
+    entities = _extract_chat_entities(message)
+    hits = {_CHATBOT_KEYWORD_INTENT[t] for t in _CHAT_TOKEN_RE.findall(message.lower()) if t in _CHATBOT_KEYWORD_INTENT}
+    if hits:
+        return min(hits, key=_CHATBOT_INTENT_PRIORITY.__getitem__), entities
+    if "ticket_ids" in entities:
+        return "ticket_status", entities
+    if "dl_numbers" in entities:
+        return "driving_license", entities
+    if "registration_numbers" in entities:
+        return "vehicle_registration", entities
+    return "general_query", entities
+
+# ----- Data tools: indexed point lookups behind a short-lived hot-key cache -----
+_CHATBOT_TOOL_MAX_KEYS = 3  # lookups per message
+_VAHAN_RC_PROJECTION = {"_id": 0, "regn_no": 1, "regn_upto": 1, "fit_upto": 1, "status": 1, "vch_catg": 1}
+_TICKET_STATUS_PROJECTION = {"_id": 0, "id": 1, "Subject": 1, "Status": 1, "Priority": 1, "Created": 1, "Updated": 1}
+_chatbot_tool_cache = _TTLCache(
+    max_entries=int(os.environ.get("CHATBOT_TOOL_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.environ.get("CHATBOT_TOOL_CACHE_TTL_SECONDS", "60")),
+)
+
+async def _ensure_chatbot_tool_indexes() -> None:
+    """Point-lookup indexes for the chatbot data tools (tickets by vehicle use `search_tokens`)."""
+    await db.vahan_data.create_index("regn_no", name="regn_no")
+    await db.tickets_data.create_index("id", name="ticket_id")
+
+async def _cached_tool_lookup(key: Tuple[str, str], fetch) -> Any:
+    """Run `fetch()` within the tool latency budget, caching hits and misses; None when over budget."""
+    cached = _chatbot_tool_cache.get(key)
+    if cached is not None:
+        return cached
+    budget = float(os.environ.get("CHATBOT_TOOL_TIMEOUT_MS", "300")) / 1000.0
+    try:
+        result = await asyncio.wait_for(fetch(), timeout=budget)
+    except asyncio.TimeoutError:
+        logger.warning(f"Chatbot tool lookup {key[0]} exceeded {budget * 1000:.0f} ms budget")
+        return None
+    _chatbot_tool_cache.set(key, result)
+    return result
+
+async def _lookup_rc_status(regn_no: str) -> Optional[Dict[str, Any]]:
+    """RC validity for a registration number (`{}` when not found, None when over budget)."""
+    async def _fetch():
+        return await db.vahan_data.find_one({"regn_no": regn_no}, _VAHAN_RC_PROJECTION) or {}
+    return await _cached_tool_lookup(("rc", regn_no), _fetch)
+
+async def _lookup_tickets(ticket_id: Optional[str] = None, regn_no: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """Latest tickets by ticket id or by a vehicle number mentioned in the subject."""
+    if ticket_id:
+        key, query = ("ticket", ticket_id), {"id": ticket_id}
+    else:
+        key, query = ("ticket_vehicle", regn_no), {"search_tokens": regn_no}
+
+    async def _fetch():
+        return await db.tickets_data.find(query, _TICKET_STATUS_PROJECTION).sort(_TICKET_LIST_SORT).limit(3).to_list(3)
+    return await _cached_tool_lookup(key, _fetch)
+
+def _format_validity(label: str, value: Any, today: datetime) -> str:
+    dt = _safe_parse_date(value)
+    if dt is None:
+        return f"• {label}: not recorded"
+    if dt.date() >= today.date():
+        return f"• {label}: valid till {dt.strftime('%d %b %Y')}"
+    return f"• {label}: expired on {dt.strftime('%d %b %Y')}"
+
+def _format_rc_status(regn_no: str, rc: Dict[str, Any]) -> str:
+    if not rc:
+        return f"No registration record found for {regn_no}. Please check the number or visit parivahan.gov.in."
+    today = datetime.now()
+    lines = [f"RC status for {regn_no}:"]
+    lines.append(_format_validity("Registration", rc.get("regn_upto"), today))
+    lines.append(_format_validity("Fitness", rc.get("fit_upto"), today))
+    if rc.get("status"):
+        lines.append(f"• Record status code: {rc['status']}")
+    return "\n".join(lines)
+
+def _format_tickets(kind: str, key: str, tickets: List[Dict[str, Any]]) -> str:
+    if not tickets:
+        return f"No ticket found with id {key}." if kind == "ticket" else f"No tickets found for vehicle {key}."
+    lines = [f"Ticket {key}:" if kind == "ticket" else f"Tickets mentioning {key}:"]
+    for t in tickets:
+        created = _safe_parse_date(t.get("Created"))
+        when = f", raised {created.strftime('%d %b %Y')}" if created else ""
+        lines.append(f"• {t.get('Subject') or 'Ticket'} — {t.get('Status') or 'Unknown'} ({t.get('Priority') or 'Normal'} priority{when})")
+    return "\n".join(lines)
+
+async def _chatbot_grounded_answer(intent: str, entities: Dict[str, List[str]]) -> Optional[str]:
+    """
+    Answer from Vahan/ticket data when the message names a ticket id or registration number;
+    None to continue with the LLM/fallback (no identifiers, or every lookup over budget).
+    """
+    tasks: List[Tuple[str, str, Any]] = []
+    for ticket_id in entities.get("ticket_ids", [])[:_CHATBOT_TOOL_MAX_KEYS]:
+        tasks.append(("ticket", ticket_id, _lookup_tickets(ticket_id=ticket_id)))
+    for regn_no in entities.get("registration_numbers", [])[:_CHATBOT_TOOL_MAX_KEYS]:
+        if intent not in ("ticket_status", "grievance"):
+            tasks.append(("rc", regn_no, _lookup_rc_status(regn_no)))
+        if intent in ("ticket_status", "grievance", "application_status"):
+            tasks.append(("ticket_vehicle", regn_no, _lookup_tickets(regn_no=regn_no)))
+    if not tasks:
+        return None
+    results = await asyncio.gather(*(coro for _kind, _key, coro in tasks), return_exceptions=True)
+    sections = []
+    for (kind, key, _coro), result in zip(tasks, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Chatbot tool lookup {kind} failed for {key}: {result}")
+            continue
+        if result is None:
+            continue
+        if kind == "rc":
+            sections.append(_format_rc_status(key, result))
+        else:
+            sections.append(_format_tickets(kind, key, result))
+    return "\n\n".join(sections) if sections else None
+
+def _chatbot_fallback_response(intent: str) -> str:
+    return _CHATBOT_FALLBACK_RESPONSES[_CHATBOT_INTENT_FALLBACK.get(intent, "default")]
+
+# LLM answers to generic questions, keyed by the normalised question (never for messages with entities)
+_chatbot_answer_cache = _TTLCache(
+    max_entries=int(os.environ.get("CHATBOT_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("CHATBOT_CACHE_TTL_SECONDS", "3600")),
+)
+
+def _chatbot_cache_key(message: str, entities: Dict[str, List[str]]) -> Optional[str]:
+    if entities:
+        return None
+    normalized = " ".join(_CHAT_TOKEN_RE.findall(message.lower()))
+    return normalized or None
+
+def _chunk_fallback_text(text: str) -> List[str]:
+    """Line-sized chunks so a canned answer streams like generated text."""
+    return re.findall(r"[^\n]*\n|[^\n]+", text)
+
+async def _chatbot_reply_stream(message: str, intent: str, entities: Dict[str, List[str]]) -> AsyncIterator[str]:
+    """
+    Response chunks for one turn: a cached or data-grounded answer, else LLM tokens as they arrive,
+    else the intent's fallback answer at once.
+    """
+    cache_key = _chatbot_cache_key(message, entities)
+    ready = _chatbot_answer_cache.get(cache_key) if cache_key else None
+    if ready is None:
+        ready = await _chatbot_grounded_answer(intent, entities)
+    if ready is not None:
+        for chunk in _chunk_fallback_text(ready):
+            yield chunk
+        return
+    parts: List[str] = []
+    if _llm_gateway.is_configured():
+        try:
+            async for chunk in _llm_gateway.stream("openai", "gpt-4o-mini", _CHATBOT_SYSTEM_MESSAGE, message):
+                parts.append(chunk)
+                yield chunk
+            if cache_key and parts:
+                _chatbot_answer_cache.set(cache_key, "".join(parts))
+        except Exception as e:
+            logger.warning(f"LLM streaming error, using fallback: {e}")
+    if not parts:
+        for chunk in _chunk_fallback_text(_chatbot_fallback_response(intent)):
+            yield chunk
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @chatbot_router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Handle chatbot conversation"""
     session_id = request.session_id or str(uuid.uuid4())
     
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = []
-    
-    # Store user message
-    chat_sessions[session_id].append({
+    user_message = {
         "role": "user",
         "content": request.message,
         "timestamp": datetime.now(timezone.utc).isoformat()
-    })
-    
-    # Fallback responses
-    fallback_responses = {
-        "license": "To check your Driving License status, please provide your DL number. You can also visit the official Parivahan portal at parivahan.gov.in for online DL services including:\n• DL Application Status\n• DL Renewal\n• Duplicate DL\n• International Driving Permit",
-        "rc": "For RC (Registration Certificate) queries, please provide your vehicle registration number. Services available:\n• RC Status Check\n• RC Transfer\n• Duplicate RC\n• Address Change in RC\n\nVisit parivahan.gov.in or your nearest RTO.",
-        "challan": "To pay traffic challans online:\n1. Visit echallan.parivahan.gov.in\n2. Enter your vehicle number or challan number\n3. View pending challans\n4. Make payment using UPI/Card/Net Banking\n\nNeed help with a specific challan?",
-        "grievance": "I can help you register a grievance. To file a complaint:\n1. Describe your issue in detail\n2. Provide relevant documents (vehicle number, DL number, etc.)\n3. We will create a ticket and track it\n\nWhat issue would you like to report?",
-        "status": "To check application status, please provide:\n• Application Number, OR\n• Vehicle Registration Number, OR\n• DL Number\n\nI can help you track pending applications.",
-        "rto": "To find your nearest RTO:\n1. Visit parivahan.gov.in\n2. Go to RTO locator\n3. Enter your district\n\nRTO offices typically operate Mon-Sat, 10 AM to 5 PM.",
-        "default": "Hello! I'm your Citizen Assistance Bot for Transport Services. I can help you with:\n\n• Driving License (DL) queries\n• Vehicle Registration (RC)\n• Traffic Challan payments\n• Grievance registration\n• Application status tracking\n• RTO locations\n\nHow can I assist you today?"
     }
     
-    response_text = None
+    intent, entities = _route_chat_message(request.message)
+    cache_key = _chatbot_cache_key(request.message, entities)
+    response_text = _chatbot_answer_cache.get(cache_key) if cache_key else None
+    if response_text is None:
+        response_text = await _chatbot_grounded_answer(intent, entities)
     
-    # Try LLM first
-    try:
-        from emergentintegrations.llm.chat import LlmChat, UserMessage  # type: ignore[import-not-found]
-        
-        api_key = os.environ.get('EMERGENT_LLM_KEY', '')
-        
-        if api_key:
-            system_message = """You are a helpful Citizen Assistance Chatbot for the Transport Department. 
-            You help citizens with:
-            - Driving License status and applications
-            - Vehicle Registration (RC) queries
-            - Traffic challan payments
-            - Grievance registration and tracking
-            - Policy and scheme explanations
-            
-            Be polite, concise, and helpful. If you don't know something, suggest visiting the nearest RTO office or parivahan.gov.in"""
-            
-            chat_obj = LlmChat(
-                api_key=api_key,
-                session_id=session_id,
-                system_message=system_message
-            )
-            chat_obj.with_model("openai", "gpt-4o-mini")
-            
-            user_message = UserMessage(text=request.message)
-            response_text = await chat_obj.send_message(user_message)
-    except Exception as e:
-        logger.warning(f"LLM error, using fallback: {e}")
+    # Try LLM unless a frequent question was answered recently
+    if response_text is None:
+        try:
+            if _llm_gateway.is_configured():
+                # Bounded + timed out by the gateway; answers cached here by normalised question
+                response_text = await _llm_gateway.complete(
+                    "openai", "gpt-4o-mini", _CHATBOT_SYSTEM_MESSAGE, request.message, cache=False
+                )
+                if response_text and cache_key:
+                    _chatbot_answer_cache.set(cache_key, response_text)
+        except Exception as e:
+            logger.warning(f"LLM error, using fallback: {e}")
     
     # Use fallback if LLM failed or returned empty
     if not response_text:
-        msg_lower = request.message.lower()
-        if "license" in msg_lower or "dl" in msg_lower:
-            response_text = fallback_responses["license"]
-        elif "rc" in msg_lower or "registration" in msg_lower or "vehicle" in msg_lower:
-            response_text = fallback_responses["rc"]
-        elif "challan" in msg_lower or "fine" in msg_lower or "penalty" in msg_lower:
-            response_text = fallback_responses["challan"]
-        elif "grievance" in msg_lower or "complaint" in msg_lower or "issue" in msg_lower:
-            response_text = fallback_responses["grievance"]
-        elif "status" in msg_lower or "track" in msg_lower or "pending" in msg_lower:
-            response_text = fallback_responses["status"]
-        elif "rto" in msg_lower or "office" in msg_lower or "location" in msg_lower:
-            response_text = fallback_responses["rto"]
-        else:
-            response_text = fallback_responses["default"]
+        response_text = _chatbot_fallback_response(intent)
     
-    # Store assistant response
-    chat_sessions[session_id].append({
+    # Store the exchange (one write per turn)
+    await _chat_sessions.append(session_id, [user_message, {
         "role": "assistant",
         "content": response_text,
         "timestamp": datetime.now(timezone.utc).isoformat()
-    })
+    }])
     
     return ChatResponse(
         response=response_text,
         session_id=session_id,
-        intent="general_query",
-        entities={}
+        intent=intent,
+        entities=entities
     )
 
 @chatbot_router.get("/history/{session_id}")
-async def get_chat_history(session_id: str):
-    """Get chat history for a session"""
-    return {"session_id": session_id, "messages": chat_sessions.get(session_id, [])}
+async def get_chat_history(session_id: str, skip: int = 0, limit: int = 50):
+    """Get chat history for a session (oldest first; `total` is the retained message count)"""
+    skip = max(0, int(skip))
+    limit = max(1, min(int(limit), 500))
+    try:
+        messages, total = await _chat_sessions.history(session_id, skip, limit)
+    except Exception as e:
+        logger.error(f"Error reading chat history: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"session_id": session_id, "messages": messages, "total": total, "skip": skip, "limit": limit}
+
+@chatbot_router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat over Server-Sent Events.
+    Events: `start` {session_id, intent, entities}, `delta` {content} per chunk, `done` {session_id, response, intent, entities}.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    user_message = {"role": "user", "content": request.message, "timestamp": datetime.now(timezone.utc).isoformat()}
+
+    intent, entities = _route_chat_message(request.message)
+
+    async def _events():
+        yield _sse_event("start", {"session_id": session_id, "intent": intent, "entities": entities})
+        parts: List[str] = []
+        async for chunk in _chatbot_reply_stream(request.message, intent, entities):
+            parts.append(chunk)
+            yield _sse_event("delta", {"content": chunk})
+        response_text = "".join(parts)
+        await _chat_sessions.append(session_id, [user_message, {
+            "role": "assistant",
+            "content": response_text,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }])
+        yield _sse_event("done", {"session_id": session_id, "response": response_text, "intent": intent, "entities": entities})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@chatbot_router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Streaming chat over WebSocket. Client sends JSON {message, session_id?} per turn; server replies with
+    {type: "start", session_id, intent, entities}, {type: "delta", content} per chunk and
+    {type: "done", session_id, response, intent, entities}.
+    """
+    await websocket.accept()
+    session_id = None
+    try:
+        while True:
+            data = await websocket.receive_json()
+            message = str((data or {}).get("message") or "").strip()
+            if not message:
+                await websocket.send_json({"type": "error", "error": "message is required"})
+                continue
+            session_id = data.get("session_id") or session_id or str(uuid.uuid4())
+            user_message = {"role": "user", "content": message, "timestamp": datetime.now(timezone.utc).isoformat()}
+            intent, entities = _route_chat_message(message)
+            await websocket.send_json({"type": "start", "session_id": session_id, "intent": intent, "entities": entities})
+            parts: List[str] = []
+            async for chunk in _chatbot_reply_stream(message, intent, entities):
+                parts.append(chunk)
+                await websocket.send_json({"type": "delta", "content": chunk})
+            response_text = "".join(parts)
+            await _chat_sessions.append(session_id, [user_message, {
+                "role": "assistant",
+                "content": response_text,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }])
+            await websocket.send_json({
+                "type": "done", "session_id": session_id, "response": response_text,
+                "intent": intent, "entities": entities,
+            })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Chat websocket error: {e}")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+# ===================== STT ENGINES =====================
+_STT_LANGUAGE_CODES = {
+    LanguageEnum.HINDI: "hi-IN",
+    LanguageEnum.MARATHI: "mr-IN",
+    LanguageEnum.TAMIL: "ta-IN",
+    LanguageEnum.ENGLISH: "en-IN"
+}
+_STT_DEFAULT_SAMPLE_RATE = 16000
+# Compressed containers recognised by magic bytes (engines that need PCM reject these)
+_STT_COMPRESSED_MAGIC = (
+    (b"\x1a\x45\xdf\xa3", "webm_opus"),
+    (b"OggS", "ogg_opus"),
+    (b"fLaC", "flac"),
+    (b"ID3", "mp3"),
+    (b"\xff\xfb", "mp3"),
+)
+
+# Rates Google accepts for Opus (must match the stream's OpusHead input rate); Opus decodes at 48 kHz
+_STT_OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+# PCM rates accepted on the streaming endpoint (both engines handle 8-48 kHz)
+_STT_STREAM_SAMPLE_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+_STT_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+class _SttAudio:
+    """
+    Uploaded audio, normalised once for every engine.
+    - WAV: parsed with `wave` -> mono 16-bit PCM, real sample rate and duration
+    - known compressed containers: passed through as-is (`pcm` is None, duration unknown -> 0.0);
+      the sample rate is read from the OpusHead / MP3 frame header (Opus defaults to 48 kHz),
+      FLAC carries its own and is left to the engine
+    - anything else: raw LINEAR16 mono at 16 kHz (what the engines are configured for)
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.encoding = "linear16"
+        self.sample_rate: Optional[int] = _STT_DEFAULT_SAMPLE_RATE
+        self.pcm: Optional[bytes] = data
+        for magic, encoding in _STT_COMPRESSED_MAGIC:
+            if data.startswith(magic):
+                self.encoding, self.sample_rate, self.pcm = encoding, None, None
+                break
+        if self.encoding.endswith("_opus"):
+            self.sample_rate = self._opus_rate(data)
+        elif self.encoding == "mp3":
+            self.sample_rate = self._mp3_rate(data)
+        if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            self._load_wav()
+        self.duration = (len(self.pcm) / (2.0 * self.sample_rate)) if self.pcm is not None and self.sample_rate else 0.0
+
+    @staticmethod
+    def _opus_rate(data: bytes) -> int:
+        # OpusHead sits in the first Ogg page, or in the WebM track's CodecPrivate; input rate is a LE uint32 at +12
+        head = data.find(b"OpusHead", 0, 65536)
+        if head >= 0 and len(data) >= head + 16:
+            rate = int.from_bytes(data[head + 12:head + 16], "little")
+            if rate in _STT_OPUS_SAMPLE_RATES:
+                return rate
+        return 48000
+
+    @staticmethod
+    def _mp3_rate(data: bytes) -> Optional[int]:
+        start = 0
+        if data.startswith(b"ID3") and len(data) >= 10:
+            start = 10 + ((data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F))
+        for i in range(start, min(len(data) - 3, start + 65536)):
+            if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+                version, rate_idx = (data[i + 1] >> 3) & 0x3, (data[i + 2] >> 2) & 0x3
+                if version in _STT_MP3_SAMPLE_RATES and rate_idx < 3:
+                    return _STT_MP3_SAMPLE_RATES[version][rate_idx]
+        return None
+
+    def _load_wav(self) -> None:
+        import wave
+
+        try:
+            with wave.open(io.BytesIO(self.data), "rb") as wav:
+                channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+                frames = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise HTTPException(status_code=415, detail=f"Invalid WAV file: {e}")
+        if width != 2:
+            raise HTTPException(status_code=415, detail="Only 16-bit PCM WAV audio is supported.")
+        if channels > 1:
+            if np is None:
+                raise HTTPException(status_code=415, detail="Multi-channel WAV needs numpy; send mono audio.")
+            samples = np.frombuffer(frames, dtype="<i2")
+            samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels)
+            frames = samples.mean(axis=1).astype("<i2").tobytes()
+        self.pcm, self.sample_rate = frames, rate
+        self.data = frames  # engines receive headerless LINEAR16
+
+class _GoogleSttEngine:
+    """Google Cloud Speech-to-Text over one shared (thread-safe) client, created on first use."""
+
+    name = "google"
+
+    def __init__(self):
+        try:
+            from google.cloud import speech
+        except ImportError:
+            raise HTTPException(status_code=503, detail="google-cloud-speech is not installed.")
+        self._speech = speech
+        self._client = speech.SpeechClient()
+
+    def _config(self, encoding: str, sample_rate: Optional[int], language_code: str):
+        enum = self._speech.RecognitionConfig.AudioEncoding
+        kwargs: Dict[str, Any] = {
+            "encoding": getattr(enum, encoding.upper(), enum.ENCODING_UNSPECIFIED),
+            "language_code": language_code,
+            "enable_automatic_punctuation": True,
+        }
+        if sample_rate:
+            kwargs["sample_rate_hertz"] = sample_rate
+        return self._speech.RecognitionConfig(**kwargs)
+
+    def transcribe(self, audio: _SttAudio, language_code: str) -> Tuple[str, float]:
+        response = self._client.recognize(
+            config=self._config(audio.encoding, audio.sample_rate, language_code),
+            audio=self._speech.RecognitionAudio(content=audio.data),
+        )
+        best = [r.alternatives[0] for r in response.results if r.alternatives]
+        if not best:
+            return "", 0.0
+        return " ".join(a.transcript.strip() for a in best).strip(), sum(a.confidence for a in best) / len(best)
+
+    def streaming_session(self, sample_rate: int, language_code: str) -> "_GoogleSttSession":
+        return _GoogleSttSession(self, sample_rate, language_code)
+
+class _GoogleSttSession:
+    """
+    Streaming recognition: the blocking gRPC stream runs on its own thread, fed from a request queue;
+    results come back through an event queue that `accept`/`finish` drain without blocking the caller.
+    """
+
+    def __init__(self, engine: _GoogleSttEngine, sample_rate: int, language_code: str):
+        speech = engine._speech
+        self._speech = speech
+        self._requests: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        config = speech.StreamingRecognitionConfig(
+            config=engine._config("linear16", sample_rate, language_code), interim_results=True
+        )
+        self._thread = threading.Thread(target=self._run, args=(engine._client, config), daemon=True)
+        self._thread.start()
+
+    def _request_iter(self):
+        while True:
+            chunk = self._requests.get()
+            if chunk is None:
+                return
+            yield self._speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    def _run(self, client, config) -> None:
+        try:
+            for response in client.streaming_recognize(config=config, requests=self._request_iter()):
+                for result in response.results:
+                    if not result.alternatives:
+                        continue
+                    alt = result.alternatives[0]
+                    if result.is_final:
+                        self._events.put({"final": alt.transcript.strip(), "confidence": alt.confidence})
+                    else:
+                        self._events.put({"partial": alt.transcript.strip()})
+        except Exception as e:
+            self._events.put({"error": str(e)})
+        finally:
+            self._events.put(None)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        events = []
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                return events
+            if event is not None:
+                events.append(event)
+
+    def accept(self, chunk: bytes) -> List[Dict[str, Any]]:
+        self._requests.put(chunk)
+        return self._drain()
+
+    def finish(self) -> List[Dict[str, Any]]:
+        self._requests.put(None)
+        self._thread.join(timeout=float(os.environ.get("STT_STREAM_FINISH_TIMEOUT_SECONDS", "10")))
+        return self._drain()
+
+class _VoskSttEngine:
+    """
+    Offline recognition with Vosk (Kaldi). Models are loaded once per language from
+    `VOSK_MODEL_PATH_<LANG>` (e.g. VOSK_MODEL_PATH_HI_IN) or `VOSK_MODEL_PATH` (default models/vosk).
+    Needs PCM input (WAV or raw 16-bit mono).
+    """
+
+    name = "vosk"
+
+    def __init__(self):
+        try:
+            import vosk  # type: ignore[import-not-found]
+        except ImportError:
+            raise HTTPException(status_code=503, detail="vosk is not installed (pip install vosk).")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self._models: Dict[str, Any] = {}
+        self._shared_model_languages: set = set()
+        self._lock = threading.Lock()
+
+    def _model(self, language_code: str):
+        env_key = "VOSK_MODEL_PATH_" + language_code.upper().replace("-", "_")
+        path = Path(os.environ.get(env_key) or os.environ.get("VOSK_MODEL_PATH") or str(ROOT_DIR / "models" / "vosk"))
+        with self._lock:
+            if not os.environ.get(env_key) and language_code not in self._shared_model_languages:
+                # A Vosk model is single-language: the shared one will transcribe this language poorly
+                self._shared_model_languages.add(language_code)
+                logger.warning(f"No Vosk model configured for {language_code} ({env_key}); using the shared model at {path}.")
+            model = self._models.get(str(path))
+            if model is None:
+                if not path.exists():
+                    raise HTTPException(status_code=503, detail=f"Vosk model not found at {path}. Set {env_key} or VOSK_MODEL_PATH.")
+                model = self._vosk.Model(str(path))
+                self._models[str(path)] = model
+        return model
+
+    def _recognizer(self, sample_rate: int, language_code: str):
+        rec = self._vosk.KaldiRecognizer(self._model(language_code), float(sample_rate))
+        rec.SetWords(True)
+        return rec
+
+    @staticmethod
+    def _final(result_json: str) -> Dict[str, Any]:
+        result = json.loads(result_json or "{}")
+        words = result.get("result") or []
+        confidence = sum(w.get("conf", 0.0) for w in words) / len(words) if words else 0.0
+        return {"final": (result.get("text") or "").strip(), "confidence": confidence}
+
+    def transcribe(self, audio: _SttAudio, language_code: str) -> Tuple[str, float]:
+        if audio.pcm is None:
+            raise HTTPException(status_code=415, detail="Offline STT needs WAV or raw 16-bit PCM audio.")
+        rec = self._recognizer(audio.sample_rate or _STT_DEFAULT_SAMPLE_RATE, language_code)
+        finals = []
+        step = 8000  # bytes per AcceptWaveform call (0.25 s at 16 kHz)
+        for i in range(0, len(audio.pcm), step):
+            if rec.AcceptWaveform(audio.pcm[i:i + step]):
+                finals.append(self._final(rec.Result()))
+        finals.append(self._final(rec.FinalResult()))
+        finals = [f for f in finals if f["final"]]
+        if not finals:
+            return "", 0.0
+        return " ".join(f["final"] for f in finals), sum(f["confidence"] for f in finals) / len(finals)
+
+    def streaming_session(self, sample_rate: int, language_code: str) -> "_VoskSttSession":
+        return _VoskSttSession(self, self._recognizer(sample_rate, language_code))
+
+class _VoskSttSession:
+    def __init__(self, engine: _VoskSttEngine, recognizer):
+        self._engine = engine
+        self._rec = recognizer
+        self._last_partial = ""
+
+    def accept(self, chunk: bytes) -> List[Dict[str, Any]]:
+        if self._rec.AcceptWaveform(chunk):
+            self._last_partial = ""
+            event = self._engine._final(self._rec.Result())
+            return [event] if event["final"] else []
+        partial = (json.loads(self._rec.PartialResult() or "{}").get("partial") or "").strip()
+        if partial and partial != self._last_partial:
+            self._last_partial = partial
+            return [{"partial": partial}]
+        return []
+
+    def finish(self) -> List[Dict[str, Any]]:
+        event = self._engine._final(self._rec.FinalResult())
+        return [event] if event["final"] else []
+
+_STT_ENGINES = {
+    "google": _GoogleSttEngine,
+    "vosk": _VoskSttEngine,
+}
+_stt_engine = None
+_stt_engine_lock = threading.Lock()
+
+def _get_stt_engine():
+    """Lazy-create the configured engine once (`STT_ENGINE`: google | vosk); 503 if it is unavailable."""
+    global _stt_engine
+    if _stt_engine is None:
+        name = os.environ.get("STT_ENGINE", "google").strip().lower()
+        engine_cls = _STT_ENGINES.get(name)
+        if engine_cls is None:
+            raise HTTPException(status_code=503, detail=f"Unknown STT engine '{name}'. Use one of: {', '.join(_STT_ENGINES)}.")
+        with _stt_engine_lock:
+            if _stt_engine is None:
+                _stt_engine = engine_cls()
+    return _stt_engine
 
 # ===================== STT ENDPOINTS =====================
 @stt_router.post("/transcribe", response_model=TranscriptionResponse)
@@ -2249,47 +3692,15 @@ async def transcribe_audio(
 ):
     """Transcribe audio file to text"""
     try:
-        audio_content = await audio_file.read()
-        
-        # Language code mapping
-        lang_codes = {
-            LanguageEnum.HINDI: "hi-IN",
-            LanguageEnum.MARATHI: "mr-IN",
-            LanguageEnum.TAMIL: "ta-IN",
-            LanguageEnum.ENGLISH: "en-IN"
-        }
+        audio = _SttAudio(await audio_file.read())
+        language_code = _STT_LANGUAGE_CODES[language]
         
-        # Try Google Speech-to-Text
+        # Shared engine; client creation and recognition are blocking, so both run off the event loop
         try:
-            from google.cloud import speech
-            
-            client = speech.SpeechClient()
-            audio = speech.RecognitionAudio(content=audio_content)
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=16000,
-                language_code=lang_codes[language],
-                enable_automatic_punctuation=True
-            )
-            
-            response = client.recognize(config=config, audio=audio)
-            
-            if response.results:
-                transcript = response.results[0].alternatives[0].transcript
-                confidence = response.results[0].alternatives[0].confidence
-            else:
-                transcript = ""
-                confidence = 0.0
-            
-            return TranscriptionResponse(
-                transcription=transcript,
-                language=lang_codes[language],
-                confidence=confidence,
-                duration=len(audio_content) / 32000  # Approximate
-            )
-        except Exception as gcp_error:
-            logger.warning(f"Google STT not available: {gcp_error}")
-            # Return mock transcription for demo
+            engine = await asyncio.to_thread(_get_stt_engine)
+        except Exception as stt_error:
+            logger.warning(f"STT engine not available: {getattr(stt_error, 'detail', stt_error)}")
+            # No engine configured: return a demo transcription, flagged as such (never for a failed real call)
             mock_transcriptions = {
                 LanguageEnum.HINDI: "मेरा ड्राइविंग लाइसेंस का स्टेटस बताइए",
                 LanguageEnum.MARATHI: "माझ्या वाहन नोंदणीची स्थिती काय आहे",
@@ -2298,14 +3709,232 @@ async def transcribe_audio(
             }
             return TranscriptionResponse(
                 transcription=mock_transcriptions.get(language, "Audio transcription demo"),
-                language=lang_codes[language],
-                confidence=0.85,
-                duration=len(audio_content) / 32000
+                language=language_code,
+                confidence=0.0,
+                duration=round(audio.duration, 3),
+                demo=True
             )
+
+        try:
+            transcript, confidence = await asyncio.to_thread(engine.transcribe, audio, language_code)
+        except HTTPException:
+            raise
+        except Exception as stt_error:
+            logger.error(f"STT {engine.name} recognition failed: {stt_error}")
+            raise HTTPException(status_code=502, detail=f"Speech recognition failed: {stt_error}")
+
+        return TranscriptionResponse(
+            transcription=transcript,
+            language=language_code,
+            confidence=confidence,
+            duration=round(audio.duration, 3)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"STT error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@stt_router.websocket("/stream")
+async def transcribe_stream(
+    websocket: WebSocket,
+    language: LanguageEnum = LanguageEnum.ENGLISH,
+    sample_rate: int = _STT_DEFAULT_SAMPLE_RATE,
+):
+    """
+    Streaming transcription over WebSocket.
+    Client sends raw 16-bit mono PCM chunks (binary messages) at `sample_rate` (8-48 kHz, see
+    `_STT_STREAM_SAMPLE_RATES`; anything else gets {error} and a 1008 close); server replies with
+    {partial} / {final, confidence} messages as they are recognised. Send the text "end" to get
+    {done, transcription, duration}.
+    """
+    await websocket.accept()
+    language_code = _STT_LANGUAGE_CODES[language]
+    if sample_rate not in _STT_STREAM_SAMPLE_RATES:
+        await websocket.send_json({
+            "error": f"Unsupported sample_rate {sample_rate}. Use one of: {', '.join(map(str, _STT_STREAM_SAMPLE_RATES))}."
+        })
+        await websocket.close(code=1008)
+        return
+    try:
+        engine = await asyncio.to_thread(_get_stt_engine)
+        session = await asyncio.to_thread(engine.streaming_session, sample_rate, language_code)
+    except Exception as e:
+        await websocket.send_json({"error": getattr(e, "detail", str(e))})
+        await websocket.close(code=1011)
+        return
+    finals: List[str] = []
+    received = 0
+
+    async def _send(events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            if event.get("final"):
+                finals.append(event["final"])
+            await websocket.send_json(event)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                await asyncio.to_thread(session.finish)
+                break
+            if message.get("text") is not None:
+                if message["text"].strip().lower() == "end":
+                    await _send(await asyncio.to_thread(session.finish))
+                    await websocket.send_json({
+                        "done": True,
+                        "transcription": " ".join(finals),
+                        "language": language_code,
+                        "duration": round(received / (2.0 * sample_rate), 3),
+                    })
+                    await websocket.close()
+                    break
+                continue
+            chunk = message.get("bytes") or b""
+            if chunk:
+                received += len(chunk)
+                await _send(await asyncio.to_thread(session.accept, chunk))
+    except WebSocketDisconnect:
+        await asyncio.to_thread(session.finish)
+    except Exception as e:
+        logger.error(f"STT stream error: {e}")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+# ===================== IMAGE PIPELINE (DECODE ONCE) =====================
+class _ImagePipeline:
+    """
+    Decode an uploaded image once and share it across the QR, OCR and face stages.
+    - `bgr` / `gray` are decoded lazily and cached; consumers get the cached arrays (no copies)
+    - resized variants are cached per size/scale
+    - base64 is only computed when a caller (Gemini path) actually asks for it
+    Consumers must treat the returned arrays as read-only.
+    """
+
+    def __init__(self, image_bytes: bytes):
+        self.raw = image_bytes or b""
+        self._bgr = None
+        self._gray = None
+        self._decoded = False
+        self._variants: Dict[Any, Any] = {}
+        self._base64: Optional[str] = None
+        self._pil = None
+
+    @classmethod
+    def from_pil(cls, img) -> "_ImagePipeline":
+        """
+        Wrap an already-rasterised PIL image (e.g. a PDF page) without re-encoding it.
+        Grayscale pages keep a single-channel buffer; BGR is derived only if a consumer asks.
+        """
+        pipeline = cls(b"")
+        pipeline._decoded = True
+        if np is None:
+            pipeline._pil = img
+            return pipeline
+        if img.mode == "L":
+            pipeline._gray = np.asarray(img)
+        elif cv2 is not None:
+            pipeline._bgr = cv2.cvtColor(np.asarray(img.convert("RGB")), cv2.COLOR_RGB2BGR)
+        return pipeline
+
+    @property
+    def bgr(self):
+        """BGR uint8 array (None if OpenCV is missing or the bytes are not an image)."""
+        if not self._decoded:
+            self._decoded = True
+            if self.raw and cv2 is not None and np is not None:
+                arr = np.frombuffer(self.raw, dtype=np.uint8)
+                self._bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+        if self._bgr is None and self._gray is not None and cv2 is not None:
+            self._bgr = cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGR)
+        return self._bgr
+
+    @property
+    def gray(self):
+        if self._gray is None and self.bgr is not None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def scaled_gray(self, scale: float):
+        """Grayscale upscaled by `scale` (cached; used for QR retries)."""
+        key = ("scale", float(scale))
+        if key not in self._variants and self.gray is not None:
+            self._variants[key] = cv2.resize(self.gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        return self._variants.get(key)
+
+    def fit_gray(self, max_side: int):
+        """Grayscale shrunk so the longest side is <= max_side. Returns the cached gray itself if already small."""
+        gray = self.gray
+        if gray is None:
+            return None
+        h, w = gray.shape[:2]
+        if max(h, w) <= max_side:
+            return gray
+        key = ("fit", int(max_side))
+        if key not in self._variants:
+            scale = min(max_side / w, max_side / h)
+            size = (int(w * scale), int(h * scale))
+            self._variants[key] = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+            logger.info(f"Resized image from {w}x{h} to {size[0]}x{size[1]} for faster OCR")
+        return self._variants[key]
+
+    def ocr_image(self, max_side: Optional[int] = None):
+        """
+        PIL grayscale image for Tesseract, built from the shared decode.
+        Falls back to PIL decoding when OpenCV is unavailable.
+        """
+        if Image is None:
+            return None
+        arr = self.fit_gray(max_side) if max_side else self.gray
+        if arr is not None:
+            return Image.fromarray(arr)
+        img = self._pil if self._pil is not None else Image.open(io.BytesIO(self.raw))
+        if max_side and max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        return img.convert("L")
+
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            raw = self.raw
+            if not raw and self.bgr is not None:
+                ok, buf = cv2.imencode(".png", self.bgr)
+                raw = buf.tobytes() if ok else b""
+            self._base64 = base64.b64encode(raw).decode("utf-8")
+        return self._base64
+
+def _iter_pdf_page_pipelines(pdf_bytes: bytes, dpi: Optional[int] = None, max_pages: Optional[int] = None):
+    """
+    Rasterise a PDF lazily, one page at a time, yielding an _ImagePipeline per page.
+    Only the current page is held in memory, so callers can stop early (e.g. once the
+    Aadhaar number + QR are found) without paying for the remaining pages.
+    """
+    dpi = dpi or int(os.environ.get("AADHAAR_PDF_DPI", "150"))
+    max_pages = max_pages or int(os.environ.get("AADHAAR_PDF_MAX_PAGES", "4"))
+    try:
+        from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+        page_count = int(pdfinfo_from_bytes(pdf_bytes).get("Pages", 1))
+    except Exception as pdf_error:
+        logger.warning(f"PDF conversion failed: {pdf_error}")
+        raise HTTPException(
+            status_code=400,
+            detail="PDF processing not available. Please upload an image file (JPG, PNG)."
+        )
+
+    for page_no in range(1, min(page_count, max_pages) + 1):
+        try:
+            pages = convert_from_bytes(
+                pdf_bytes, dpi=dpi, first_page=page_no, last_page=page_no, grayscale=True, thread_count=1
+            )
+        except Exception as pdf_error:
+            logger.warning(f"PDF page {page_no} conversion failed: {pdf_error}")
+            break
+        if not pages:
+            break
+        yield _ImagePipeline.from_pil(pages[0])
+
 # ===================== AADHAAR QR HELPERS (OCR-FREE) =====================
 def _require_opencv_for_qr() -> None:
     if cv2 is None or np is None:
@@ -2320,9 +3949,12 @@ def _decode_qr_text_from_image_bytes(image_bytes: bytes) -> Optional[str]:
     """
     if not image_bytes:
         return None
+    return _decode_qr_text_from_image(_ImagePipeline(image_bytes))
+
+def _decode_qr_text_from_image(pipeline: _ImagePipeline) -> Optional[str]:
+    """QR decode against an already-decoded pipeline (reuses its gray/upscaled variants)."""
     _require_opencv_for_qr()
-    arr = np.frombuffer(image_bytes, dtype=np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    img = pipeline.bgr
     if img is None:
         return None
 
@@ -2343,9 +3975,8 @@ def _decode_qr_text_from_image_bytes(image_bytes: bytes) -> Optional[str]:
 
     # Retry with grayscale + upscaling (often helps on Aadhaar scans)
     try:
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         for scale in (1.5, 2.0, 3.0):
-            resized = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+            resized = pipeline.scaled_gray(scale)
             data2, _p2, _ = detector.detectAndDecode(resized)
             if data2 and str(data2).strip():
                 return str(data2).strip()
@@ -2452,12 +4083,11 @@ def _safe_import_pytesseract():
     finally:
         pkgutil.find_loader = orig_find_loader  # type: ignore[assignment]
 
-def _tesseract_ocr_text(image_bytes: bytes) -> str:
+def _tesseract_ocr_text(pipeline: _ImagePipeline) -> str:
     _require_tesseract()
     pt = _safe_import_pytesseract()
-    img = Image.open(io.BytesIO(image_bytes))
-    # basic cleanup: grayscale, autocontrast, slight sharpen
-    img = img.convert("L")
+    # basic cleanup: grayscale (shared decode), autocontrast, slight sharpen
+    img = pipeline.ocr_image()
     img = ImageOps.autocontrast(img)
     try:
         img = img.filter(ImageFilter.SHARPEN)
@@ -2478,21 +4108,23 @@ async def verify_document(
     """Verify document using OCR"""
     try:
         image_content = await image_file.read()
-        image_base64 = base64.b64encode(image_content).decode('utf-8')
+        pipeline = _ImagePipeline(image_content)
         doc_type = (document_type or "").strip().lower()
 
         # Aadhaar: open-source OCR (Tesseract) + rule-based parsing (no mock).
         if doc_type == "aadhaar":
-            text = _tesseract_ocr_text(image_content)
+            text = _tesseract_ocr_text(pipeline)
             validation_errors: List[str] = []
 
-            aadhaar_num = _extract_aadhaar_number(text)
-            vid_num = _extract_vid_from_text(text)
-            name = _extract_name_from_front_text(text)  # layout rule from attached card
-            dob = _extract_dob_from_text(text)
-            gender = _extract_gender_from_text(text)
-            address = _extract_address_from_back_text(text)  # if back side included in image
-            pin_code = _extract_pin_from_text(text)
+            fields = _extract_aadhaar_fields(text)
+            values = _aadhaar_field_values(fields)
+            aadhaar_num = values["aadhaar_number"]
+            vid_num = values["vid"]
+            name = values["name"]  # layout rule from attached card
+            dob = values["dob"]
+            gender = values["gender"]
+            address = values["address"]  # if back side included in image
+            pin_code = values["pin_code"]
 
             if not aadhaar_num:
                 validation_errors.append("Aadhaar number not found.")
@@ -2522,6 +4154,8 @@ async def verify_document(
                 "vid": _mask_vid(vid_num) if vid_num else None,
             }
             extracted = {k: v for k, v in extracted.items() if v is not None}
+            if fields:
+                extracted["field_confidence"] = {k: f["confidence"] for k, f in fields.items()}
 
             return OCRResponse(
                 document_type=document_type,
@@ -2531,28 +4165,16 @@ async def verify_document(
                 validation_errors=validation_errors,
             )
         
-        # Try Gemini Vision for OCR
+        # Try Gemini Vision for OCR (bounded, cached and coalesced by image hash in the gateway)
         try:
-            from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent  # type: ignore[import-not-found]
-            
-            api_key = os.environ.get('EMERGENT_LLM_KEY', '')
-            
-            if api_key:
-                chat = LlmChat(
-                    api_key=api_key,
-                    session_id=f"ocr_{uuid.uuid4()}",
-                    system_message=f"You are an OCR expert. Extract all text and fields from the {document_type} document image. Return a JSON object with the extracted fields."
-                )
-                chat.with_model("gemini", "gemini-2.5-flash")
-                
-                image_content_obj = ImageContent(image_base64=image_base64)
-                user_message = UserMessage(
+            if _llm_gateway.is_configured():
+                response = await _llm_gateway.complete(
+                    "gemini", "gemini-2.5-flash",
+                    system_message=f"You are an OCR expert. Extract all text and fields from the {document_type} document image. Return a JSON object with the extracted fields.",
                     text=f"Extract all information from this {document_type} document. Return JSON with fields like name, number, dates, address etc.",
-                    file_contents=[image_content_obj]
+                    image_base64=pipeline.base64,
                 )
                 
-                response = await chat.send_message(user_message)
-                
                 # Parse response
                 try:
                     extracted = json.loads(response)
@@ -2566,6 +4188,8 @@ async def verify_document(
                     is_valid=True,
                     validation_errors=[]
                 )
+        except HTTPException:
+            raise
         except Exception as ocr_error:
             logger.warning(f"Gemini OCR not available: {ocr_error}")
 
@@ -2621,6 +4245,56 @@ def _verhoeff_check(num: str) -> bool:
         c = _VERHOEFF_D[c][_VERHOEFF_P[i % 8][int(ch)]]
     return c == 0
 
+_VERHOEFF_TABLES: Optional[Tuple[Any, Any]] = None
+
+def _verhoeff_tables():
+    """(D, P) as uint8 NumPy arrays for the vectorized validator (built once)."""
+    global _VERHOEFF_TABLES
+    if _VERHOEFF_TABLES is None:
+        _VERHOEFF_TABLES = (np.asarray(_VERHOEFF_D, dtype=np.uint8), np.asarray(_VERHOEFF_P, dtype=np.uint8))
+    return _VERHOEFF_TABLES
+
+def _verhoeff_check_matrix(digits, lengths=None):
+    """
+    Vectorized `_verhoeff_check` over an (N, L) digit array.
+    Row r holds its number *right to left* (column 0 = check digit) in its first `lengths[r]`
+    columns; the rest is padding and ignored. Returns a bool array of length N.
+    One pair of table lookups per column, so the Python loop runs L times regardless of N.
+    """
+    D, P = _verhoeff_tables()
+    digits = np.asarray(digits, dtype=np.uint8)
+    n, width = digits.shape
+    if lengths is None:
+        lengths = np.full(n, width, dtype=np.int64)
+    c = np.zeros(n, dtype=np.uint8)
+    for i in range(width):
+        nxt = D[c, P[i % 8, digits[:, i]]]
+        c = np.where(lengths > i, nxt, c)
+    return (c == 0) & (lengths > 0)
+
+def _verhoeff_check_many(numbers: List[bytes], max_len: Optional[int] = None):
+    """
+    Validate many digit strings (bytes, whitespace allowed) at once; same result as
+    `_verhoeff_check` per item (empty or non-digit entries are False). Entries longer than
+    `max_len` digits are also False, which bounds the matrix width for untrusted input.
+    """
+    if not numbers:
+        return np.zeros(0, dtype=bool)
+    cleaned = [b"".join(num.split()) for num in numbers]
+    longest = max(map(len, cleaned))
+    width = max(1, longest if max_len is None else min(longest, max_len + 1))
+    # Reversed + fixed width: column i is the i-th digit from the right, NUL padded
+    rev = np.array([num[::-1][:width] for num in cleaned], dtype=f"S{width}")
+    raw = rev.view(np.uint8).reshape(len(numbers), width)
+    lengths = np.fromiter(map(len, cleaned), dtype=np.int64, count=len(cleaned))
+    present = np.arange(width) < lengths[:, None]
+    is_digit = (raw >= 48) & (raw <= 57)
+    well_formed = ~np.any(present & ~is_digit, axis=1)
+    if max_len is not None:
+        well_formed &= lengths <= max_len
+    digits = np.where(is_digit, raw - 48, 0).astype(np.uint8)
+    return _verhoeff_check_matrix(digits, lengths) & well_formed
+
 def _mask_aadhaar(num: str) -> str:
     if not num or len(num) < 4:
         return "XXXX XXXX XXXX"
@@ -2639,98 +4313,141 @@ def _normalize_text(s: str) -> str:
     s = re.sub(r"\n{3,}", "\n\n", s)
     return s.strip()
 
-def _extract_vid_from_text(text: str) -> Optional[str]:
-    t = _normalize_text(text)
-    m = re.search(r"\bVID\s*[:\-]?\s*((?:\d{4}\s*){4})\b", t, flags=re.IGNORECASE)
-    if not m:
-        return None
-    num = re.sub(r"\s+", "", m.group(1))
-    return num if (len(num) == 16 and num.isdigit()) else None
-
-def _extract_dob_from_text(text: str) -> Optional[str]:
-    t = _normalize_text(text)
-    m = re.search(r"\bDOB\s*[:\-]?\s*([0-3]?\d[\/\-][01]?\d[\/\-]\d{4})\b", t, flags=re.IGNORECASE)
-    if not m:
-        return None
-    raw = m.group(1).replace("-", "/")
-    try:
-        dt = date_parser.parse(raw, dayfirst=True)
-        return dt.date().isoformat()
-    except Exception:
-        return raw
+# Single-pass Aadhaar OCR parsing: every field marker is one alternative of one compiled regex, so
+# the normalized text is scanned once and fields are resolved from the resulting token stream.
+_AADHAAR_TOKEN_RE = re.compile(
+    r"(?P<vid>\bVID(?:\s*[:\-]?\s*(?P<vid_num>(?:\d{4}\s*){4})\b|\b))"
+    r"|(?P<dob_label>\bDOB(?:\s*[:\-]?\s*(?P<dob>[0-3]?\d[\/\-][01]?\d[\/\-]\d{4})\b|\b))"
+    r"|(?P<address_label>\bAddress\s*:\s*)"
+    r"|(?P<footer>\bUnique Identification Authority\b|\bhelp@uidai\.gov\.in\b|\bwww\.uidai\.gov\.in\b"
+    r"|\bUIDAI\b|\bAadhaar is proof of identity\b)"
+    r"|(?P<aadhaar>\b\d{4}\s?\d{4}\s?\d{4}\b)"
+    r"|(?P<pin>\b\d{6}\b)"
+    r"|(?P<gender>\bFEMALE\b|\bMALE\b|पुरुष|महिला)",
+    re.IGNORECASE,
+)
+_AADHAAR_NUMBER_RE = re.compile(r"\b(\d{4}\s?\d{4}\s?\d{4})\b")
+_AADHAAR_BOILERPLATE_RE = re.compile(
+    r"(government of india|unique identification authority|uidai|aadhaar|भारत सरकार|भारत)", re.IGNORECASE
+)
+_AADHAAR_GENDERS = {"MALE": "Male", "FEMALE": "Female", "पुरुष": "Male", "महिला": "Female"}
+# Tokens that end the free-text address block on the card back
+_AADHAAR_ADDRESS_STOPS = {"footer", "vid", "aadhaar"}
 
-def _extract_gender_from_text(text: str) -> Optional[str]:
-    t = _normalize_text(text).upper()
-    if re.search(r"\bMALE\b", t) or "पुरुष" in t:
-        return "Male"
-    if re.search(r"\bFEMALE\b", t) or "महिला" in t:
-        return "Female"
+def _pick_aadhaar_candidate(candidates: List[str]) -> Optional[str]:
+    """First Verhoeff-valid 12-digit candidate, else the first 12-digit one (invalid checksum)."""
+    for c in candidates:
+        if len(c) == 12 and _verhoeff_check(c):
+            return c
+    for c in candidates:
+        if len(c) == 12 and c.isdigit():
+            return c
     return None
 
-def _extract_name_from_front_text(front_text: str) -> Optional[str]:
-    """
-    Attached Aadhaar front format has Name on the line above 'DOB:'.
-    """
-    t = _normalize_text(front_text)
-    if not t:
-        return None
-    lines = [ln.strip() for ln in t.split("\n") if ln.strip()]
-    dob_idx = None
-    for i, ln in enumerate(lines):
-        if re.search(r"\bDOB\b", ln, flags=re.IGNORECASE):
-            dob_idx = i
-            break
-    if dob_idx is None:
-        return None
-    # pick previous non-empty, non-header line
-    boiler = re.compile(r"(government of india|unique identification authority|uidai|aadhaar|भारत सरकार|भारत)", re.IGNORECASE)
-    for j in range(dob_idx - 1, max(-1, dob_idx - 6), -1):
-        cand = lines[j]
-        if boiler.search(cand):
-            continue
-        if len(cand) >= 3:
-            return cand
-    return None
+def _aadhaar_field(value: str, start: int, end: int, line: int, confidence: float) -> Dict[str, Any]:
+    return {"value": value, "start": start, "end": end, "line": line, "confidence": confidence}
 
-def _extract_address_from_back_text(back_text: str) -> Optional[str]:
+def _extract_aadhaar_fields(text: str) -> Dict[str, Dict[str, Any]]:
     """
-    Attached Aadhaar back format includes:
-      Address:
-      <multi-line address>
-      <State> - <PIN>
+    Parse Aadhaar front/back OCR text in one pass.
+    Returns {field: {"value", "start", "end", "line", "confidence"}} for the fields found among
+    aadhaar_number, vid, name, dob, gender, address and pin_code. Offsets are into
+    `_normalize_text(text)`; `line` is the index among its non-empty lines.
+    Layout rules follow the attached card: Name on the line above "DOB:", address after
+    "Address:" up to the UIDAI footer / VID / Aadhaar number, trimmed after the PIN.
     """
-    t = _normalize_text(back_text)
+    t = _normalize_text(text)
     if not t:
-        return None
-    m = re.search(r"\bAddress\s*:\s*(.+)", t, flags=re.IGNORECASE | re.DOTALL)
-    if not m:
-        return None
-    blob = m.group(1)
-    # stop at UIDAI footer markers / or Aadhaar number line
-    for sm in [
-        r"\bUnique Identification Authority\b",
-        r"\bUIDAI\b",
-        r"\bhelp@uidai\.gov\.in\b",
-        r"\bwww\.uidai\.gov\.in\b",
-        r"\bAadhaar is proof of identity\b",
-        r"\bVID\b",
-        r"\b(\d{4}\s?\d{4}\s?\d{4})\b",
-    ]:
-        mm = re.search(sm, blob, flags=re.IGNORECASE)
-        if mm:
-            blob = blob[: mm.start()]
+        return {}
+
+    # Non-empty lines with their start offsets (for line lookup and the name rule)
+    line_starts: List[int] = []
+    lines: List[str] = []
+    pos = 0
+    for raw in t.split("\n"):
+        if raw.strip():
+            line_starts.append(pos)
+            lines.append(raw.strip())
+        pos += len(raw) + 1
+
+    def line_of(offset: int) -> int:
+        return max(0, bisect.bisect_right(line_starts, offset) - 1)
+
+    fields: Dict[str, Dict[str, Any]] = {}
+    aadhaar_tokens: List[Tuple[str, int, int]] = []
+    address_start: Optional[int] = None
+    address_end: Optional[int] = None
+    address_pin: Optional[Tuple[str, int, int]] = None
+    first_pin: Optional[Tuple[str, int, int]] = None
+    dob_line: Optional[int] = None
+
+    for m in _AADHAAR_TOKEN_RE.finditer(t):
+        kind = m.lastgroup
+        start, end = m.span()
+        in_address = address_start is not None and address_end is None and start >= address_start
+        if in_address and kind in _AADHAAR_ADDRESS_STOPS:
+            address_end = start
+
+        if kind == "vid":
+            num = re.sub(r"\s+", "", m.group("vid_num") or "")
+            if "vid" not in fields and len(num) == 16 and num.isdigit():
+                fields["vid"] = _aadhaar_field(num, m.start("vid_num"), m.end("vid_num"), line_of(start), 0.9)
+        elif kind == "dob_label":
+            if dob_line is None:
+                dob_line = line_of(start)
+            raw_dob = m.group("dob")
+            if raw_dob and "dob" not in fields:
+                raw_dob = raw_dob.replace("-", "/")
+                try:
+                    value, conf = date_parser.parse(raw_dob, dayfirst=True).date().isoformat(), 0.9
+                except Exception:
+                    value, conf = raw_dob, 0.5
+                fields["dob"] = _aadhaar_field(value, m.start("dob"), m.end("dob"), line_of(start), conf)
+        elif kind == "address_label":
+            if address_start is None:
+                address_start = end
+        elif kind == "aadhaar":
+            aadhaar_tokens.append((re.sub(r"\s+", "", m.group(0)), start, end))
+        elif kind == "pin":
+            if first_pin is None:
+                first_pin = (m.group(0), start, end)
+            if in_address and address_end is None and address_pin is None:
+                address_pin = (m.group(0), start, end)
+        elif kind == "gender":
+            # Male anywhere takes precedence over Female (the card's own precedence rule)
+            word = m.group(0)
+            value = _AADHAAR_GENDERS[word.upper()]
+            if "gender" not in fields or (value == "Male" and fields["gender"]["value"] != "Male"):
+                fields["gender"] = _aadhaar_field(value, start, end, line_of(start), 0.9 if word.isascii() else 0.85)
+
+    number = _pick_aadhaar_candidate([num for num, _s, _e in aadhaar_tokens])
+    if number:
+        _num, start, end = next(tok for tok in aadhaar_tokens if tok[0] == number)
+        fields["aadhaar_number"] = _aadhaar_field(number, start, end, line_of(start), 0.95 if _verhoeff_check(number) else 0.5)
+
+    if dob_line is not None:
+        for j in range(dob_line - 1, max(-1, dob_line - 6), -1):
+            cand = lines[j]
+            if _AADHAAR_BOILERPLATE_RE.search(cand) or len(cand) < 3:
+                continue
+            fields["name"] = _aadhaar_field(cand, line_starts[j], line_starts[j] + len(cand), j, 0.6)
             break
-    # trim after PIN if present
-    pin_m = re.search(r"\b(\d{6})\b", blob)
-    if pin_m:
-        blob = blob[: pin_m.end()]
-    blob = _normalize_text(blob)
-    return blob or None
-
-def _extract_pin_from_text(text: str) -> Optional[str]:
-    t = _normalize_text(text)
-    m = re.search(r"\b(\d{6})\b", t)
-    return m.group(1) if m else None
+
+    if address_start is not None:
+        end = address_pin[2] if address_pin else (address_end if address_end is not None else len(t))
+        address = _normalize_text(t[address_start:end])
+        if address:
+            fields["address"] = _aadhaar_field(address, address_start, end, line_of(address_start), 0.8 if address_pin else 0.5)
+
+    pin = address_pin or first_pin
+    if pin:
+        fields["pin_code"] = _aadhaar_field(pin[0], pin[1], pin[2], line_of(pin[1]), 0.85 if address_pin else 0.5)
+    return fields
+
+def _aadhaar_field_values(fields: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """Plain {field: value} view of `_extract_aadhaar_fields` output (missing fields are None)."""
+    names = ("aadhaar_number", "vid", "name", "dob", "gender", "address", "pin_code")
+    return {k: (fields[k]["value"] if k in fields else None) for k in names}
 
 def _parse_aadhaar_printletter_xml(xml_text: str) -> Optional[Dict[str, Any]]:
     """
@@ -2768,10 +4485,8 @@ def _extract_aadhaar_number(payload: Any) -> Optional[str]:
         if not text:
             return
         # common print format: "1234 5678 9012" or "123456789012"
-        for m in re.findall(r"\b(\d{4}\s?\d{4}\s?\d{4})\b", text):
+        for m in _AADHAAR_NUMBER_RE.findall(text):
             candidates.append(re.sub(r"\s+", "", m))
-        for m in re.findall(r"\b(\d{12})\b", text):
-            candidates.append(m)
 
     if isinstance(payload, dict):
         for k in ["aadhaar_number", "aadhar_number", "uid", "uidai", "number", "aadhaar"]:
@@ -2797,15 +4512,8 @@ def _extract_aadhaar_number(payload: Any) -> Optional[str]:
             seen.add(c)
             uniq.append(c)
 
-    # prefer a Verhoeff-valid candidate
-    for c in uniq:
-        if len(c) == 12 and _verhoeff_check(c):
-            return c
-    # else return first 12-digit candidate (invalid checksum)
-    for c in uniq:
-        if len(c) == 12 and c.isdigit():
-            return c
-    return None
+    # prefer a Verhoeff-valid candidate, else the first 12-digit one
+    return _pick_aadhaar_candidate(uniq)
 
 @aadhaar_router.post("/verify", response_model=AadhaarVerificationResponse)
 async def verify_aadhaar_card(image_file: UploadFile = File(...)):
@@ -2817,41 +4525,33 @@ async def verify_aadhaar_card(image_file: UploadFile = File(...)):
     """
     try:
         image_content = await image_file.read()
-        image_base64 = base64.b64encode(image_content).decode("utf-8")
+        pipeline = _ImagePipeline(image_content)
 
         extracted: Dict[str, Any] = {}
         confidence = 0.0
         validation_errors: List[str] = []
 
-        # Try Gemini Vision via emergentintegrations (same pattern as /ocr/verify)
+        # Try Gemini Vision through the LLM gateway (same pattern as /ocr/verify)
         try:
-            from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent  # type: ignore[import-not-found]
-
-            api_key = os.environ.get("EMERGENT_LLM_KEY", "")
-            if api_key:
-                chat = LlmChat(
-                    api_key=api_key,
-                    session_id=f"aadhaar_{uuid.uuid4()}",
+            if _llm_gateway.is_configured():
+                resp = await _llm_gateway.complete(
+                    "gemini", "gemini-2.5-flash",
                     system_message=(
                         "You are an OCR + document parsing expert. Extract Aadhaar card fields and return STRICT JSON. "
                         "Keys: name, aadhaar_number, dob_or_yob, gender, address. "
                         "If a field is missing, set it to null. Do not include extra commentary."
                     ),
-                )
-                chat.with_model("gemini", "gemini-2.5-flash")
-
-                image_content_obj = ImageContent(image_base64=image_base64)
-                user_message = UserMessage(
                     text="Extract Aadhaar card details. Return strict JSON only.",
-                    file_contents=[image_content_obj],
+                    image_base64=pipeline.base64,
                 )
-                resp = await chat.send_message(user_message)
 
                 try:
                     extracted = json.loads(resp) if isinstance(resp, str) else {"raw_text": str(resp)}
                 except Exception:
                     extracted = {"raw_text": resp}
                 confidence = 0.92
+        except HTTPException:
+            raise
         except Exception as ocr_error:
             logger.warning(f"Aadhaar OCR (Gemini) not available: {ocr_error}")
 
@@ -2926,18 +4626,20 @@ async def verify_aadhaar_rules(request: AadhaarRulesVerifyRequest):
 
     # Text parsing based on attached layout
     if front_text:
-        extracted.setdefault("name", _extract_name_from_front_text(front_text))
-        extracted.setdefault("dob", _extract_dob_from_text(front_text))
-        extracted.setdefault("gender", _extract_gender_from_text(front_text))
+        front = _aadhaar_field_values(_extract_aadhaar_fields(front_text))
+        extracted.setdefault("name", front["name"])
+        extracted.setdefault("dob", front["dob"])
+        extracted.setdefault("gender", front["gender"])
         # Aadhaar number often printed on front too
-        extracted.setdefault("aadhaar_number_raw", _extract_aadhaar_number(front_text))
-        extracted.setdefault("vid_raw", _extract_vid_from_text(front_text))
+        extracted.setdefault("aadhaar_number_raw", front["aadhaar_number"])
+        extracted.setdefault("vid_raw", front["vid"])
 
     if back_text:
-        extracted.setdefault("address", _extract_address_from_back_text(back_text))
-        extracted.setdefault("pin_code", _extract_pin_from_text(back_text))
-        extracted.setdefault("aadhaar_number_raw", _extract_aadhaar_number(back_text) or extracted.get("aadhaar_number_raw"))
-        extracted.setdefault("vid_raw", _extract_vid_from_text(back_text) or extracted.get("vid_raw"))
+        back = _aadhaar_field_values(_extract_aadhaar_fields(back_text))
+        extracted.setdefault("address", back["address"])
+        extracted.setdefault("pin_code", back["pin_code"])
+        extracted.setdefault("aadhaar_number_raw", back["aadhaar_number"] or extracted.get("aadhaar_number_raw"))
+        extracted.setdefault("vid_raw", back["vid"] or extracted.get("vid_raw"))
 
     aadhaar_num = (extracted.get("aadhaar_number") or extracted.get("aadhaar_number_raw") or "").strip()
     aadhaar_num = re.sub(r"\s+", "", str(aadhaar_num))
@@ -2991,6 +4693,40 @@ async def verify_aadhaar_rules(request: AadhaarRulesVerifyRequest):
         vid_masked=vid_masked,
     )
 
+@aadhaar_router.post("/verhoeff/bulk")
+async def verhoeff_bulk(file: UploadFile = File(...)):
+    """
+    Bulk Verhoeff validation for reconciliation jobs.
+    Upload newline-delimited Aadhaar/VID numbers (spaces inside a number are ignored). The response
+    streams one flag per input line, in order: `1` (checksum valid) or `0` (invalid / not digits /
+    longer than AADHAAR_BULK_MAX_DIGITS). Lines are validated in chunks of about
+    AADHAAR_BULK_CHUNK_BYTES off the event loop, and each chunk's flags are sent as soon as it is done.
+    """
+    if np is None:
+        raise HTTPException(status_code=503, detail="NumPy is not available. Install backend deps: `pip install -r backend/requirements.txt`.")
+    chunk_bytes = int(os.environ.get("AADHAAR_BULK_CHUNK_BYTES", str(4 * 1024 * 1024)))
+    max_digits = int(os.environ.get("AADHAAR_BULK_MAX_DIGITS", "32"))
+    data = await file.read()
+
+    def _flags(lines: List[bytes]) -> bytes:
+        valid = _verhoeff_check_many(lines, max_len=max_digits)
+        return np.where(valid, b"1\n", b"0\n").astype("S2").tobytes()
+
+    async def _stream():
+        start = 0
+        while start < len(data):
+            # Cut at the first newline after the chunk budget so no record is split
+            end = data.find(b"\n", start + chunk_bytes)
+            end = len(data) if end < 0 else end + 1
+            lines = data[start:end].split(b"\n")
+            if not lines[-1].strip():
+                lines.pop()  # chunk ends on a newline, not an extra record
+            start = end
+            if lines:
+                yield await asyncio.to_thread(_flags, lines)
+
+    return StreamingResponse(_stream(), media_type="text/plain")
+
 def _normalize_name(name: str) -> str:
     """Normalize name for comparison (remove extra spaces, convert to uppercase)"""
     if not name:
@@ -3059,6 +4795,66 @@ def _compare_fields(entered: str, extracted: Optional[str], field_type: str = "t
         # Default text comparison
         return str(entered).strip().lower() == str(extracted).strip().lower()
 
+def _aadhaar_form_ocr_text(pipeline: _ImagePipeline) -> str:
+    """
+    Tesseract OCR tuned for Aadhaar cards: grayscale, downscaled to <=1500px, contrast boosted.
+    Raises 503 if Tesseract is not usable.
+    """
+    global pytesseract
+    # Grayscale + downscale for faster OCR (color not needed for text extraction)
+    img = pipeline.ocr_image(max_side=1500)
+    if img is None:
+        raise HTTPException(status_code=422, detail="Invalid document image. Please upload a valid JPG, PNG or PDF.")
+    
+    # Enhance contrast for better OCR accuracy
+    try:
+        if ImageEnhance is not None:
+            enhancer = ImageEnhance.Contrast(img)
+            img = enhancer.enhance(1.5)  # Increase contrast by 50%
+    except Exception:
+        pass  # Continue without enhancement if it fails
+    
+    # Use Tesseract directly (much faster than EasyOCR)
+    # Skip EasyOCR entirely for speed - Tesseract is sufficient for Aadhaar cards
+    try:
+        if pytesseract is None:
+            import pytesseract as pt
+            pytesseract = pt
+            # Set Tesseract path for macOS Homebrew installation
+            tesseract_paths = [
+                '/opt/homebrew/bin/tesseract',  # Homebrew on Apple Silicon
+                '/usr/local/bin/tesseract',     # Homebrew on Intel Mac
+                '/usr/bin/tesseract',           # System installation
+            ]
+            for path in tesseract_paths:
+                if os.path.exists(path):
+                    pytesseract.pytesseract.tesseract_cmd = path
+                    logger.info(f"Tesseract found at: {path}")
+                    break
+        
+        # Use optimized Tesseract config for faster processing
+        # PSM 6: Assume uniform block of text (faster)
+        # OEM 3: Default OCR engine mode
+        custom_config = r'--oem 3 --psm 6'
+        
+        # Perform OCR with English (faster than English+Hindi)
+        # Aadhaar cards have English text, so English-only is sufficient
+        try:
+            ocr_text = pytesseract.image_to_string(img, lang='eng', config=custom_config)
+        except Exception as lang_error:
+            logger.warning(f"Tesseract with config failed: {lang_error}, trying default")
+            # Fallback to default config
+            ocr_text = pytesseract.image_to_string(img, lang='eng')
+        
+        logger.info(f"Tesseract extracted text: {ocr_text[:200]}...")
+        return ocr_text
+    except Exception as tesseract_error:
+        logger.error(f"Tesseract OCR failed: {tesseract_error}")
+        raise HTTPException(
+            status_code=503,
+            detail="OCR processing is not available. Please install: pip install pillow pytesseract. Make sure Tesseract is installed on your system."
+        )
+
 @aadhaar_router.post("/verify-with-form", response_model=AadhaarFormVerifyResponse)
 async def verify_aadhaar_with_form(
     name: str = Form(...),
@@ -3080,133 +4876,69 @@ async def verify_aadhaar_with_form(
         file_content = await image_file.read()
         file_extension = image_file.filename.split('.')[-1].lower() if image_file.filename else ''
         
-        # Convert PDF to image if needed (basic support)
-        image_bytes = file_content
-        if file_extension == 'pdf':
-            try:
-                from pdf2image import convert_from_bytes
-                images = convert_from_bytes(file_content)
-                if images:
-                    img_io = io.BytesIO()
-                    images[0].save(img_io, format='PNG')
-                    image_bytes = img_io.getvalue()
-            except Exception as pdf_error:
-                logger.warning(f"PDF conversion failed: {pdf_error}")
-                raise HTTPException(
-                    status_code=400,
-                    detail="PDF processing not available. Please upload an image file (JPG, PNG)."
-                )
-        
-        image_base64 = base64.b64encode(image_bytes).decode("utf-8")
-        
-        # Extract details from image using open-source OCR
         extracted: Dict[str, Any] = {}
         confidence = 0.0
         validation_errors: List[str] = []
-        ocr_text = ""
         
-        # Preprocess image for faster OCR (do this once, use for both OCR engines)
         if Image is None:
             raise HTTPException(
                 status_code=503,
                 detail="OCR processing requires PIL/Pillow. Please install: pip install pillow pytesseract"
             )
         
-        img = Image.open(io.BytesIO(image_bytes))
-        
-        # Aggressive image optimization for faster OCR
-        max_size = 1500  # Reduced from 2000 for faster processing
-        width, height = img.size
-        
-        # Resize if image is too large
-        if width > max_size or height > max_size:
-            scale = min(max_size / width, max_size / height)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            logger.info(f"Resized image from {width}x{height} to {new_width}x{new_height} for faster OCR")
-        
-        # Convert to grayscale for faster OCR (color not needed for text extraction)
-        if img.mode != 'L':
-            img = img.convert('L')
-        
-        # Enhance contrast for better OCR accuracy
-        try:
-            if ImageEnhance is not None:
-                enhancer = ImageEnhance.Contrast(img)
-                img = enhancer.enhance(1.5)  # Increase contrast by 50%
-        except Exception:
-            pass  # Continue without enhancement if it fails
-        
-        # Use Tesseract directly (much faster than EasyOCR)
-        # Skip EasyOCR entirely for speed - Tesseract is sufficient for Aadhaar cards
-        try:
-            global pytesseract
-            if pytesseract is None:
-                import pytesseract as pt
-                pytesseract = pt
-                # Set Tesseract path for macOS Homebrew installation
-                import os
-                tesseract_paths = [
-                    '/opt/homebrew/bin/tesseract',  # Homebrew on Apple Silicon
-                    '/usr/local/bin/tesseract',     # Homebrew on Intel Mac
-                    '/usr/bin/tesseract',           # System installation
-                ]
-                for path in tesseract_paths:
-                    if os.path.exists(path):
-                        pytesseract.pytesseract.tesseract_cmd = path
-                        logger.info(f"Tesseract found at: {path}")
-                        break
+        # PDFs (e.g. multi-page e-Aadhaar) are rasterised lazily page by page; images are a single "page".
+        # Each page is decoded once and shared by OCR and QR.
+        if file_extension == 'pdf':
+            pages = _iter_pdf_page_pipelines(file_content)
+        else:
+            pages = iter([_ImagePipeline(file_content)])
+        
+        extracted_name = extracted_dob = extracted_aadhaar = extracted_gender = ""
+        ocr_texts: List[str] = []
+        qr_found = False
+        pages_scanned = 0
+        for pipeline in pages:
+            pages_scanned += 1
+            ocr_text = _aadhaar_form_ocr_text(pipeline)
+            ocr_texts.append(ocr_text)
+            confidence = max(confidence, 0.70)
             
-            # Use optimized Tesseract config for faster processing
-            # PSM 6: Assume uniform block of text (faster)
-            # OEM 3: Default OCR engine mode
-            custom_config = r'--oem 3 --psm 6'
+            # Extract structured data from OCR result in one pass (first page that has a field wins)
+            page_fields = _aadhaar_field_values(_extract_aadhaar_fields(ocr_text))
+            extracted_name = extracted_name or page_fields["name"] or ""
+            extracted_dob = extracted_dob or page_fields["dob"] or ""
+            extracted_aadhaar = extracted_aadhaar or page_fields["aadhaar_number"] or ""
+            extracted_gender = extracted_gender or page_fields["gender"] or ""
             
-            # Perform OCR with English (faster than English+Hindi)
-            # Aadhaar cards have English text, so English-only is sufficient
-            try:
-                ocr_text = pytesseract.image_to_string(img, lang='eng', config=custom_config)
-            except Exception as lang_error:
-                logger.warning(f"Tesseract with config failed: {lang_error}, trying default")
-                # Fallback to default config
-                ocr_text = pytesseract.image_to_string(img, lang='eng')
+            # Also try to extract from QR code if present on this page
+            if not qr_found:
+                try:
+                    if cv2 is not None and np is not None:
+                        qr_text = _decode_qr_text_from_image(pipeline)
+                        if qr_text:
+                            qr_data = _parse_aadhaar_qr_payload(qr_text)
+                            if qr_data:
+                                qr_found = True
+                                # QR code data is more reliable, use it if available
+                                extracted_name = extracted_name or qr_data.get("name") or ""
+                                extracted_dob = extracted_dob or qr_data.get("dob") or qr_data.get("yob") or ""
+                                extracted_aadhaar = extracted_aadhaar or qr_data.get("aadhaar_number") or ""
+                                extracted_gender = extracted_gender or qr_data.get("gender") or ""
+                                confidence = max(confidence, 0.90)  # QR code is more reliable
+                                logger.info("QR code data extracted successfully")
+                except Exception as qr_error:
+                    logger.warning(f"QR code extraction failed: {qr_error}")
             
-            extracted = {"raw_text": ocr_text}
-            confidence = 0.70
-            logger.info(f"Tesseract extracted text: {ocr_text[:200]}...")
-        except Exception as tesseract_error:
-            logger.error(f"Tesseract OCR failed: {tesseract_error}")
-            raise HTTPException(
-                status_code=503,
-                detail="OCR processing is not available. Please install: pip install pillow pytesseract. Make sure Tesseract is installed on your system."
-            )
+            # Stop rasterising further pages once we have both the number and the QR
+            if extracted_aadhaar and qr_found:
+                break
         
-        # Extract structured data from OCR result
-        # Since we're using open-source OCR, we extract from raw_text using regex patterns
-        raw_text = extracted.get("raw_text", "")
-        extracted_name = _extract_name_from_front_text(raw_text) or ""
-        extracted_dob = _extract_dob_from_text(raw_text) or ""
-        extracted_aadhaar = _extract_aadhaar_number(raw_text) or ""
-        extracted_gender = _extract_gender_from_text(raw_text) or ""
+        if pages_scanned == 0:
+            raise HTTPException(status_code=400, detail="Uploaded document has no readable pages.")
         
-        # Also try to extract from QR code if present in the image
-        try:
-            if cv2 is not None and np is not None:
-                # Decode QR code from image
-                qr_text = _decode_qr_text_from_image_bytes(image_bytes)
-                if qr_text:
-                    qr_data = _parse_aadhaar_qr_payload(qr_text)
-                    if qr_data:
-                        # QR code data is more reliable, use it if available
-                        extracted_name = extracted_name or qr_data.get("name", "")
-                        extracted_dob = extracted_dob or qr_data.get("dob", "") or qr_data.get("yob", "")
-                        extracted_aadhaar = extracted_aadhaar or qr_data.get("uid", "")
-                        extracted_gender = extracted_gender or qr_data.get("gender", "")
-                        confidence = max(confidence, 0.90)  # QR code is more reliable
-                        logger.info("QR code data extracted successfully")
-        except Exception as qr_error:
-            logger.warning(f"QR code extraction failed: {qr_error}")
+        extracted = {"raw_text": "\n\n".join(ocr_texts)}
+        if file_extension == 'pdf':
+            extracted["pages_scanned"] = pages_scanned
         
         # Normalize extracted Aadhaar number
         extracted_aadhaar = _normalize_aadhaar_number(extracted_aadhaar)
@@ -3315,27 +5047,215 @@ async def verify_aadhaar_with_form(
 # ===================== OCR READER CACHE =====================
 _easyocr_reader = None
 
-def _get_easyocr_reader():
-    """Get or initialize EasyOCR reader (cached for performance)"""
-    global _easyocr_reader
-    if _easyocr_reader is None:
+def _get_easyocr_reader():
+    """Get or initialize EasyOCR reader (cached for performance)"""
+    global _easyocr_reader
+    if _easyocr_reader is None:
+        try:
+            import easyocr
+            # Initialize reader with English and Hindi support
+            # This may take a few seconds on first run (downloads models)
+            _easyocr_reader = easyocr.Reader(['en', 'hi'], gpu=False)
+            logger.info("EasyOCR reader initialized successfully")
+        except ImportError:
+            logger.warning("EasyOCR not available")
+            _easyocr_reader = False  # Mark as unavailable
+        except Exception as e:
+            logger.error(f"Failed to initialize EasyOCR: {e}")
+            _easyocr_reader = False
+    return _easyocr_reader if _easyocr_reader is not False else None
+
+# ===================== INFERENCE BACKENDS =====================
+class _OpenCVDnnBackend:
+    """ONNX model on OpenCV DNN. Holds per-call input state, so one instance per pool slot."""
+
+    name = "opencv"
+
+    def __init__(self, model_path: Path):
+        self.net = cv2.dnn.readNetFromONNX(str(model_path))
+        # Prefer CPU by default (portable); allow override
+        backend = os.environ.get("OPENCV_DNN_BACKEND", "default").lower()
+        target = os.environ.get("OPENCV_DNN_TARGET", "cpu").lower()
+        if backend == "opencv":
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        if target == "cpu":
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def infer(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward()
+
+class _OnnxRuntimeBackend:
+    """
+    ONNX model on ONNX Runtime (CPU) with full graph optimisation and bounded intra-op threads.
+    Works with int8-quantised (QDQ) exports as-is; point the model path at the quantised file.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path: Path, intra_op_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort  # type: ignore
+        except Exception as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"ONNX Runtime backend selected but `onnxruntime` is not available: {e}. Install `onnxruntime`.",
+            )
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = (
+            intra_op_threads
+            or int(os.environ.get("ONNXRUNTIME_INTRA_OP_THREADS", "0"))
+            or _model_threads_per_instance
+            or 0
+        )
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def infer(self, blob):
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(blob, dtype=np.float32)})[0]
+
+_INFERENCE_BACKENDS = {
+    "opencv": _OpenCVDnnBackend,
+    "onnxruntime": _OnnxRuntimeBackend,
+}
+
+def _create_inference_backend(model_path: Path, backend_name: str):
+    """Instantiate an inference backend by name (`opencv` | `onnxruntime`)."""
+    backend_cls = _INFERENCE_BACKENDS.get((backend_name or "opencv").strip().lower())
+    if backend_cls is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Unknown inference backend '{backend_name}'. Use one of: {', '.join(_INFERENCE_BACKENDS)}.",
+        )
+    return backend_cls(model_path)
+
+class _SFaceOnnxRecognizer:
+    """
+    SFace feature extraction on a non-OpenCV backend.
+    Alignment and matching stay on cv2.FaceRecognizerSF; only the CNN forward pass is swapped.
+    Mirrors OpenCV's SFace preprocessing (112x112, BGR->RGB, no scaling).
+    """
+
+    def __init__(self, cv_recognizer, backend):
+        self._cv = cv_recognizer
+        self._backend = backend
+
+    def alignCrop(self, img, face_row):
+        return self._cv.alignCrop(img, face_row)
+
+    def feature(self, aligned):
+        blob = cv2.dnn.blobFromImage(aligned, 1.0, (112, 112), (0, 0, 0), swapRB=True, crop=False)
+        return np.asarray(self._backend.infer(blob), dtype=np.float32).reshape(1, -1)
+
+    def match(self, feat1, feat2, dis_type):
+        return self._cv.match(feat1, feat2, dis_type)
+
+# ===================== MODEL POOL =====================
+def _default_pool_size() -> int:
+    return max(1, os.cpu_count() or 1)
+
+# Threads each pooled ONNX Runtime session may use (None until a pool exists); see `_limit_model_threads`
+_model_threads_per_instance: Optional[int] = None
+
+def _limit_model_threads(pool_size: int) -> int:
+    """
+    Keep pool_size x threads-per-call within the CPU cores: every pooled instance can run at once,
+    so one thread per core per call would oversubscribe under load. The computed cores // pool_size
+    only bounds ONNX Runtime sessions (unless ONNXRUNTIME_INTRA_OP_THREADS is set); the smallest value
+    across pools wins. `cv2.setNumThreads` is process-wide (it also drives decode, OCR and QR
+    preprocessing), so OpenCV is only limited when MODEL_THREADS_PER_INSTANCE is set explicitly.
+    """
+    global _model_threads_per_instance
+    explicit = int(os.environ.get("MODEL_THREADS_PER_INSTANCE", "0"))
+    threads = explicit if explicit > 0 else max(1, (os.cpu_count() or 1) // max(1, int(pool_size)))
+    if _model_threads_per_instance is None or threads < _model_threads_per_instance:
+        _model_threads_per_instance = threads
+        if explicit > 0 and cv2 is not None:
+            cv2.setNumThreads(threads)
+        logger.info(
+            f"Model pool threads: {threads} per instance (pool size {pool_size}, {os.cpu_count()} cores); "
+            + ("OpenCV limited via MODEL_THREADS_PER_INSTANCE" if explicit > 0 else "OpenCV left at its default")
+        )
+    return _model_threads_per_instance
+
+class _ModelPool:
+    """
+    Fixed-size pool of model instances.
+    OpenCV face/DNN objects are stateful (`setInputSize`, `setInput`) and must not be shared
+    between threads, so each request checks out its own instance and returns it afterwards.
+    Instances are created lazily up to `size` (or eagerly via `warm()` at startup).
+    """
+
+    def __init__(self, name: str, factory, size: int):
+        self.name = name
+        self.size = max(1, int(size))
+        self._factory = factory
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()  # LIFO keeps recently used instances hot
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self._created >= self.size:
+                return False
+            self._created += 1
+            return True
+
+    def _build(self):
         try:
-            import easyocr
-            # Initialize reader with English and Hindi support
-            # This may take a few seconds on first run (downloads models)
-            _easyocr_reader = easyocr.Reader(['en', 'hi'], gpu=False)
-            logger.info("EasyOCR reader initialized successfully")
-        except ImportError:
-            logger.warning("EasyOCR not available")
-            _easyocr_reader = False  # Mark as unavailable
-        except Exception as e:
-            logger.error(f"Failed to initialize EasyOCR: {e}")
-            _easyocr_reader = False
-    return _easyocr_reader if _easyocr_reader is not False else None
+            return self._factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def warm(self, count: Optional[int] = None, prime=None) -> int:
+        """
+        Create instances up front (default: fill the pool). Returns the number of instances created.
+        `prime(instance)` runs a dummy inference on each new instance before it becomes available;
+        an instance that fails priming is discarded (its slot is freed for a lazy retry) and the error raised.
+        """
+        target = self.size if count is None else min(int(count), self.size)
+        while self._created < target and self._reserve():
+            inst = self._build()
+            if prime is not None:
+                try:
+                    prime(inst)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            self._idle.put(inst)
+        return self._created
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None):
+        """Blocking checkout; call from a worker thread (not the event loop)."""
+        if timeout is None:
+            timeout = float(os.environ.get("MODEL_POOL_CHECKOUT_TIMEOUT_SECONDS", "30"))
+        try:
+            inst = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve():
+                inst = self._build()
+            else:
+                try:
+                    inst = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise HTTPException(status_code=503, detail=f"{self.name} models are busy. Please retry.")
+        try:
+            yield inst
+        finally:
+            self._idle.put(inst)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
 
 # ===================== FACIAL RECOGNITION ENDPOINTS =====================
-_face_detector = None
-_face_recognizer = None
+_face_model_pool: Optional[_ModelPool] = None
 
 def _require_opencv_face() -> None:
     if cv2 is None or np is None:
@@ -3344,17 +5264,7 @@ def _require_opencv_face() -> None:
             detail="OpenCV is not available. Install backend deps: `pip install -r backend/requirements.txt` (needs opencv-contrib-python).",
         )
 
-def _get_face_models():
-    """
-    Lazy-load OpenCV face detector + recognizer.
-    Uses YuNet for detection and SFace for recognition (both ONNX).
-    """
-    global _face_detector, _face_recognizer
-    _require_opencv_face()
-
-    if _face_detector is not None and _face_recognizer is not None:
-        return _face_detector, _face_recognizer
-
+def _face_model_paths():
     models_dir = ROOT_DIR / "models"
     det_path = Path(os.environ.get("FACE_DETECTOR_MODEL_PATH", str(models_dir / "face_detection_yunet_2022mar.onnx")))
     rec_path = Path(os.environ.get("FACE_RECOGNIZER_MODEL_PATH", str(models_dir / "face_recognition_sface_2021dec.onnx")))
@@ -3369,20 +5279,40 @@ def _get_face_models():
                 + ", ".join(missing)
             ),
         )
+    return det_path, rec_path
 
+def _create_face_models():
+    """
+    Build one OpenCV face detector + recognizer pair.
+    Uses YuNet for detection and SFace for recognition (both ONNX).
+    """
+    det_path, rec_path = _face_model_paths()
     # Detector input size will be set per-image via setInputSize()
     score_thr = float(os.environ.get("FACE_DETECTOR_SCORE_THRESHOLD", "0.9"))
     nms_thr = float(os.environ.get("FACE_DETECTOR_NMS_THRESHOLD", "0.3"))
     top_k = int(os.environ.get("FACE_DETECTOR_TOPK", "5000"))
-    _face_detector = cv2.FaceDetectorYN.create(str(det_path), "", (320, 320), score_thr, nms_thr, top_k)
-    _face_recognizer = cv2.FaceRecognizerSF.create(str(rec_path), "")
-    return _face_detector, _face_recognizer
+    detector = cv2.FaceDetectorYN.create(str(det_path), "", (320, 320), score_thr, nms_thr, top_k)
+    recognizer = cv2.FaceRecognizerSF.create(str(rec_path), "")
+    # YuNet's decode/NMS lives inside cv2.FaceDetectorYN, so only SFace can move to another backend
+    backend_name = os.environ.get("FACE_RECOGNIZER_BACKEND", "opencv").strip().lower()
+    if backend_name != "opencv":
+        recognizer = _SFaceOnnxRecognizer(recognizer, _create_inference_backend(rec_path, backend_name))
+    return detector, recognizer
+
+def _get_face_model_pool() -> _ModelPool:
+    """Lazy-create the pool of (detector, recognizer) pairs; fails fast with 503 if OpenCV/models are missing."""
+    global _face_model_pool
+    _require_opencv_face()
+    if _face_model_pool is None:
+        _face_model_paths()
+        size = int(os.environ.get("FACE_MODEL_POOL_SIZE", str(_default_pool_size())))
+        _limit_model_threads(size)
+        _face_model_pool = _ModelPool("Face", _create_face_models, size)
+    return _face_model_pool
 
 def _decode_image_bytes(image_bytes: bytes):
     _require_opencv_face()
-    arr = np.frombuffer(image_bytes, dtype=np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    return img
+    return _ImagePipeline(image_bytes).bgr
 
 def _pick_largest_face(faces):
     # faces is Nx15 (YuNet); pick largest bbox area (w*h)
@@ -3414,35 +5344,68 @@ def _extract_face_feature(img, detector, recognizer):
     feat = recognizer.feature(aligned)
     return feat, face_row, count
 
-@facial_router.post("/verify", response_model=FacialVerificationResponse)
-async def verify_face(
-    reference_image: UploadFile = File(...),
-    verify_image: UploadFile = File(...)
-):
-    """Verify face against reference"""
-    try:
-        detector, recognizer = _get_face_models()
-
-        ref_content = await reference_image.read()
-        verify_content = await verify_image.read()
-
-        ref_img = _decode_image_bytes(ref_content)
-        ver_img = _decode_image_bytes(verify_content)
-        if ref_img is None or ver_img is None:
-            raise HTTPException(status_code=422, detail="Invalid image file(s). Please upload valid image formats (jpg/png).")
+# Reference photos (e.g. stored licence photos) are verified against many live captures;
+# cache their (feature, face_row, face_count) so a repeat verify needs one detection + one feature pass.
+_reference_face_cache = _TTLCache(
+    max_entries=int(os.environ.get("FACE_REF_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("FACE_REF_CACHE_TTL_SECONDS", "3600")),
+)
 
-        ref_feat, ref_face, ref_count = _extract_face_feature(ref_img, detector, recognizer)
-        ver_feat, ver_face, ver_count = _extract_face_feature(ver_img, detector, recognizer)
+def _reference_face_feature(ref_content: Optional[bytes], reference_id: Optional[str], detector, recognizer):
+    """
+    Return (feature, face_row, face_count, cached) for the reference image.
+    Keyed by SHA-256 of the image bytes; an explicit reference_id is stored as an alias so later
+    calls may send only the id. Uploaded bytes always win: the id alias is only read when no
+    image is sent, and is re-pointed at whatever the upload resolves to.
+    Raises 422 for an unknown id / invalid image.
+    """
+    id_key = f"id:{reference_id}" if reference_id else None
 
+    if not ref_content:
+        hit = _reference_face_cache.get(id_key) if id_key else None
+        if hit is None:
+            raise HTTPException(
+                status_code=422,
+                detail="Unknown or expired reference_id. Upload reference_image to (re)register it.",
+            )
+        return (*hit, True)
+
+    hash_key = f"sha256:{hashlib.sha256(ref_content).hexdigest()}"
+    hit = _reference_face_cache.get(hash_key)
+    if hit is not None:
+        if id_key:
+            _reference_face_cache.set(id_key, hit)
+        return (*hit, True)
+
+    ref_img = _decode_image_bytes(ref_content)
+    if ref_img is None:
+        raise HTTPException(status_code=422, detail="Invalid image file(s). Please upload valid image formats (jpg/png).")
+    feat, face_row, count = _extract_face_feature(ref_img, detector, recognizer)
+    if feat is None:
+        if id_key:
+            # The new upload has no usable face; don't keep serving the id's previous embedding.
+            _reference_face_cache.pop(id_key)
+        return None, None, count, False
+    entry = (feat, face_row, count)
+    _reference_face_cache.set(hash_key, entry)
+    if id_key:
+        _reference_face_cache.set(id_key, entry)
+    return feat, face_row, count, False
+
+def _verify_face_sync(pool: _ModelPool, ref_content: Optional[bytes], reference_id: Optional[str], verify_content: bytes, metric: str):
+    """Blocking part of /facial/verify: detection, features and matching on one checked-out model pair."""
+    ver_img = _decode_image_bytes(verify_content)
+    if ver_img is None:
+        raise HTTPException(status_code=422, detail="Invalid image file(s). Please upload valid image formats (jpg/png).")
+
+    with pool.checkout() as (detector, recognizer):
+        ref_feat, ref_face, ref_count, ref_cached = _reference_face_feature(ref_content, reference_id, detector, recognizer)
         if ref_feat is None:
             raise HTTPException(status_code=422, detail="No face detected in reference_image.")
+        ver_feat, ver_face, ver_count = _extract_face_feature(ver_img, detector, recognizer)
         if ver_feat is None:
             raise HTTPException(status_code=422, detail="No face detected in verify_image.")
 
-        metric = os.environ.get("FACE_MATCH_METRIC", "cosine").lower().strip()
-        if metric not in {"cosine", "l2"}:
-            metric = "cosine"
-
         if metric == "l2":
             dist = float(recognizer.match(ref_feat, ver_feat, cv2.FaceRecognizerSF_FR_NORM_L2))
             threshold = float(os.environ.get("FACE_MATCH_THRESHOLD", "1.128"))
@@ -3456,6 +5419,39 @@ async def verify_face(
             confidence = max(0.0, min(1.0, sim))
             similarity = sim
 
+    return is_match, confidence, similarity, threshold, ref_face, ref_count, ref_cached, ver_face, ver_count
+
+@facial_router.post("/verify", response_model=FacialVerificationResponse)
+async def verify_face(
+    reference_image: Optional[UploadFile] = File(None),
+    verify_image: UploadFile = File(...),
+    reference_id: Optional[str] = Form(None)
+):
+    """
+    Verify face against reference.
+    The reference embedding is cached by image hash (and by `reference_id` when given),
+    so a known reference can be sent as `reference_id` alone.
+    """
+    try:
+        pool = _get_face_model_pool()
+
+        if reference_image is None and not reference_id:
+            raise HTTPException(status_code=422, detail="Provide reference_image or a previously used reference_id.")
+        ref_content = await reference_image.read() if reference_image is not None else None
+        verify_content = await verify_image.read()
+
+        metric = os.environ.get("FACE_MATCH_METRIC", "cosine").lower().strip()
+        if metric not in {"cosine", "l2"}:
+            metric = "cosine"
+
+        # Inference runs in a worker thread on a pooled (detector, recognizer) pair
+        (
+            is_match, confidence, similarity, threshold,
+            ref_face, ref_count, ref_cached, ver_face, ver_count,
+        ) = await asyncio.to_thread(
+            _verify_face_sync, pool, ref_content, (reference_id or "").strip() or None, verify_content, metric
+        )
+
         verification_id = str(uuid.uuid4())
         
         # Log verification
@@ -3481,6 +5477,7 @@ async def verify_face(
             detected_faces_ref=ref_count,
             detected_faces_verify=ver_count,
             verification_id=verification_id,
+            reference_cached=ref_cached,
         )
     except HTTPException:
         raise
@@ -3488,8 +5485,284 @@ async def verify_face(
         logger.error(f"Facial recognition error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ===================== FACE GALLERY (ENROLMENT + 1:N IDENTIFY) =====================
+def _normalize_face_feature(feat):
+    """Flatten an SFace feature to a unit-length float32 vector (cosine == dot product)."""
+    v = np.asarray(feat, dtype=np.float32).reshape(-1)
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+class _FaceGallery:
+    """
+    In-process gallery of normalized SFace features (one row per citizen) for 1:N search.
+    - Source of truth: Mongo `face_gallery` (float32 bytes per citizen)
+    - Startup load reuses an on-disk .npy snapshot via np.load(mmap_mode="r") when its fingerprint
+      (row count + latest `enrolled_at`) matches Mongo, so same-size replacements are detected too
+    - Identify is a single matrix-vector product + argpartition for top-k
+    Rows are stored in a capacity-doubling float32 matrix so enrolment is amortized O(1).
+    """
+
+    DIM = 128
+
+    def __init__(self, snapshot_dir: Path):
+        self.snapshot_dir = snapshot_dir
+        self._matrix = None  # (capacity, DIM) float32; rows [0, size) are live
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.dirty = False
+
+    @property
+    def size(self) -> int:
+        return len(self._ids)
+
+    def _ensure_capacity(self, n: int) -> None:
+        cap = 0 if self._matrix is None else self._matrix.shape[0]
+        if n <= cap and self._matrix is not None and self._matrix.flags.writeable:
+            return
+        new_cap = max(n, 1024, cap * 2)
+        grown = np.zeros((new_cap, self.DIM), dtype=np.float32)
+        if self._matrix is not None and self.size:
+            grown[: self.size] = self._matrix[: self.size]
+        self._matrix = grown
+
+    def _set_rows(self, ids: List[str], matrix) -> None:
+        self._ids = list(ids)
+        self._index = {cid: i for i, cid in enumerate(self._ids)}
+        self._matrix = matrix
+
+    def _invalidate_snapshot(self) -> None:
+        # Row contents changed: the on-disk snapshot must not be trusted until rewritten.
+        self.dirty = True
+        try:
+            self._snapshot_paths()[1].unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    def upsert(self, citizen_id: str, feat) -> None:
+        self._invalidate_snapshot()
+        with self._lock:
+            row = self._index.get(citizen_id)
+            if row is None:
+                self._ensure_capacity(self.size + 1)
+                row = self.size
+                self._ids.append(citizen_id)
+                self._index[citizen_id] = row
+            else:
+                self._ensure_capacity(self.size)
+            self._matrix[row] = feat
+
+    def remove(self, citizen_id: str) -> bool:
+        with self._lock:
+            row = self._index.pop(citizen_id, None)
+            if row is None:
+                return False
+            self._invalidate_snapshot()
+            self._ensure_capacity(self.size)
+            last = self.size - 1
+            if row != last:
+                # swap-delete keeps the live rows contiguous
+                moved = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved
+                self._index[moved] = row
+            self._ids.pop()
+            return True
+
+    def search(self, query, top_k: int = 5):
+        """Return [(citizen_id, cosine_similarity)] for the top_k closest enrolled faces."""
+        n = self.size
+        if n == 0:
+            return []
+        scores = self._matrix[:n] @ query
+        k = max(1, min(int(top_k), n))
+        if k < n:
+            idx = np.argpartition(-scores, k - 1)[:k]
+        else:
+            idx = np.arange(n)
+        idx = idx[np.argsort(-scores[idx])]
+        return [(self._ids[i], float(scores[i])) for i in idx]
+
+    def _snapshot_paths(self):
+        return self.snapshot_dir / "features.npy", self.snapshot_dir / "ids.json"
+
+    @staticmethod
+    async def _fingerprint() -> Dict[str, Any]:
+        """Row count + latest enrolment time in Mongo; every enrol/replace bumps `enrolled_at`."""
+        rows = await db.face_gallery.aggregate([
+            {"$group": {"_id": None, "count": {"$sum": 1}, "latest": {"$max": "$enrolled_at"}}},
+        ]).to_list(1)
+        return {"count": rows[0]["count"], "latest": rows[0]["latest"]} if rows else {"count": 0, "latest": None}
+
+    def write_snapshot(self, fingerprint: Dict[str, Any]) -> None:
+        if np is None or self._matrix is None:
+            return
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            mat_path, ids_path = self._snapshot_paths()
+            np.save(mat_path, np.ascontiguousarray(self._matrix[: self.size]))
+            ids_path.write_text(json.dumps({"fingerprint": fingerprint, "ids": self._ids}))
+            self.dirty = False
+        except Exception as e:
+            logger.warning(f"Face gallery snapshot write failed: {e}")
+
+    async def save(self) -> None:
+        """Write the snapshot stamped with the current Mongo fingerprint."""
+        self.write_snapshot(await self._fingerprint())
+
+    def load_snapshot(self, fingerprint: Dict[str, Any]) -> bool:
+        """Memory-map the on-disk snapshot if it was written for `fingerprint`; False if missing or stale."""
+        mat_path, ids_path = self._snapshot_paths()
+        if not (mat_path.exists() and ids_path.exists()):
+            return False
+        try:
+            meta = json.loads(ids_path.read_text())
+            if not isinstance(meta, dict) or meta.get("fingerprint") != fingerprint:
+                return False
+            ids = meta.get("ids", [])
+            matrix = np.load(mat_path, mmap_mode="r")
+            if len(ids) != fingerprint["count"] or matrix.shape != (len(ids), self.DIM):
+                return False
+        except Exception as e:
+            logger.warning(f"Face gallery snapshot unreadable, rebuilding from MongoDB: {e}")
+            return False
+        with self._lock:
+            self._set_rows(ids, matrix)
+        self.loaded = True
+        return True
+
+    async def load(self) -> None:
+        """Load the gallery from the on-disk snapshot (memory-mapped) or rebuild it from Mongo."""
+        if np is None:
+            return
+        fingerprint = await self._fingerprint()
+        count = fingerprint["count"]
+        if self.load_snapshot(fingerprint):
+            logger.info(f"Face gallery loaded from snapshot ({count} faces, memory-mapped)")
+            return
+
+        ids: List[str] = []
+        matrix = np.zeros((max(count, 1), self.DIM), dtype=np.float32)
+        async for doc in db.face_gallery.find({}, {"_id": 0, "citizen_id": 1, "feature": 1}):
+            feat = np.frombuffer(bytes(doc["feature"]), dtype=np.float32)
+            if feat.shape[0] != self.DIM or len(ids) >= matrix.shape[0]:
+                continue
+            matrix[len(ids)] = feat
+            ids.append(doc["citizen_id"])
+        with self._lock:
+            self._set_rows(ids, matrix)
+        self.loaded = True
+        self.write_snapshot(fingerprint)
+        logger.info(f"Face gallery rebuilt from MongoDB ({len(ids)} faces)")
+
+    async def ensure_loaded(self) -> None:
+        if not self.loaded:
+            await self.load()
+
+def _single_face_feature_sync(pool: _ModelPool, image_bytes: bytes):
+    """Decode + detect + SFace feature for one image on a checked-out model pair (worker thread)."""
+    img = _decode_image_bytes(image_bytes)
+    if img is None:
+        raise HTTPException(status_code=422, detail="Invalid image file. Please upload a valid jpg/png.")
+    with pool.checkout() as (detector, recognizer):
+        return _extract_face_feature(img, detector, recognizer)
+
+_face_gallery = _FaceGallery(
+    Path(os.environ.get("FACE_GALLERY_SNAPSHOT_DIR", str(ROOT_DIR / "data" / "face_gallery")))
+)
+
+@facial_router.post("/enroll", response_model=FaceEnrollResponse)
+async def enroll_face(
+    citizen_id: str = Form(...),
+    image_file: UploadFile = File(...)
+):
+    """Enrol (or replace) a citizen's face in the 1:N gallery"""
+    try:
+        pool = _get_face_model_pool()
+        citizen_id = (citizen_id or "").strip()
+        if not citizen_id:
+            raise HTTPException(status_code=422, detail="citizen_id is required.")
+
+        feat, face_row, count = await asyncio.to_thread(_single_face_feature_sync, pool, await image_file.read())
+        if feat is None:
+            raise HTTPException(status_code=422, detail="No face detected in image_file.")
+
+        await _face_gallery.ensure_loaded()
+        vec = _normalize_face_feature(feat)
+        await db.face_gallery.update_one(
+            {"citizen_id": citizen_id},
+            {"$set": {
+                "citizen_id": citizen_id,
+                "feature": vec.tobytes(),
+                "enrolled_at": datetime.now(timezone.utc).isoformat(),
+            }},
+            upsert=True,
+        )
+        _face_gallery.upsert(citizen_id, vec)
+
+        return FaceEnrollResponse(
+            citizen_id=citizen_id,
+            enrolled=True,
+            gallery_size=_face_gallery.size,
+            face_box=_face_box(face_row),
+            detected_faces=count,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Face enrolment error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@facial_router.delete("/enroll/{citizen_id}")
+async def delete_enrolled_face(citizen_id: str):
+    """Remove a citizen from the 1:N gallery"""
+    _require_opencv_face()
+    await _face_gallery.ensure_loaded()
+    result = await db.face_gallery.delete_one({"citizen_id": citizen_id})
+    removed = _face_gallery.remove(citizen_id)
+    if not removed and result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Citizen not enrolled.")
+    return {"citizen_id": citizen_id, "removed": True, "gallery_size": _face_gallery.size}
+
+@facial_router.post("/identify", response_model=FaceIdentifyResponse)
+async def identify_face(
+    image_file: UploadFile = File(...),
+    top_k: int = Form(5)
+):
+    """1:N identify: return the top-k enrolled citizens closest to the face in the image"""
+    try:
+        pool = _get_face_model_pool()
+        feat, face_row, _count = await asyncio.to_thread(_single_face_feature_sync, pool, await image_file.read())
+        if feat is None:
+            raise HTTPException(status_code=422, detail="No face detected in image_file.")
+
+        await _face_gallery.ensure_loaded()
+        threshold = float(os.environ.get("FACE_MATCH_THRESHOLD", "0.363"))
+        top_k = max(1, min(int(top_k), 100))
+
+        started = time()
+        hits = _face_gallery.search(_normalize_face_feature(feat), top_k=top_k)
+        search_ms = (time() - started) * 1000.0
+
+        return FaceIdentifyResponse(
+            matches=[
+                FaceIdentifyMatch(citizen_id=cid, similarity=round(sim, 4), is_match=sim >= threshold)
+                for cid, sim in hits
+            ],
+            gallery_size=_face_gallery.size,
+            threshold=threshold,
+            face_box=_face_box(face_row),
+            search_ms=round(search_ms, 3),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Face identify error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ===================== VEHICLE DETECTION ENDPOINTS =====================
-_vehicle_net = None
+_vehicle_net_pool: Optional[_ModelPool] = None
 
 _COCO80 = [
     "person","bicycle","car","motorcycle","airplane","bus","train","truck","boat","traffic light",
@@ -3510,30 +5783,70 @@ def _require_opencv_vehicle() -> None:
             detail="OpenCV is not available. Install backend deps: `pip install -r backend/requirements.txt` (needs opencv-contrib-python).",
         )
 
+def _letterbox_geometry(h: int, w: int, new_shape: int):
+    """Scale ratio, resized (w, h) and (top, bottom, left, right) padding for a YOLO letterbox."""
+    r = min(new_shape / h, new_shape / w)
+    new_unpad = (int(round(w * r)), int(round(h * r)))
+    dw = (new_shape - new_unpad[0]) / 2
+    dh = (new_shape - new_unpad[1]) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return r, new_unpad, (top, bottom, left, right)
+
 def _vehicle_letterbox(img, new_shape: int = 640, color=(114, 114, 114)):
     """
     Letterbox resize while keeping aspect ratio (YOLO-style).
     Returns: resized image, scale ratio, (pad_w, pad_h)
     """
     h, w = img.shape[:2]
-    r = min(new_shape / h, new_shape / w)
-    new_unpad = (int(round(w * r)), int(round(h * r)))
+    r, new_unpad, (top, bottom, left, right) = _letterbox_geometry(h, w, new_shape)
     resized = cv2.resize(img, new_unpad, interpolation=cv2.INTER_LINEAR)
-    dw = new_shape - new_unpad[0]
-    dh = new_shape - new_unpad[1]
-    dw /= 2
-    dh /= 2
-    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
-    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
     out = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
     return out, r, (left, top)
 
-def _get_vehicle_net():
-    global _vehicle_net
-    _require_opencv_vehicle()
-    if _vehicle_net is not None:
-        return _vehicle_net
+class _LetterboxBuffer:
+    """
+    Preallocated letterbox canvas + NCHW float blob for one inference worker (pool slot).
+    `load()` resizes straight into the padded region of the canvas (no `copyMakeBorder` copy) and
+    writes BGR->RGB, HWC->CHW and the 1/255 scaling into the blob in place, so steady-state
+    detection does no per-request large allocations. Not thread-safe: use it while holding the net.
+    """
 
+    def __init__(self, size: int, pad_value: int = 114):
+        self.size = int(size)
+        self.pad_value = pad_value
+        self.canvas = np.full((self.size, self.size, 3), pad_value, dtype=np.uint8)
+        self.blob = np.empty((1, 3, self.size, self.size), dtype=np.float32)
+
+    def reserve(self, batch: int) -> None:
+        """Grow the blob to hold at least `batch` images (kept for later calls)."""
+        if self.blob.shape[0] < batch:
+            self.blob = np.empty((batch, 3, self.size, self.size), dtype=np.float32)
+
+    def load(self, img, index: int = 0):
+        """Letterbox `img` (BGR uint8) into blob slot `index`. Returns (ratio, (pad_w, pad_h))."""
+        h, w = img.shape[:2]
+        r, (new_w, new_h), (top, _bottom, left, _right) = _letterbox_geometry(h, w, self.size)
+        canvas = self.canvas
+        # Only the pad strips can hold stale pixels from a previous image of another aspect ratio
+        canvas[:top] = self.pad_value
+        canvas[top + new_h:] = self.pad_value
+        canvas[top:top + new_h, :left] = self.pad_value
+        canvas[top:top + new_h, left + new_w:] = self.pad_value
+        roi = canvas[top:top + new_h, left:left + new_w]
+        resized = cv2.resize(img, (new_w, new_h), dst=roi, interpolation=cv2.INTER_LINEAR)
+        if resized is not roi:
+            roi[...] = resized
+        scale = np.float32(1.0 / 255.0)
+        for c in range(3):
+            np.multiply(canvas[:, :, 2 - c], scale, out=self.blob[index, c], dtype=np.float32)
+        return r, (left, top)
+
+    def batch(self, n: int):
+        """View of the first `n` blob slots (contiguous, no copy)."""
+        return self.blob[:n]
+
+def _vehicle_model_path() -> Path:
     models_dir = ROOT_DIR / "models"
     model_path = Path(os.environ.get("VEHICLE_DETECTOR_MODEL_PATH", str(models_dir / "vehicle_yolov8n.onnx")))
     if not model_path.exists():
@@ -3544,101 +5857,160 @@ def _get_vehicle_net():
                 "(default: `backend/models/vehicle_yolov8n.onnx`) or set VEHICLE_DETECTOR_MODEL_PATH."
             ),
         )
-
-    net = cv2.dnn.readNetFromONNX(str(model_path))
-    # Prefer CPU by default (portable); allow override
-    backend = os.environ.get("OPENCV_DNN_BACKEND", "default").lower()
-    target = os.environ.get("OPENCV_DNN_TARGET", "cpu").lower()
-    if backend == "opencv":
-        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-    if target == "cpu":
-        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-    _vehicle_net = net
-    return _vehicle_net
+    return model_path
+
+def _vehicle_backend_name() -> str:
+    return os.environ.get("VEHICLE_DETECTOR_BACKEND", "opencv").strip().lower()
+
+def _create_vehicle_net():
+    """Build one YOLO inference backend instance (one per pool slot) with its own input buffer."""
+    net = _create_inference_backend(_vehicle_model_path(), _vehicle_backend_name())
+    net.input_buffer = _LetterboxBuffer(int(os.environ.get("VEHICLE_DETECTOR_INPUT_SIZE", "640")))
+    return net
+
+def _vehicle_input_buffer(net, input_size: int, batch: int = 1) -> _LetterboxBuffer:
+    """The checked-out net's letterbox buffer, rebuilt only if the input size changed."""
+    buf = getattr(net, "input_buffer", None)
+    if buf is None or buf.size != input_size:
+        buf = net.input_buffer = _LetterboxBuffer(input_size)
+    buf.reserve(batch)
+    return buf
+
+def _get_vehicle_net_pool() -> _ModelPool:
+    """Lazy-create the vehicle net pool; fails fast with 503 if OpenCV/the model are missing."""
+    global _vehicle_net_pool
+    _require_opencv_vehicle()
+    if _vehicle_net_pool is None:
+        _vehicle_model_path()
+        size = int(os.environ.get("VEHICLE_MODEL_POOL_SIZE", str(_default_pool_size())))
+        _limit_model_threads(size)
+        _vehicle_net_pool = _ModelPool("Vehicle", _create_vehicle_net, size)
+    return _vehicle_net_pool
 
 def _decode_vehicle_output(outputs, conf_thres: float, iou_thres: float, input_size: int, ratio: float, pad):
     """
     Support common YOLO ONNX output formats:
     - (1, N, 6): [x1,y1,x2,y2,score,class] (already NMS'd)
     - (1, 84, 8400) (YOLOv8): [cx,cy,w,h] + class scores
-    Returns list of (x,y,w,h,score,class_id) in original image pixels.
+    Returns list of (x,y,w,h,score,class_id) in original image pixels (vehicle classes only).
     """
-    if isinstance(outputs, (list, tuple)):
-        out = outputs[0]
-    else:
-        out = outputs
-
-    out = np.array(out)
-    dets = []
-
-    # Case A: already NMS'd
-    if out.ndim == 3 and out.shape[0] == 1 and out.shape[2] >= 6 and out.shape[1] >= 1:
-        # Could be (1, N, 6) OR (1, 84, 8400). Disambiguate by last dim.
-        if out.shape[2] == 6:
-            rows = out[0]
-            for r in rows:
-                x1, y1, x2, y2, score, cls = r[:6]
-                score = float(score)
-                if score < conf_thres:
-                    continue
-                cls_id = int(cls)
-                # map back from letterboxed input to original
-                left, top = pad
-                x1 = (float(x1) - left) / ratio
-                y1 = (float(y1) - top) / ratio
-                x2 = (float(x2) - left) / ratio
-                y2 = (float(y2) - top) / ratio
-                dets.append((x1, y1, max(0.0, x2 - x1), max(0.0, y2 - y1), score, cls_id))
-            return dets
-
-    # Case B: YOLOv8 raw output (1, 84, 8400) or (1, 85, 8400)
-    if out.ndim == 3 and out.shape[0] == 1 and out.shape[1] >= 5:
-        preds = out[0]
-        # transpose to (num_preds, channels)
-        preds = preds.transpose(1, 0)
-        boxes = preds[:, :4]
-        scores = preds[:, 4:]
-        cls_ids = np.argmax(scores, axis=1)
-        confs = scores[np.arange(scores.shape[0]), cls_ids]
-
-        mask = confs >= conf_thres
-        boxes = boxes[mask]
-        confs = confs[mask]
-        cls_ids = cls_ids[mask].astype(int)
-
-        if boxes.shape[0] == 0:
-            return []
-
-        # cx,cy,w,h -> x,y,w,h in input space
-        cx, cy, bw, bh = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
-        x = cx - bw / 2
-        y = cy - bh / 2
+    return _decode_vehicle_outputs_batch(outputs, conf_thres, iou_thres, [ratio], [pad])[0]
+
+def _iou_matrix(a, b):
+    """Pairwise IoU for (N,4) and (M,4) arrays of [x, y, w, h]."""
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = (a[:, 2:3] * a[:, 3:4]) + (b[:, 2] * b[:, 3]) - inter
+    return inter / np.maximum(union, 1e-6)
+
+def _nms_xywh(boxes, scores, iou_thres: float):
+    """
+    Greedy NMS over (N,4) [x, y, w, h] boxes, solved as a fixed point on the IoU matrix
+    (Cluster-NMS): a box is kept iff no *kept* higher-scored box overlaps it. Each round is one
+    matrix-vector product and the number of rounds is bounded by the longest suppression chain,
+    not by the number of boxes. Returns kept indices in descending score order.
+    """
+    order = np.argsort(-scores, kind="stable")
+    ordered = boxes[order]
+    # over[i, j]: higher-scored box i suppresses j if i is kept
+    over = np.triu(_iou_matrix(ordered, ordered) > iou_thres, k=1).astype(np.float32)
+    keep = np.ones(order.size, dtype=bool)
+    while True:
+        new_keep = (keep.astype(np.float32) @ over) == 0
+        if np.array_equal(new_keep, keep):
+            break
+        keep = new_keep
+    return order[keep]
 
-        # NMS in input-space
-        rects = np.stack([x, y, bw, bh], axis=1).tolist()
-        conf_list = confs.astype(float).tolist()
-        indices = cv2.dnn.NMSBoxes(rects, conf_list, conf_thres, iou_thres)
-        if len(indices) == 0:
-            return []
-        if isinstance(indices, np.ndarray):
-            indices = indices.flatten().tolist()
-        elif isinstance(indices, (list, tuple)) and len(indices) and isinstance(indices[0], (list, tuple, np.ndarray)):
-            indices = [int(i[0]) for i in indices]
-
-        left, top = pad
-        for i in indices:
-            xi, yi, wi, hi = rects[i]
-            score = float(conf_list[i])
-            cls_id = int(cls_ids[i])
-            # map back to original
-            xo = (float(xi) - left) / ratio
-            yo = (float(yi) - top) / ratio
-            wo = float(wi) / ratio
-            ho = float(hi) / ratio
-            dets.append((xo, yo, max(0.0, wo), max(0.0, ho), score, cls_id))
-        return dets
-
-    return []
+def _grouped_nms(boxes, scores, groups, iou_thres: float):
+    """
+    `_nms_xywh` run independently per group id (e.g. class). One IoU matrix per group, so the
+    Python loop is bounded by the number of groups regardless of how many boxes each one holds.
+    Returns kept indices (unordered across groups).
+    """
+    if not groups.size:
+        return np.empty(0, dtype=np.int64)
+    by_group = np.argsort(groups, kind="stable")
+    bounds = np.flatnonzero(np.diff(groups[by_group])) + 1
+    return np.concatenate([
+        members[_nms_xywh(boxes[members], scores[members], iou_thres)]
+        for members in np.split(by_group, bounds)
+    ])
+
+def _split_vehicle_dets(batch: int, b_idx, rows, cls_ids) -> List[List[Tuple]]:
+    """Group flat (x, y, w, h, score) rows back into one detection list per image."""
+    results: List[List[Tuple]] = [[] for _ in range(batch)]
+    for b, (x, y, w, h, sc), c in zip(b_idx.tolist(), rows.tolist(), cls_ids.tolist()):
+        results[b].append((x, y, w, h, sc, int(c)))
+    return results
+
+def _decode_vehicle_outputs_batch(outputs, conf_thres: float, iou_thres: float, ratios, pads):
+    """
+    Batched, NumPy-only YOLO post-processor for a (B, ...) network output.
+    - Only vehicle COCO ids (`_VEHICLE_COCO_IDS`) survive the score filter
+    - NMS is class-aware and per image, run once per (image, class) group with `_nms_xywh`
+    - Letterbox un-mapping is applied to all kept boxes at once
+    `ratios` is a length-B sequence, `pads` a length-B sequence of (pad_w, pad_h).
+    Returns one list of (x, y, w, h, score, class_id) per image, in original image pixels.
+    """
+    out = outputs[0] if isinstance(outputs, (list, tuple)) else outputs
+    out = np.asarray(out, dtype=np.float32)
+    ratios = np.asarray(ratios, dtype=np.float32).reshape(-1)
+    pads = np.asarray(pads, dtype=np.float32).reshape(-1, 2)
+    if out.ndim != 3:
+        return [[] for _ in range(ratios.shape[0])]
+    batch = out.shape[0]
+
+    # Case A: already NMS'd (B, N, 6): [x1,y1,x2,y2,score,class]
+    if out.shape[2] == 6:
+        keep = (out[:, :, 4] >= conf_thres) & np.isin(out[:, :, 5].astype(np.int64), _VEHICLE_COCO_IDS)
+        b_idx, n_idx = np.nonzero(keep)
+        sel = out[b_idx, n_idx]
+        xy1 = (sel[:, 0:2] - pads[b_idx]) / ratios[b_idx, None]
+        xy2 = (sel[:, 2:4] - pads[b_idx]) / ratios[b_idx, None]
+        rows = np.concatenate([xy1, np.maximum(0.0, xy2 - xy1), sel[:, 4:5]], axis=1)
+        return _split_vehicle_dets(batch, b_idx, rows, sel[:, 5].astype(np.int64))
+
+    # Case B: YOLOv8 raw output (B, 4+C, N)
+    if out.shape[1] < 5:
+        return [[] for _ in range(batch)]
+    preds = out.transpose(0, 2, 1)  # (B, N, 4+C)
+    scores = preds[:, :, 4:]
+    cls_ids = scores.argmax(axis=2)
+    confs = np.take_along_axis(scores, cls_ids[:, :, None], axis=2)[:, :, 0]
+    b_idx, n_idx = np.nonzero((confs >= conf_thres) & np.isin(cls_ids, _VEHICLE_COCO_IDS))
+    if not b_idx.size:
+        return [[] for _ in range(batch)]
+    confs = confs[b_idx, n_idx]
+    cls_ids = cls_ids[b_idx, n_idx]
+
+    # Bound NMS work on degenerate outputs (e.g. a very low conf threshold): keep the top
+    # `max_candidates` per image, so one busy image or tile can't crowd out the rest of the batch
+    max_candidates = int(os.environ.get("VEHICLE_DETECTOR_MAX_CANDIDATES", "3000"))
+    if 0 < max_candidates < np.bincount(b_idx, minlength=batch).max():
+        order = np.lexsort((-confs, b_idx))  # by image, best first within each
+        starts = np.searchsorted(b_idx[order], b_idx[order])
+        top = order[np.arange(order.size) - starts < max_candidates]
+        b_idx, n_idx, confs, cls_ids = b_idx[top], n_idx[top], confs[top], cls_ids[top]
+
+    boxes = preds[b_idx, n_idx, :4]
+    boxes[:, 0:2] -= boxes[:, 2:4] / 2  # cx,cy -> x,y (input space)
+
+    # Class-aware, per-image NMS: groups are (image, vehicle class) pairs, at most 5 * B of them
+    kept = _grouped_nms(boxes, confs, b_idx * scores.shape[2] + cls_ids, iou_thres)
+    kept = kept[np.lexsort((-confs[kept], b_idx[kept]))]  # group by image, score order within each
+
+    b_idx = b_idx[kept]
+    sel = boxes[kept]
+    sel[:, 0:2] = (sel[:, 0:2] - pads[b_idx]) / ratios[b_idx, None]
+    sel[:, 2:4] = np.maximum(0.0, sel[:, 2:4] / ratios[b_idx, None])
+    rows = np.concatenate([sel, confs[kept, None]], axis=1)
+    return _split_vehicle_dets(batch, b_idx, rows, cls_ids[kept])
 
 def _map_vehicle_class(coco_class_name: str) -> Optional[str]:
     c = coco_class_name.lower().strip()
@@ -3652,16 +6024,27 @@ def _map_vehicle_class(coco_class_name: str) -> Optional[str]:
         return "Heavy Goods Vehicle"
     return None
 
+# COCO ids kept by the decoder: bicycle, car, motorcycle, bus, truck
+_VEHICLE_COCO_IDS = tuple(i for i, name in enumerate(_COCO80) if _map_vehicle_class(name))
+
+def _detect_vehicles_sync(pool: _ModelPool, img, input_size: int, conf_thres: float, iou_thres: float):
+    """Letterbox + forward + decode for one image on a checked-out net (worker thread)."""
+    with pool.checkout() as net:
+        buf = _vehicle_input_buffer(net, input_size)
+        ratio, pad = buf.load(img)
+        outputs = net.infer(buf.batch(1))
+    return _decode_vehicle_output(outputs, conf_thres, iou_thres, input_size, ratio, pad)
+
 @vehicle_router.post("/detect", response_model=VehicleDetectionResponse)
 async def detect_vehicle(
-    image_file: UploadFile = File(...)
+    image_file: UploadFile = File(...),
+    tiled: Optional[bool] = Form(None),
 ):
-    """Detect and classify vehicle from image"""
+    """Detect and classify vehicle from image (`tiled=true` slices large images to find small vehicles)"""
     try:
-        net = _get_vehicle_net()
+        pool = _get_vehicle_net_pool()
         image_content = await image_file.read()
 
-        _require_opencv_vehicle()
         arr = np.frombuffer(image_content, dtype=np.uint8)
         img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
         if img is None:
@@ -3671,12 +6054,15 @@ async def detect_vehicle(
         conf_thres = float(os.environ.get("VEHICLE_DETECTOR_CONF_THRESHOLD", "0.35"))
         iou_thres = float(os.environ.get("VEHICLE_DETECTOR_NMS_IOU_THRESHOLD", "0.45"))
 
-        lb, ratio, pad = _vehicle_letterbox(img, new_shape=input_size)
-        blob = cv2.dnn.blobFromImage(lb, scalefactor=1.0 / 255.0, size=(input_size, input_size), swapRB=True, crop=False)
-        net.setInput(blob)
-        outputs = net.forward()
-
-        dets = _decode_vehicle_output(outputs, conf_thres, iou_thres, input_size, ratio, pad)
+        # Inference runs in a worker thread on a pooled net so concurrent requests run in parallel
+        tile_count = None
+        if _use_tiled_detection(tiled, img.shape[1], img.shape[0]):
+            batch_size = int(os.environ.get("VEHICLE_DETECTOR_BATCH_SIZE", "8"))
+            dets, tile_count = await asyncio.to_thread(
+                _detect_vehicles_tiled_sync, pool, img, input_size, conf_thres, iou_thres, batch_size
+            )
+        else:
+            dets = await asyncio.to_thread(_detect_vehicles_sync, pool, img, input_size, conf_thres, iou_thres)
 
         # Keep only vehicle-related detections
         vehicle_dets = []
@@ -3706,11 +6092,13 @@ async def detect_vehicle(
             bounding_box={"x": int(round(x)), "y": int(round(y)), "width": int(round(w)), "height": int(round(h))},
             additional_info={
                 "model": Path(os.environ.get("VEHICLE_DETECTOR_MODEL_PATH", "backend/models/vehicle_yolov8n.onnx")).name,
-                "detector": "opencv-dnn-yolo-onnx",
+                "detector": "opencv-dnn-yolo-onnx" if _vehicle_backend_name() == "opencv" else f"{_vehicle_backend_name()}-yolo-onnx",
                 "coco_class": _COCO80[cls_id] if 0 <= cls_id < len(_COCO80) else str(cls_id),
                 "image_width": W,
                 "image_height": H,
                 "thresholds": {"conf": conf_thres, "iou": iou_thres},
+                "tiles": tile_count,
+                "vehicle_count": len(vehicle_dets),
             },
         )
     except HTTPException:
@@ -3719,6 +6107,556 @@ async def detect_vehicle(
         logger.error(f"Vehicle detection error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _vehicle_boxes(dets, img_w: int, img_h: int) -> List[Dict[str, Any]]:
+    """Keep vehicle classes only, clamp to image bounds, sort by score (desc)."""
+    boxes = []
+    for x, y, w, h, score, cls_id in dets:
+        if not (0 <= cls_id < len(_COCO80)):
+            continue
+        vclass = _map_vehicle_class(_COCO80[cls_id])
+        if not vclass:
+            continue
+        x = max(0.0, min(float(x), float(img_w - 1)))
+        y = max(0.0, min(float(y), float(img_h - 1)))
+        w = max(1.0, min(float(w), float(img_w - x)))
+        h = max(1.0, min(float(h), float(img_h - y)))
+        boxes.append({
+            "vehicle_class": vclass,
+            "coco_class": _COCO80[cls_id],
+            "confidence": float(round(score, 4)),
+            "bounding_box": {"x": int(round(x)), "y": int(round(y)), "width": int(round(w)), "height": int(round(h))},
+        })
+    boxes.sort(key=lambda b: b["confidence"], reverse=True)
+    return boxes
+
+def _detect_vehicles_batch_sync(pool: _ModelPool, images: List[Any], input_size: int, conf_thres: float, iou_thres: float, batch_size: int):
+    """
+    Run the net on `images` in chunks of `batch_size` stacked into one NCHW blob.
+    Models exported with a fixed batch of 1 reject larger blobs; in that case we fall back to
+    one forward per image on the same checked-out net.
+    """
+    results: List[List[Any]] = []
+    with pool.checkout() as net:
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            buf = _vehicle_input_buffer(net, input_size, len(chunk))
+            geometry = [buf.load(img, i) for i, img in enumerate(chunk)]
+            ratios = [r for r, _pad in geometry]
+            pads = [pad for _r, pad in geometry]
+            blob = buf.batch(len(chunk))
+            try:
+                outputs = net.infer(blob)
+                results.extend(_decode_vehicle_outputs_batch(outputs, conf_thres, iou_thres, ratios, pads))
+            except Exception:
+                if len(chunk) == 1:
+                    raise
+                for i in range(len(chunk)):
+                    outputs = net.infer(blob[i:i + 1])
+                    results.extend(_decode_vehicle_outputs_batch(outputs, conf_thres, iou_thres, ratios[i:i + 1], pads[i:i + 1]))
+    return results
+
+def _vehicle_tile_settings() -> Tuple[int, float, int]:
+    return (
+        int(os.environ.get("VEHICLE_TILE_SIZE", "640")),
+        float(os.environ.get("VEHICLE_TILE_OVERLAP", "0.2")),
+        int(os.environ.get("VEHICLE_TILE_MAX", "12")),
+    )
+
+def _use_tiled_detection(requested: Optional[bool], img_w: int, img_h: int) -> bool:
+    """Form flag wins; otherwise VEHICLE_TILED_MODE = off (default) | on | auto (large images only)."""
+    if requested is not None:
+        return bool(requested)
+    mode = os.environ.get("VEHICLE_TILED_MODE", "off").strip().lower()
+    if mode == "auto":
+        return max(img_w, img_h) >= int(os.environ.get("VEHICLE_TILE_AUTO_MIN_SIDE", "1920"))
+    return mode in {"on", "true", "1"}
+
+def _tile_starts(length: int, tile: int, overlap: float) -> List[int]:
+    """Evenly spaced tile origins covering [0, length) with at least `overlap` (fraction) shared."""
+    if length <= tile:
+        return [0]
+    stride = max(1, int(tile * (1.0 - overlap)))
+    n = int(math.ceil((length - tile) / stride)) + 1
+    return [int(round(v)) for v in np.linspace(0, length - tile, n)]
+
+def _vehicle_tiles(img_w: int, img_h: int, tile: int, overlap: float, max_tiles: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Overlapping (x, y, w, h) tiles over the image. If the grid would exceed `max_tiles`, the tile
+    grows (coarser slicing) until it fits, which keeps the per-frame cost bounded.
+    """
+    overlap = min(max(overlap, 0.0), 0.9)
+    max_tiles = max(1, max_tiles)
+    tile = max(32, int(tile))
+    while True:
+        xs = _tile_starts(img_w, tile, overlap)
+        ys = _tile_starts(img_h, tile, overlap)
+        if len(xs) * len(ys) <= max_tiles:
+            break
+        tile = int(math.ceil(tile * 1.25))
+    tw, th = min(tile, img_w), min(tile, img_h)
+    return [(x, y, tw, th) for y in ys for x in xs]
+
+def _detect_vehicles_tiled_sync(pool: _ModelPool, img, input_size: int, conf_thres: float, iou_thres: float, batch_size: int):
+    """
+    Sliced inference for large frames: the full (letterboxed) image plus overlapping native-resolution
+    tiles go through the net as one batch, tile detections are shifted back to image coordinates and
+    everything is merged with class-aware NMS. The full-image pass keeps large vehicles that no single
+    tile contains. Returns (detections, tile_count).
+    """
+    H, W = img.shape[:2]
+    tiles = _vehicle_tiles(W, H, *_vehicle_tile_settings())
+    if len(tiles) == 1:
+        return _detect_vehicles_batch_sync(pool, [img], input_size, conf_thres, iou_thres, 1)[0], 1
+
+    crops = [img] + [img[y:y + h, x:x + w] for x, y, w, h in tiles]
+    per_image = _detect_vehicles_batch_sync(pool, crops, input_size, conf_thres, iou_thres, batch_size)
+    offsets = [(0, 0)] + [(x, y) for x, y, _w, _h in tiles]
+    return _merge_tile_detections(offsets, per_image, iou_thres), len(tiles)
+
+def _merge_tile_detections(offsets: List[Tuple[int, int]], per_image: List[list], iou_thres: float) -> list:
+    """
+    Shift per-crop (x, y, w, h, score, cls_id) detections by their crop origin and de-duplicate
+    boxes seen by several overlapping tiles with class-aware NMS (highest score first).
+    """
+    dets = [
+        (x + ox, y + oy, w, h, score, cls_id)
+        for (ox, oy), image_dets in zip(offsets, per_image)
+        for x, y, w, h, score, cls_id in image_dets
+    ]
+    if not dets:
+        return []
+    arr = np.asarray([d[:5] for d in dets], dtype=np.float32)
+    cls_ids = np.asarray([d[5] for d in dets], dtype=np.int64)
+    kept = _grouped_nms(arr[:, :4], arr[:, 4], cls_ids, iou_thres)
+    kept = kept[np.argsort(-arr[kept, 4], kind="stable")]
+    return [dets[i] for i in kept.tolist()]
+
+_VEHICLE_BATCH_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+def _read_vehicle_batch_archive(archive_bytes: bytes, max_images: int, max_bytes: int) -> List[Tuple[str, bytes]]:
+    """Extract image entries from a zip upload (bounded by count and total uncompressed size)."""
+    entries: List[Tuple[str, bytes]] = []
+    total = 0
+    try:
+        with zipfile.ZipFile(io.BytesIO(archive_bytes)) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or Path(info.filename).suffix.lower() not in _VEHICLE_BATCH_IMAGE_EXTS:
+                    continue
+                total += info.file_size
+                if len(entries) >= max_images or total > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Archive too large. Limit: {max_images} images / {max_bytes // (1024 * 1024)} MB.",
+                    )
+                entries.append((info.filename, zf.read(info)))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=422, detail="Invalid zip archive.")
+    return entries
+
+@vehicle_router.post("/detect-batch", response_model=VehicleBatchDetectionResponse)
+async def detect_vehicle_batch(
+    image_files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    batch_size: Optional[int] = Form(None)
+):
+    """
+    Detect every vehicle in many images (multipart `image_files` and/or a zip `archive`).
+    Images are letterboxed and stacked into NCHW blobs of `batch_size` for batched inference.
+    """
+    try:
+        pool = _get_vehicle_net_pool()
+        max_images = int(os.environ.get("VEHICLE_BATCH_MAX_IMAGES", "256"))
+        max_bytes = int(os.environ.get("VEHICLE_BATCH_MAX_BYTES", str(200 * 1024 * 1024)))
+        batch_size = max(1, int(batch_size or os.environ.get("VEHICLE_DETECTOR_BATCH_SIZE", "8")))
+
+        uploads: List[Tuple[str, bytes]] = []
+        for f in image_files or []:
+            uploads.append((f.filename or f"image_{len(uploads)}", await f.read()))
+        if archive is not None:
+            uploads.extend(_read_vehicle_batch_archive(await archive.read(), max_images, max_bytes))
+        if not uploads:
+            raise HTTPException(status_code=422, detail="Upload image_files and/or a zip archive of images.")
+        if len(uploads) > max_images:
+            raise HTTPException(status_code=413, detail=f"Too many images. Limit: {max_images}.")
+
+        input_size = int(os.environ.get("VEHICLE_DETECTOR_INPUT_SIZE", "640"))
+        conf_thres = float(os.environ.get("VEHICLE_DETECTOR_CONF_THRESHOLD", "0.35"))
+        iou_thres = float(os.environ.get("VEHICLE_DETECTOR_NMS_IOU_THRESHOLD", "0.45"))
+
+        results: List[VehicleImageDetections] = []
+        decoded: List[Tuple[int, Any]] = []  # (result index, image)
+        for name, content in uploads:
+            img = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                results.append(VehicleImageDetections(filename=name, error="Invalid image file."))
+                continue
+            H, W = img.shape[:2]
+            results.append(VehicleImageDetections(filename=name, image_width=W, image_height=H))
+            decoded.append((len(results) - 1, img))
+
+        started = time()
+        per_image = await asyncio.to_thread(
+            _detect_vehicles_batch_sync, pool, [img for _i, img in decoded], input_size, conf_thres, iou_thres, batch_size
+        )
+        elapsed_ms = (time() - started) * 1000.0
+
+        total_vehicles = 0
+        for (idx, img), dets in zip(decoded, per_image):
+            H, W = img.shape[:2]
+            boxes = _vehicle_boxes(dets, W, H)
+            results[idx].detections = [VehicleBox(**b) for b in boxes]
+            results[idx].vehicle_counts = dict(Counter(b["vehicle_class"] for b in boxes))
+            total_vehicles += len(boxes)
+
+        return VehicleBatchDetectionResponse(
+            results=results,
+            total_images=len(uploads),
+            total_vehicles=total_vehicles,
+            batch_size=batch_size,
+            elapsed_ms=round(elapsed_ms, 1),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch vehicle detection error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ===================== VEHICLE VIDEO / FRAME-STREAM DETECTION =====================
+class _IoUTracker:
+    """
+    Lightweight IoU tracker for frame-skipping detection.
+    - On detection frames, tracks are greedily matched to detections of the same class by IoU
+    - Between detections, boxes are advanced with each track's last per-frame velocity
+    - Tracks missing for `max_missed` detection rounds are dropped
+    Per-class counts are unique confirmed tracks (seen on >= `min_hits` detection frames).
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 2, min_hits: int = 1):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.tracks: List[Dict[str, Any]] = []
+        self.counts: Counter = Counter()
+        self._next_id = 1
+
+    def predict(self, frames: int = 1) -> None:
+        for t in self.tracks:
+            t["box"] = t["box"] + t["velocity"] * frames
+            t["frames_since_update"] += frames
+
+    def update(self, boxes: List[Dict[str, Any]]) -> None:
+        """`boxes` are `_vehicle_boxes()` dicts from a detection frame."""
+        det_xywh = np.array(
+            [[b["bounding_box"][k] for k in ("x", "y", "width", "height")] for b in boxes], dtype=np.float32
+        ).reshape(-1, 4)
+        matched_tracks, matched_dets = set(), set()
+        if self.tracks and len(boxes):
+            trk_xywh = np.stack([t["box"] for t in self.tracks])
+            iou = _iou_matrix(trk_xywh, det_xywh)
+            same_class = np.array([[t["vehicle_class"] == b["vehicle_class"] for b in boxes] for t in self.tracks])
+            iou = np.where(same_class, iou, 0.0)
+            # greedy assignment by descending IoU
+            for flat in np.argsort(-iou, axis=None):
+                ti, di = divmod(int(flat), len(boxes))
+                if iou[ti, di] < self.iou_threshold:
+                    break
+                if ti in matched_tracks or di in matched_dets:
+                    continue
+                matched_tracks.add(ti)
+                matched_dets.add(di)
+                t = self.tracks[ti]
+                new_box = det_xywh[di]
+                # velocity from the last real detection (undo the prediction drift first)
+                last_real = t["box"] - t["velocity"] * t["frames_since_update"]
+                t["velocity"] = (new_box - last_real) / max(1, t["frames_since_update"])
+                t["box"] = new_box
+                t["confidence"] = boxes[di]["confidence"]
+                t["frames_since_update"] = 0
+                t["missed"] = 0
+                t["hits"] += 1
+                if t["hits"] == self.min_hits:
+                    self.counts[t["vehicle_class"]] += 1
+
+        survivors = []
+        for ti, t in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                t["missed"] += 1
+            if t["missed"] <= self.max_missed:
+                survivors.append(t)
+        self.tracks = survivors
+
+        for di, b in enumerate(boxes):
+            if di in matched_dets:
+                continue
+            t = {
+                "track_id": self._next_id,
+                "vehicle_class": b["vehicle_class"],
+                "coco_class": b["coco_class"],
+                "confidence": b["confidence"],
+                "box": det_xywh[di],
+                "velocity": np.zeros(4, dtype=np.float32),
+                "frames_since_update": 0,
+                "missed": 0,
+                "hits": 1,
+            }
+            self._next_id += 1
+            if self.min_hits <= 1:
+                self.counts[t["vehicle_class"]] += 1
+            self.tracks.append(t)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        out = []
+        for t in self.tracks:
+            x, y, w, h = (int(round(float(v))) for v in t["box"])
+            out.append({
+                "track_id": t["track_id"],
+                "vehicle_class": t["vehicle_class"],
+                "coco_class": t["coco_class"],
+                "confidence": t["confidence"],
+                "bounding_box": {"x": x, "y": y, "width": w, "height": h},
+            })
+        return out
+
+def _new_vehicle_tracker() -> _IoUTracker:
+    return _IoUTracker(
+        iou_threshold=float(os.environ.get("VEHICLE_TRACK_IOU_THRESHOLD", "0.3")),
+        max_missed=int(os.environ.get("VEHICLE_TRACK_MAX_MISSED", "2")),
+        min_hits=int(os.environ.get("VEHICLE_TRACK_MIN_HITS", "1")),
+    )
+
+def _vehicle_detector_settings() -> Tuple[int, float, float]:
+    return (
+        int(os.environ.get("VEHICLE_DETECTOR_INPUT_SIZE", "640")),
+        float(os.environ.get("VEHICLE_DETECTOR_CONF_THRESHOLD", "0.35")),
+        float(os.environ.get("VEHICLE_DETECTOR_NMS_IOU_THRESHOLD", "0.45")),
+    )
+
+def _track_vehicle_frame(pool: _ModelPool, tracker: _IoUTracker, img, frame_idx: int, detect_every: int) -> Dict[str, Any]:
+    """Detect on every `detect_every`-th frame, otherwise advance tracks. Returns the per-frame payload."""
+    detected = frame_idx % detect_every == 0
+    if detected:
+        input_size, conf_thres, iou_thres = _vehicle_detector_settings()
+        tracker.predict()
+        H, W = img.shape[:2]
+        tracker.update(_vehicle_boxes(_detect_vehicles_sync(pool, img, input_size, conf_thres, iou_thres), W, H))
+    else:
+        tracker.predict()
+    return {"frame": frame_idx, "detected": detected, "vehicles": tracker.snapshot()}
+
+def _detect_vehicles_in_video_sync(pool: _ModelPool, video_path: str, detect_every: int, max_frames: int, include_frames: bool):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise HTTPException(status_code=422, detail="Could not read video. Upload an mp4/avi/mkv file.")
+    tracker = _new_vehicle_tracker()
+    frames: List[Dict[str, Any]] = []
+    processed = detected = 0
+    try:
+        fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or None
+        while processed < max_frames:
+            if processed % detect_every == 0:
+                ok, img = cap.read()
+            else:
+                # skipped frames: grab() advances the stream without decoding pixels
+                ok, img = cap.grab(), None
+            if not ok:
+                break
+            if img is not None:
+                payload = _track_vehicle_frame(pool, tracker, img, processed, detect_every)
+                detected += 1
+            else:
+                tracker.predict()
+                payload = {"frame": processed, "detected": False, "vehicles": tracker.snapshot()}
+            if include_frames:
+                frames.append(payload)
+            processed += 1
+    finally:
+        cap.release()
+    return processed, detected, fps, dict(tracker.counts), frames
+
+@vehicle_router.post("/detect-video", response_model=VehicleVideoDetectionResponse)
+async def detect_vehicle_video(
+    video_file: UploadFile = File(...),
+    detect_every: int = Form(3),
+    include_frames: bool = Form(True)
+):
+    """
+    Detect + track vehicles in an uploaded video.
+    The YOLO net runs on every `detect_every`-th frame; an IoU tracker carries boxes in between.
+    Returns per-frame tracked boxes and per-class unique vehicle counts.
+    """
+    try:
+        pool = _get_vehicle_net_pool()
+        detect_every = max(1, int(detect_every))
+        max_frames = int(os.environ.get("VEHICLE_VIDEO_MAX_FRAMES", "9000"))
+        suffix = Path(video_file.filename or "video.mp4").suffix or ".mp4"
+        with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+            while True:
+                chunk = await video_file.read(1024 * 1024)
+                if not chunk:
+                    break
+                tmp.write(chunk)
+            tmp.flush()
+            started = time()
+            processed, detected, fps, counts, frames = await asyncio.to_thread(
+                _detect_vehicles_in_video_sync, pool, tmp.name, detect_every, max_frames, include_frames
+            )
+        return VehicleVideoDetectionResponse(
+            frames_processed=processed,
+            frames_detected=detected,
+            fps=fps,
+            vehicle_counts=counts,
+            frames=frames,
+            elapsed_ms=round((time() - started) * 1000.0, 1),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Video vehicle detection error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@vehicle_router.websocket("/stream")
+async def vehicle_stream(websocket: WebSocket, detect_every: int = 3):
+    """
+    Frame-stream detection over WebSocket.
+    Client sends each frame as a binary JPEG/PNG message; server replies with a JSON message
+    per frame ({frame, detected, vehicles, vehicle_counts}). Send the text "end" to finish.
+    """
+    await websocket.accept()
+    try:
+        pool = _get_vehicle_net_pool()
+    except HTTPException as e:
+        await websocket.send_json({"error": e.detail})
+        await websocket.close(code=1011)
+        return
+    detect_every = max(1, int(detect_every))
+    tracker = _new_vehicle_tracker()
+    frame_idx = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            if message.get("text") is not None:
+                if message["text"].strip().lower() == "end":
+                    await websocket.send_json({"done": True, "frames": frame_idx, "vehicle_counts": dict(tracker.counts)})
+                    await websocket.close()
+                    break
+                continue
+            data = message.get("bytes") or b""
+            img = None
+            if frame_idx % detect_every == 0:
+                img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is not None:
+                payload = await asyncio.to_thread(_track_vehicle_frame, pool, tracker, img, frame_idx, detect_every)
+            else:
+                # skipped (or undecodable) frame: advance tracks without running the net
+                tracker.predict()
+                payload = {"frame": frame_idx, "detected": False, "vehicles": tracker.snapshot()}
+            payload["vehicle_counts"] = dict(tracker.counts)
+            await websocket.send_json(payload)
+            frame_idx += 1
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Vehicle stream error: {e}")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+# ===================== MODEL WARM-UP / READINESS =====================
+# Per-model state: pending -> warming -> ready | unavailable (deps/files missing) | error
+_model_warm_state: Dict[str, Dict[str, Any]] = {}
+_model_warmup_task: Optional[asyncio.Task] = None
+
+def _parse_warmup_sizes(raw: str) -> List[Tuple[int, int]]:
+    """Parse "640x480,1280x720" into [(w, h), ...]; invalid entries are skipped."""
+    sizes = []
+    for part in (raw or "").split(","):
+        m = re.match(r"^\s*(\d+)\s*[xX]\s*(\d+)\s*$", part)
+        if m:
+            sizes.append((int(m.group(1)), int(m.group(2))))
+    return sizes
+
+def _prime_face_models(models) -> None:
+    detector, recognizer = models
+    for w, h in _parse_warmup_sizes(os.environ.get("FACE_WARMUP_INPUT_SIZES", "640x480")):
+        detector.setInputSize((w, h))
+        detector.detect(np.zeros((h, w, 3), dtype=np.uint8))
+    # SFace works on 112x112 aligned crops
+    recognizer.feature(np.zeros((112, 112, 3), dtype=np.uint8))
+
+def _prime_vehicle_net(net) -> None:
+    size = int(os.environ.get("VEHICLE_DETECTOR_INPUT_SIZE", "640"))
+    buf = _vehicle_input_buffer(net, size)
+    buf.blob.fill(0.0)
+    net.infer(buf.batch(1))
+
+def _warm_face_models() -> int:
+    return _get_face_model_pool().warm(prime=_prime_face_models)
+
+def _warm_vehicle_models() -> int:
+    return _get_vehicle_net_pool().warm(prime=_prime_vehicle_net)
+
+def _warm_easyocr() -> int:
+    reader = _get_easyocr_reader()
+    if reader is None:
+        raise HTTPException(status_code=503, detail="EasyOCR is not available.")
+    reader.readtext(np.zeros((64, 256, 3), dtype=np.uint8))
+    return 1
+
+_MODEL_WARMERS = {
+    "face": _warm_face_models,
+    "vehicle": _warm_vehicle_models,
+    "easyocr": _warm_easyocr,
+}
+
+def _configured_warmup_models() -> List[str]:
+    """Models listed in MODEL_WARMUP, e.g. "face,vehicle" (off by default; unset/"none" disables warm-up)."""
+    raw = os.environ.get("MODEL_WARMUP", "none").strip().lower()
+    if raw in {"", "none", "false", "off"}:
+        return []
+    return [m.strip() for m in raw.split(",") if m.strip() in _MODEL_WARMERS]
+
+def _warm_models(names: List[str]) -> None:
+    """Load each model and run a dummy inference at its configured input size(s). Runs in a worker thread."""
+    for name in names:
+        _model_warm_state[name] = {"status": "warming"}
+        started = time()
+        try:
+            instances = _MODEL_WARMERS[name]()
+            _model_warm_state[name] = {
+                "status": "ready",
+                "instances": instances,
+                "warm_ms": round((time() - started) * 1000.0, 1),
+            }
+            logger.info(f"Model warm-up complete: {name} ({instances} instance(s))")
+        except HTTPException as e:
+            _model_warm_state[name] = {"status": "unavailable", "detail": e.detail}
+            logger.info(f"Skipping {name} warm-up: {e.detail}")
+        except Exception as e:
+            _model_warm_state[name] = {"status": "error", "detail": str(e)}
+            logger.warning(f"Model warm-up failed for {name}: {e}")
+
+def _model_readiness() -> Dict[str, Any]:
+    """Ready once no configured model is still pending/warming (unavailable models don't block)."""
+    models = {name: dict(state) for name, state in _model_warm_state.items()}
+    ready = all(m.get("status") not in {"pending", "warming"} for m in models.values())
+    return {"ready": ready, "models": models}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until configured models are warm"""
+    readiness = _model_readiness()
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content=readiness)
+    return readiness
+
+@app.get("/api/ready")
+async def api_readiness_check():
+    """API readiness probe"""
+    return await readiness_check()
+
 # ===================== EXECUTIVE DASHBOARD =====================
 @dashboard_router.get("/executive-summary")
 async def get_executive_summary(state_cd: Optional[str] = None, c_district: Optional[str] = None, city: Optional[str] = None):
@@ -7131,6 +10069,7 @@ async def health_check():
                 "error": mongo_error
             },
             "collections": collections_status if mongo_status == "connected" else {},
+            "models": _model_readiness(),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
     except Exception as e:
@@ -8058,6 +10997,16 @@ async def startup_event():
         else:
             logger.info(f"Skipping RTO Ranking data load - {rto_ranking_count} records already exist")
         
+        await _ensure_ticket_indexes()
+        if await db.ticket_sentiment_rollup.estimated_document_count() == 0:
+            await _rebuild_sentiment_rollup()
+        await _chat_sessions.ensure_indexes()
+        await _ensure_chatbot_tool_indexes()
+        
+        # 1:N face gallery (memory-mapped snapshot when it is current)
+        if np is not None:
+            await _face_gallery.load()
+        
         logger.info("Data loading complete")
     except asyncio.TimeoutError:
         logger.error("MongoDB connection timeout - server will start but data endpoints may fail")
@@ -8065,7 +11014,21 @@ async def startup_event():
     except Exception as e:
         logger.error(f"MongoDB connection failed; skipping data bootstrap. Error: {e}")
         logger.error("Server will start but data endpoints may not work. Check MongoDB connection.")
+    
+    # Warm configured models in the background; /ready reports 503 until they are hot.
+    global _model_warmup_task
+    warmup_models = _configured_warmup_models()
+    for name in warmup_models:
+        _model_warm_state[name] = {"status": "pending"}
+    if warmup_models:
+        _model_warmup_task = asyncio.create_task(asyncio.to_thread(_warm_models, warmup_models))
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if _face_gallery.dirty:
+        try:
+            await _face_gallery.save()
+        except Exception as e:
+            logger.warning(f"Face gallery snapshot not saved: {e}")
+    await _llm_gateway.aclose()
     client.close()
@@ -46,20 +46,22 @@ const FloatingChatbot = () => {
     setIsLoading(true);
 
     try {
-      const response = await axios.post(`${API}/chatbot/chat`, {
-        message: inputMessage,
-        session_id: sessionId,
-        language: "english"
-      });
-
-      const assistantMessage = {
-        role: "assistant",
-        content: response.data.response,
-        timestamp: new Date()
-      };
-
-      setMessages(prev => [...prev, assistantMessage]);
-      setSessionId(response.data.session_id);
+      const payload = { message: inputMessage, session_id: sessionId, language: "english" };
+      let streamed = false;
+      try {
+        streamed = await streamReply(payload);
+      } catch (streamError) {
+        console.warn("Streaming unavailable, falling back:", streamError);
+      }
+      if (!streamed) {
+        const response = await axios.post(`${API}/chatbot/chat`, payload);
+        setMessages(prev => [...prev, {
+          role: "assistant",
+          content: response.data.response,
+          timestamp: new Date()
+        }]);
+        setSessionId(response.data.session_id);
+      }
     } catch (error) {
       console.error("Error:", error);
       setMessages(prev => [...prev, {
@@ -72,6 +74,55 @@ const FloatingChatbot = () => {
     }
   };
 
+  // Server-Sent Events from /chatbot/chat/stream: render tokens as they arrive.
+  // Returns false (nothing rendered) so the caller can fall back to /chatbot/chat.
+  const streamReply = async (payload) => {
+    const response = await fetch(`${API}/chatbot/chat/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload)
+    });
+    if (!response.ok || !response.body) return false;
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let started = false;
+    try {
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = /^event: (.*)$/m.exec(raw)?.[1];
+          const data = /^data: (.*)$/m.exec(raw)?.[1];
+          if (!event || !data) continue;
+          const body = JSON.parse(data);
+          if (event === "start") {
+            setSessionId(body.session_id);
+          } else if (event === "delta") {
+            if (!started) {
+              started = true;
+              setIsLoading(false);
+              setMessages(prev => [...prev, { role: "assistant", content: body.content, timestamp: new Date() }]);
+            } else {
+              setMessages(prev => {
+                const last = prev[prev.length - 1];
+                return [...prev.slice(0, -1), { ...last, content: last.content + body.content }];
+              });
+            }
+          }
+        }
+      }
+    } catch (readError) {
+      // Keep a partially streamed answer rather than asking again
+      if (!started) throw readError;
+    }
+    return started;
+  };
+
   const handleKeyPress = (e) => {
     if (e.key === "Enter" && !e.shiftKey) {
       e.preventDefault();
@@ -142,7 +142,9 @@ const ChatbotPage = () => {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
 
-      if (response.data.transcription) {
+      if (response.data.demo) {
+        toast.warning("Speech recognition is not configured on the server");
+      } else if (response.data.transcription) {
         setInputMessage(response.data.transcription);
         toast.success(`Transcribed: "${response.data.transcription}"`);
       }
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Shared Benchmark Harness
+Colours, latency percentiles, report lines and the argparse entry point used by the
+tests/benchmark_*.py scripts (the module name keeps pytest from collecting it)
+"""
+
+import sys
+import argparse
+import statistics
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+def print_header(title):
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}{title}{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+def percentile(values, q):
+    """Nearest-rank percentile, q in [0, 1]."""
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(q * (len(vals) - 1)))))
+    return vals[idx]
+
+def latency_summary(latencies, unit="ms", width=7, precision=1):
+    """'mean … p50 … p95 …' for a list of per-call latencies already expressed in `unit`."""
+    spec = f"{width}.{precision}f"
+    return "   ".join(
+        f"{label} {value:{spec}} {unit}"
+        for label, value in (
+            ("mean", statistics.mean(latencies)),
+            ("p50", percentile(latencies, 0.50)),
+            ("p95", percentile(latencies, 0.95)),
+        )
+    )
+
+def print_result(label, *parts):
+    print(f"{Colors.GREEN}✓{Colors.RESET} {label}   " + "   ".join(parts))
+
+def print_skip(label, reason):
+    print(f"{Colors.YELLOW}⚠ SKIP{Colors.RESET}{' ' if label else ''}{label}: {reason}")
+
+def run_cli(bench, *options):
+    """
+    Script entry point: `options` are (flag, argparse kwargs) pairs whose dests match `bench`'s
+    keyword arguments; exits 0 when `bench` returns truthy.
+    """
+    parser = argparse.ArgumentParser(description=(bench.__doc__ or "").strip() or None)
+    for flag, kwargs in options:
+        parser.add_argument(flag, **kwargs)
+    result = bench(**vars(parser.parse_args()))
+    sys.exit(0 if result else 1)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Inference Backend Benchmark
+Compares OpenCV DNN vs ONNX Runtime on the same YOLO ONNX model (images/sec + latency percentiles)
+
+Usage:
+    python tests/benchmark_inference_backends.py [--model backend/models/vehicle_yolov8n.onnx]
+        [--iterations 50] [--batch 1] [--images <dir of jpg/png>]
+"""
+
+import sys
+import os
+import time
+# Add parent directory and backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import cv2
+from pathlib import Path
+
+from server import (
+    ROOT_DIR, _create_inference_backend, _vehicle_letterbox, _decode_vehicle_outputs_batch
+)
+from benchmark_common import print_header, latency_summary, print_result, print_skip, run_cli
+
+def _load_images(images_dir, count):
+    if images_dir:
+        paths = sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png"})
+        imgs = [cv2.imread(str(p)) for p in paths[:count]]
+        imgs = [i for i in imgs if i is not None]
+        if imgs:
+            return imgs
+    # Synthetic 1080p frames (same input for every backend)
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8) for _ in range(count)]
+
+def benchmark_backend(name, model_path, images, iterations, batch, input_size):
+    backend = _create_inference_backend(model_path, name)
+    letterboxed = [_vehicle_letterbox(img, new_shape=input_size) for img in images]
+    chunks = [letterboxed[i:i + batch] for i in range(0, len(letterboxed), batch)]
+
+    def run(chunk):
+        blob = cv2.dnn.blobFromImages([lb for lb, _r, _p in chunk], 1.0 / 255.0, (input_size, input_size), swapRB=True, crop=False)
+        out = backend.infer(blob)
+        _decode_vehicle_outputs_batch(out, 0.35, 0.45, [r for _lb, r, _p in chunk], [p for _lb, _r, p in chunk])
+
+    # warm-up (graph optimisation / first allocation)
+    for chunk in chunks[:2]:
+        run(chunk)
+
+    latencies = []
+    n_images = 0
+    start_all = time.perf_counter()
+    for it in range(iterations):
+        chunk = chunks[it % len(chunks)]
+        start = time.perf_counter()
+        run(chunk)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        n_images += len(chunk)
+    total = time.perf_counter() - start_all
+    return (n_images / total if total > 0 else 0.0), latencies
+
+def bench_inference_backends(model=None, iterations=50, batch=1, images_dir=None):
+    """Compare OpenCV DNN and ONNX Runtime on the same YOLO ONNX model."""
+    print_header("INFERENCE BACKEND BENCHMARK")
+
+    model_path = Path(model or os.environ.get("VEHICLE_DETECTOR_MODEL_PATH", str(ROOT_DIR / "models" / "vehicle_yolov8n.onnx")))
+    if not model_path.exists():
+        print_skip("", f"model not found at {model_path}")
+        return True
+
+    input_size = int(os.environ.get("VEHICLE_DETECTOR_INPUT_SIZE", "640"))
+    images = _load_images(images_dir, max(batch, 8))
+    print(f"Model: {model_path.name} | input {input_size} | batch {batch} | {iterations} iterations\n")
+
+    for name in ("opencv", "onnxruntime"):
+        try:
+            images_per_sec, latencies = benchmark_backend(name, model_path, images, iterations, batch, input_size)
+            print_result(f"{name:<12}", f"{images_per_sec:8.1f} img/s", latency_summary(latencies))
+        except Exception as e:
+            print_skip(name, getattr(e, "detail", str(e)))
+    return True
+
+if __name__ == "__main__":
+    run_cli(
+        bench_inference_backends,
+        ("--model", {"default": None}),
+        ("--iterations", {"type": int, "default": 50}),
+        ("--batch", {"type": int, "default": 1}),
+        ("--images", {"dest": "images_dir", "default": None}),
+    )
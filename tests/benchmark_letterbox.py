@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Letterbox / Blob Construction Benchmark
+Compares per-request allocation (`_vehicle_letterbox` + `cv2.dnn.blobFromImage`) against the
+preallocated per-worker `_LetterboxBuffer` (latency percentiles + bytes allocated per call)
+
+Usage:
+    python tests/benchmark_letterbox.py [--iterations 200] [--input-size 640] [--batch 1]
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+# Add parent directory and backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import cv2
+
+from server import _vehicle_letterbox, _LetterboxBuffer
+from benchmark_common import Colors, print_header, latency_summary, print_result, run_cli
+
+def _allocating(images, input_size):
+    letterboxed = [_vehicle_letterbox(img, new_shape=input_size) for img in images]
+    return cv2.dnn.blobFromImages(
+        [lb for lb, _r, _p in letterboxed], scalefactor=1.0 / 255.0,
+        size=(input_size, input_size), swapRB=True, crop=False,
+    )
+
+def _buffered(buf):
+    def run(images, _input_size):
+        buf.reserve(len(images))
+        for i, img in enumerate(images):
+            buf.load(img, i)
+        return buf.batch(len(images))
+    return run
+
+def _measure(fn, frames, input_size, iterations, batch):
+    chunks = [[frames[(i * batch + k) % len(frames)] for k in range(batch)] for i in range(iterations)]
+    fn(chunks[0], input_size)  # warm-up (first allocation of reusable buffers)
+
+    latencies = []
+    for chunk in chunks:
+        start = time.perf_counter()
+        fn(chunk, input_size)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+
+    # numpy (and cv2-returned) arrays are tracked by tracemalloc
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    for chunk in chunks[:20]:
+        fn(chunk, input_size)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return latencies, peak / (1024 * 1024)
+
+def bench_letterbox_buffers(iterations=200, input_size=640, batch=1):
+    """Compare per-request letterbox/blob allocation against the reusable _LetterboxBuffer."""
+    print_header("LETTERBOX / BLOB BENCHMARK")
+
+    # Mixed camera resolutions so the pad strips change between calls
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 255, shape, dtype=np.uint8)
+        for shape in ((1080, 1920, 3), (720, 1280, 3), (1920, 1080, 3), (2160, 3840, 3))
+    ]
+    print(f"Input {input_size} | batch {batch} | {iterations} iterations\n")
+
+    # Same pixels from both paths
+    buf = _LetterboxBuffer(input_size)
+    ref = _allocating(frames[:1], input_size)
+    got = _buffered(buf)(frames[:1], input_size)
+    max_diff = float(np.abs(ref - got).max())
+    if max_diff > 1e-5:
+        print(f"{Colors.RED}✗ FAIL{Colors.RESET}: buffered blob differs from blobFromImage (max diff {max_diff})")
+        return False
+
+    for name, fn in (("allocating", _allocating), ("buffered", _buffered(_LetterboxBuffer(input_size)))):
+        latencies, peak_mb = _measure(fn, frames, input_size, iterations, batch)
+        print_result(f"{name:<11}", latency_summary(latencies, width=6, precision=2), f"peak alloc {peak_mb:7.2f} MB")
+    return True
+
+if __name__ == "__main__":
+    run_cli(
+        bench_letterbox_buffers,
+        ("--iterations", {"type": int, "default": 200}),
+        ("--input-size", {"type": int, "default": 640}),
+        ("--batch", {"type": int, "default": 1}),
+    )
@@ -62,6 +62,7 @@ def main():
     tests = [
         ("test_smoke.py", "Smoke/Sanity Testing"),
         ("test_unit_comprehensive.py", "Unit Testing"),
+        ("test_llm_gateway.py", "LLM Gateway Testing"),
         ("test_all_endpoints.py", "API/Functional Testing"),
         ("test_database.py", "Database Testing"),
         ("test_security.py", "Security Testing"),
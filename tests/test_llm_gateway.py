@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+LLM Gateway Testing
+Runs `_LLMGateway` against a local fake OpenAI-compatible server (no API key / network needed):
+coalescing (including a cancelled first caller), result cache, concurrency cap, timeout and token streaming
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# Add parent directory and backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi import HTTPException
+
+from server import _LLMGateway, _TTLCache
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+class FakeLLM:
+    """Fake `/chat/completions` upstream that records calls and peak concurrency."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    fake.calls += 1
+                    fake.active += 1
+                    fake.peak = max(fake.peak, fake.active)
+                try:
+                    user = body["messages"][-1]["content"]
+                    text = user if isinstance(user, str) else user[0]["text"]
+                    if body.get("stream"):
+                        self._stream(f"echo: {text}")
+                        return
+                    time.sleep(fake.delay)
+                    payload = json.dumps({"choices": [{"message": {"content": f"echo: {text}"}}]}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client already gave up (timeout case)
+                finally:
+                    with fake._lock:
+                        fake.active -= 1
+
+            def _stream(self, text):
+                # OpenAI-style SSE, one word per chunk, `delay` between chunks
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for word in text.split(" "):
+                    chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(fake.delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def _gateway(max_concurrency=4, timeout=5.0):
+    return _LLMGateway(max_concurrency=max_concurrency, timeout_seconds=timeout, cache=_TTLCache(64, 60))
+
+async def _check_coalescing(fake):
+    gw = _gateway()
+    try:
+        results = await asyncio.gather(*[
+            gw.complete("gemini", "gemini-2.5-flash", "sys", "read this", image_base64="aW1hZ2U=") for _ in range(5)
+        ])
+    finally:
+        await gw.aclose()
+    return fake.calls == 1 and gw.coalesced == 4 and all(r == "echo: read this" for r in results)
+
+async def _check_cancelled_leader(fake):
+    gw = _gateway()
+    args = ("gemini", "gemini-2.5-flash", "sys", "leader leaves")
+    try:
+        leader = asyncio.create_task(gw.complete(*args, image_base64="aW1hZ2U="))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(gw.complete(*args, image_base64="aW1hZ2U="))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        result = await follower
+        try:
+            await leader
+            return False
+        except asyncio.CancelledError:
+            pass
+    finally:
+        await gw.aclose()
+    # the waiting caller still gets the shared upstream reply, from a single call
+    return result == "echo: leader leaves" and fake.calls == 1 and gw.coalesced == 1
+
+async def _check_cache(fake):
+    gw = _gateway()
+    try:
+        first = await gw.complete("gemini", "gemini-2.5-flash", "sys", "cached", image_base64="aW1hZ2U=")
+        second = await gw.complete("gemini", "gemini-2.5-flash", "sys", "cached", image_base64="aW1hZ2U=")
+        other_image = await gw.complete("gemini", "gemini-2.5-flash", "sys", "cached", image_base64="b3RoZXI=")
+    finally:
+        await gw.aclose()
+    return first == second == other_image and fake.calls == 2 and gw.cache.hits == 1
+
+async def _check_concurrency_cap(fake):
+    gw = _gateway(max_concurrency=2)
+    try:
+        await asyncio.gather(*[gw.complete("openai", "gpt-4o-mini", "sys", f"q{i}", cache=False) for i in range(6)])
+    finally:
+        await gw.aclose()
+    return fake.calls == 6 and fake.peak <= 2
+
+async def _check_timeout(fake):
+    gw = _gateway(timeout=0.2)
+    try:
+        await gw.complete("openai", "gpt-4o-mini", "sys", "slow", cache=False)
+        return False
+    except HTTPException as e:
+        return e.status_code == 504
+    finally:
+        await gw.aclose()
+
+async def _check_streaming(fake):
+    gw = _gateway()
+    started = time.perf_counter()
+    first_chunk_at = None
+    chunks = []
+    try:
+        async for chunk in gw.stream("openai", "gpt-4o-mini", "sys", "one two three four"):
+            if first_chunk_at is None:
+                first_chunk_at = time.perf_counter() - started
+            chunks.append(chunk)
+    finally:
+        await gw.aclose()
+    total = time.perf_counter() - started
+    # 5 words at `delay` apart: the first token must arrive well before the full reply
+    return "".join(chunks).strip() == "echo: one two three four" and len(chunks) == 5 and first_chunk_at < total / 2
+
+def test_llm_gateway():
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}LLM GATEWAY TESTING{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+    previous_url = os.environ.get("LLM_GATEWAY_URL")
+    passed = 0
+    failed = 0
+    cases = [
+        ("identical image requests are coalesced", _check_coalescing, 0.2),
+        ("a cancelled first caller does not cancel coalesced waiters", _check_cancelled_leader, 0.3),
+        ("repeat requests are served from cache", _check_cache, 0.05),
+        ("in-flight calls are capped by the semaphore", _check_concurrency_cap, 0.1),
+        ("slow upstream returns 504", _check_timeout, 1.0),
+        ("streamed tokens arrive before the reply completes", _check_streaming, 0.1),
+    ]
+    try:
+        for name, check, delay in cases:
+            fake = FakeLLM(delay=delay)
+            os.environ["LLM_GATEWAY_URL"] = fake.url
+            try:
+                ok = asyncio.run(check(fake))
+            except Exception as e:
+                print(f"{Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+                ok = None
+            finally:
+                fake.close()
+            if ok:
+                print(f"{Colors.GREEN}✓ PASS{Colors.RESET}: {name}")
+                passed += 1
+            else:
+                if ok is False:
+                    print(f"{Colors.RED}✗ FAIL{Colors.RESET}: {name} (upstream calls: {fake.calls}, peak: {fake.peak})")
+                failed += 1
+    finally:
+        if previous_url is None:
+            os.environ.pop("LLM_GATEWAY_URL", None)
+        else:
+            os.environ["LLM_GATEWAY_URL"] = previous_url
+
+    print(f"\nTotal Tests: {passed + failed}")
+    print(f"{Colors.GREEN}Passed: {passed}{Colors.RESET}")
+    print(f"{Colors.RED}Failed: {failed}{Colors.RESET}\n")
+    return failed == 0
+
+if __name__ == "__main__":
+    result = test_llm_gateway()
+    sys.exit(0 if result else 1)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Ticket Rollup Testing
+Runs ticket creates concurrently with KPI summary / sentiment rollup rebuilds against a scratch
+MongoDB database (MONGO_URL, default localhost) and checks every ticket is counted exactly once
+"""
+
+import sys
+import os
+import asyncio
+# Add parent directory and backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import server
+from server import (
+    TicketCreate, create_ticket, _rebuild_sentiment_rollup, _rebuild_ticket_kpi_summary,
+)
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+TEST_DB_NAME = "citizen_assistance_rollup_test"
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    RESET = '\033[0m'
+
+def _ticket(i: int) -> TicketCreate:
+    return TicketCreate(
+        subject=f"Payment failed for AP16BZ{1000 + i}" if i % 2 else f"Thanks, resolved quickly {i}",
+        description="rollup test",
+        priority="Normal",
+        category="test",
+        module_name=f"Module{i % 3}",
+    )
+
+async def _rollup_state():
+    rows = await server.db.ticket_sentiment_rollup.find({}).to_list(None)
+    return {r["_id"]: (r["count"], r["positive"], r["neutral"], r["negative"]) for r in rows}
+
+async def _check_concurrent_rebuilds():
+    await server.db.tickets_data.delete_many({})
+    await server.db.ticket_sentiment_rollup.delete_many({})
+    await server.db.ticket_kpi_summary.delete_many({})
+    await asyncio.gather(*[create_ticket(_ticket(i)) for i in range(10)])
+    await _rebuild_sentiment_rollup()
+
+    # Rebuilds and creates interleaved: neither may fail, and no ticket may be lost or double counted
+    jobs = []
+    for i in range(10, 40):
+        jobs.append(create_ticket(_ticket(i)))
+        if i % 5 == 0:
+            jobs.append(_rebuild_sentiment_rollup())
+            jobs.append(_rebuild_ticket_kpi_summary())
+    await asyncio.gather(*jobs)
+
+    incremental = await _rollup_state()
+    summary = await server.db.ticket_kpi_summary.find_one({"_id": "tickets"})
+    await _rebuild_sentiment_rollup()
+    rebuilt = await _rollup_state()
+    total = sum(v[0] for k, v in rebuilt.items() if k.startswith("all|"))
+    return incremental == rebuilt and total == 40 and summary["total"] == 40
+
+def test_ticket_rollups():
+    print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
+    print(f"{Colors.BLUE}TICKET ROLLUP TESTING{Colors.RESET}")
+    print(f"{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+
+    async def _run():
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=3000)
+        try:
+            await client.admin.command("ping")
+        except Exception as e:
+            print(f"{Colors.YELLOW}⚠ SKIP{Colors.RESET}: MongoDB not reachable at {MONGO_URL} ({e})")
+            return None
+        previous_db = server.db
+        server.db = client[TEST_DB_NAME]
+        try:
+            return await _check_concurrent_rebuilds()
+        finally:
+            server.db = previous_db
+            await client.drop_database(TEST_DB_NAME)
+            client.close()
+
+    name = "rollup rebuilds running alongside ticket creates count each ticket once"
+    try:
+        ok = asyncio.run(_run())
+    except Exception as e:
+        print(f"{Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+        return False
+    if ok is None:
+        return True
+    print(f"{Colors.GREEN}✓ PASS{Colors.RESET}: {name}" if ok else f"{Colors.RED}✗ FAIL{Colors.RESET}: {name}")
+    return ok
+
+if __name__ == "__main__":
+    result = test_ticket_rollups()
+    sys.exit(0 if result else 1)
@@ -12,7 +12,14 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 from server import (
     _as_float, _safe_parse_date, _median, _pct, 
-    _get_field_value, clean_nan_values, _excel_to_records
+    _get_field_value, clean_nan_values, _excel_to_records,
+    _decode_vehicle_output, _decode_vehicle_outputs_batch,
+    _verhoeff_check, _verhoeff_check_many, _sentiment_score,
+    _route_chat_message, _ticket_search_match, _ticket_search_tokens,
+    _extract_aadhaar_fields, _aadhaar_field_values, _MemoryChatSessionStore,
+    _ModelPool, _FaceGallery, _encode_ticket_cursor, _ticket_cursor_query,
+    _histogram_percentile, _backlog_age_buckets, _IoUTracker,
+    _tile_starts, _merge_tile_detections, _SttAudio, _get_stt_engine
 )
 from datetime import datetime
 import math
@@ -247,6 +254,759 @@ def test_clean_nan_values():
     print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
     return failed == 0
 
+def test_decode_vehicle_output():
+    """Test YOLO post-processing (vehicle class filter, class-aware NMS, letterbox un-mapping)"""
+    print(f"\n{Colors.YELLOW}[7] Testing _decode_vehicle_output function{Colors.RESET}")
+    import numpy as np
+    passed = 0
+    failed = 0
+
+    # YOLOv8 raw layout (1, 84, N): [cx, cy, w, h] + 80 class scores
+    raw = np.zeros((1, 84, 5), dtype=np.float32)
+    raw[0, :4, 0] = [100, 100, 40, 40]; raw[0, 4 + 2, 0] = 0.9   # car
+    raw[0, :4, 1] = [102, 101, 40, 40]; raw[0, 4 + 2, 1] = 0.8   # car, overlaps #0 -> suppressed
+    raw[0, :4, 2] = [102, 101, 40, 40]; raw[0, 4 + 7, 2] = 0.7   # truck, same box -> kept (class-aware)
+    raw[0, :4, 3] = [300, 300, 40, 40]; raw[0, 4 + 0, 3] = 0.95  # person -> not a vehicle
+    raw[0, :4, 4] = [400, 400, 40, 40]; raw[0, 4 + 5, 4] = 0.2   # bus below threshold
+    prenms = np.array([[[20, 20, 60, 60, 0.9, 3], [0, 0, 10, 10, 0.9, 0]]], dtype=np.float32)
+    # image 0: 10 separate high-scoring cars; image 1: one weaker car
+    busy = np.zeros((2, 84, 10), dtype=np.float32)
+    busy[0, 0] = np.arange(10) * 50 + 20; busy[0, 1:4] = [[20], [20], [20]]; busy[0, 4 + 2] = 0.9
+    busy[1, :4, 0] = [20, 20, 20, 20]; busy[1, 4 + 2, 0] = 0.5
+
+    def per_image_budget():
+        previous = os.environ.get("VEHICLE_DETECTOR_MAX_CANDIDATES")
+        os.environ["VEHICLE_DETECTOR_MAX_CANDIDATES"] = "3"
+        try:
+            dets = _decode_vehicle_outputs_batch(busy, 0.35, 0.45, [1.0, 1.0], [(0, 0), (0, 0)])
+        finally:
+            if previous is None:
+                os.environ.pop("VEHICLE_DETECTOR_MAX_CANDIDATES")
+            else:
+                os.environ["VEHICLE_DETECTOR_MAX_CANDIDATES"] = previous
+        # the busy image is capped at 3 and the weaker car in image 1 still survives
+        assert len(dets[0]) == 3, dets[0]
+        return dets[1]
+
+    test_cases = [
+        ("raw output", lambda: _decode_vehicle_output(raw, 0.35, 0.45, 640, 2.0, (10, 0)),
+         [(35.0, 40.0, 20.0, 20.0, 0.9, 2), (36.0, 40.5, 20.0, 20.0, 0.7, 7)]),
+        ("pre-NMS'd output", lambda: _decode_vehicle_output(prenms, 0.35, 0.45, 640, 2.0, (0, 0)),
+         [(10.0, 10.0, 20.0, 20.0, 0.9, 3)]),
+        ("batched output", lambda: _decode_vehicle_outputs_batch(np.concatenate([raw, np.zeros_like(raw)]), 0.35, 0.45, [1.0, 1.0], [(0, 0), (0, 0)])[1],
+         []),
+        ("candidate budget is per image", per_image_budget,
+         [(10.0, 10.0, 20.0, 20.0, 0.5, 2)]),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if len(result) == len(expected) and all(
+                r[5] == e[5] and np.allclose(r[:5], e[:5], atol=1e-4) for r, e in zip(result, expected)
+            ):
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_verhoeff_check_many():
+    """Test vectorized Verhoeff validation against the scalar _verhoeff_check"""
+    print(f"\n{Colors.YELLOW}[8] Testing _verhoeff_check_many function{Colors.RESET}")
+    passed = 0
+    failed = 0
+
+    test_cases = [
+        "234567890124",          # valid Aadhaar-style number
+        "234567890123",          # wrong check digit
+        "2345 6789 0124",        # spaces are ignored
+        "0",                     # single digit (valid)
+        "",                      # empty
+        "12a4",                  # non-digit
+        "1234567890123456",      # 16 digits (VID length)
+        "0" * 40,                # longer than a typical width
+    ]
+    expected = [_verhoeff_check(n.replace(" ", "")) for n in test_cases]
+
+    try:
+        result = _verhoeff_check_many([n.encode() for n in test_cases]).tolist()
+        for num, got, exp in zip(test_cases, result, expected):
+            if got == exp:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _verhoeff_check_many('{num}') = {got}, expected {exp}")
+                failed += 1
+    except Exception as e:
+        print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _verhoeff_check_many raised {e}")
+        failed = len(test_cases)
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_sentiment_score():
+    """Test the compiled sentiment lexicon matcher"""
+    print(f"\n{Colors.YELLOW}[9] Testing _sentiment_score function{Colors.RESET}")
+    passed = 0
+    failed = 0
+
+    test_cases = [
+        ("", 0.0),
+        (None, 0.0),
+        ("Vehicle transfer request", 0.0),
+        ("FINANCE PROBLEM - AP16BZ3423", -0.2),
+        ("Payment failed", -0.4),                # "failed" also counts "fail"
+        ("Portal not working", 0.0),             # "not working" (-1) + "working" (+1)
+        ("Issue resolved, thank you", 0.2),      # -1 issue, +1 resolved, +1 thank you
+        ("problemergency", -0.4),                # overlapping phrases are both counted
+        ("urgent critical error issue problem delay stuck", -1.0),  # clamped
+    ]
+
+    for text, expected in test_cases:
+        try:
+            result = _sentiment_score(text)
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _sentiment_score({text!r}) = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _sentiment_score({text!r}) raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_route_chat_message():
+    """Test chatbot intent routing and registration/DL number extraction"""
+    print(f"\n{Colors.YELLOW}[10] Testing _route_chat_message function{Colors.RESET}")
+    passed = 0
+    failed = 0
+
+    test_cases = [
+        ("How do I handle this?", "general_query", {}),      # "dl" inside a word is not a DL query
+        ("DL renewal", "driving_license", {}),
+        ("My DL MH14 20110062821 is pending", "driving_license", {"dl_numbers": ["MH1420110062821"]}),
+        ("RC status AP 16 BZ 3423", "vehicle_registration", {"registration_numbers": ["AP16BZ3423"]}),
+        ("DL3CAB1234", "vehicle_registration", {"registration_numbers": ["DL3CAB1234"]}),
+        ("22BH1234AB", "vehicle_registration", {"registration_numbers": ["22BH1234AB"]}),
+        ("Pay my challan", "challan", {}),
+        ("Complaint about the RTO office", "grievance", {}),
+        ("Where is the nearest RTO?", "rto_locator", {}),
+    ]
+
+    for message, exp_intent, exp_entities in test_cases:
+        try:
+            intent, entities = _route_chat_message(message)
+            if intent == exp_intent and entities == exp_entities:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _route_chat_message({message!r}) = {(intent, entities)}, expected {(exp_intent, exp_entities)}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _route_chat_message({message!r}) raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_ticket_search_match():
+    """Test that search queries produce the same identifier tokens stored on tickets"""
+    print(f"\n{Colors.YELLOW}[11] Testing _ticket_search_match function{Colors.RESET}")
+    passed = 0
+    failed = 0
+
+    stored = _ticket_search_tokens("RC not updated for AP16BZ3423")
+    test_cases = [
+        ("AP 16 BZ 3423", {"$and": [{"search_tokens": {"$regex": "^AP16BZ3423"}}]}),
+        ("ap-16-bz-3423", {"$and": [{"search_tokens": {"$regex": "^AP16BZ3423"}}]}),
+        ("AP16BZ3423", {"$and": [{"search_tokens": {"$regex": "^AP16BZ3423"}}]}),
+        ("RC AP 16 BZ 3423 pending", {
+            "$text": {"$search": "RC PENDING"},
+            "$and": [{"search_tokens": {"$regex": "^AP16BZ3423"}}],
+        }),
+        ("AP16", {"$and": [{"search_tokens": {"$regex": "^AP16"}}]}),
+        ("payment failed", {"$text": {"$search": "PAYMENT FAILED"}}),
+    ]
+
+    for query, expected in test_cases:
+        try:
+            result = _ticket_search_match(query)
+            prefixes = [c["search_tokens"]["$regex"][1:] for c in result.get("$and", [])]
+            if result == expected and all(any(t.startswith(p) for t in stored) for p in prefixes):
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _ticket_search_match({query!r}) = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: _ticket_search_match({query!r}) raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_extract_aadhaar_fields():
+    """Test single-pass Aadhaar OCR parsing against sample front/back text"""
+    print(f"\n{Colors.YELLOW}[12] Testing _extract_aadhaar_fields function{Colors.RESET}")
+    passed = 0
+    failed = 0
+
+    front = (
+        "भारत सरकार\nGOVERNMENT OF INDIA\nRahul Kumar Sharma\nDOB: 15/08/1990\n"
+        "FEMALE / MALE\n2345 6789 0124\n"
+    )
+    back = (
+        "Unique Identification Authority of India\nAddress:\nS/O Ram Sharma, House No 12,\n"
+        "Sector 5, Dwarka,\nNew Delhi, Delhi - 110075\nVID : 9123 4567 8901 2345\n"
+        "1947 help@uidai.gov.in www.uidai.gov.in\n2345 6789 0124"
+    )
+    empty = {k: None for k in ("aadhaar_number", "vid", "name", "dob", "gender", "address", "pin_code")}
+    test_cases = [
+        ("front side", front, {
+            **empty, "aadhaar_number": "234567890124", "name": "Rahul Kumar Sharma",
+            "dob": "1990-08-15", "gender": "Male",  # Male wins when both tokens are present
+        }),
+        ("back side", back, {
+            **empty, "aadhaar_number": "234567890124", "vid": "9123456789012345",
+            "address": "S/O Ram Sharma, House No 12,\nSector 5, Dwarka,\nNew Delhi, Delhi - 110075",
+            "pin_code": "110075",
+        }),
+        # Address without a PIN ends at the earliest trailing marker (here the VID, before the footer)
+        ("address stops at first marker", "Address: 12 MG Road, Pune\nVID: 9123 4567 8901 2345\nUIDAI", {
+            **empty, "vid": "9123456789012345", "address": "12 MG Road, Pune",
+        }),
+        ("hindi gender, dashed DOB", "Sita Devi\nDOB - 01-02-1985\nमहिला", {
+            **empty, "name": "Sita Devi", "dob": "1985-02-01", "gender": "Female",
+        }),
+        # Year-only cards carry no DOB label: no dob and no name anchor (same as the old extractors)
+        ("year of birth only", "Amit Verma\nYear of Birth : 1985\nMale", {**empty, "gender": "Male"}),
+        ("invalid checksum number still returned", "1234 5678 9012", {**empty, "aadhaar_number": "123456789012"}),
+        ("empty text", "", empty),
+    ]
+
+    for name, text, expected in test_cases:
+        try:
+            result = _aadhaar_field_values(_extract_aadhaar_fields(text))
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_memory_chat_session_store():
+    """Test in-process chat history: message trimming, pagination, LRU eviction and TTL expiry"""
+    print(f"\n{Colors.YELLOW}[13] Testing _MemoryChatSessionStore{Colors.RESET}")
+    import asyncio
+    import time
+    passed = 0
+    failed = 0
+
+    def msgs(*ids):
+        return [{"role": "user", "content": str(i)} for i in ids]
+
+    async def trimming():
+        store = _MemoryChatSessionStore(max_sessions=10, max_messages=3, ttl_seconds=60)
+        await store.append("a", msgs(1, 2))
+        await store.append("a", msgs(3, 4))
+        return await store.history("a")
+
+    async def pagination():
+        store = _MemoryChatSessionStore(max_sessions=10, max_messages=10, ttl_seconds=60)
+        await store.append("a", msgs(1, 2, 3, 4, 5))
+        return await store.history("a", skip=1, limit=2)
+
+    async def lru_eviction():
+        store = _MemoryChatSessionStore(max_sessions=2, max_messages=10, ttl_seconds=60)
+        await store.append("a", msgs(1))
+        await store.append("b", msgs(2))
+        await store.append("a", msgs(3))  # touching "a" makes "b" the least recently used
+        await store.append("c", msgs(4))
+        return [(await store.history(sid))[1] for sid in ("a", "b", "c")]
+
+    async def ttl_expiry():
+        store = _MemoryChatSessionStore(max_sessions=10, max_messages=10, ttl_seconds=0.05)
+        await store.append("a", msgs(1))
+        time.sleep(0.1)
+        expired = await store.history("a")
+        await store.append("a", msgs(2))  # an expired session starts over
+        return expired, await store.history("a")
+
+    test_cases = [
+        ("history trimmed to max_messages", trimming, (msgs(2, 3, 4), 3)),
+        ("skip/limit pagination", pagination, (msgs(2, 3), 5)),
+        ("least recently used session evicted", lru_eviction, [2, 0, 1]),
+        ("sessions expire after ttl", ttl_expiry, (([], 0), (msgs(2), 1))),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = asyncio.run(fn())
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_model_pool():
+    """Test model pool checkout/return, lazy growth, exhaustion and failed builds"""
+    print(f"\n{Colors.YELLOW}[14] Testing _ModelPool{Colors.RESET}")
+    from fastapi import HTTPException
+    passed = 0
+    failed = 0
+
+    def counting_factory():
+        counting_factory.n += 1
+        return counting_factory.n
+
+    def reuse():
+        counting_factory.n = 0
+        pool = _ModelPool("Test", counting_factory, size=2)
+        with pool.checkout() as first:
+            pass
+        with pool.checkout() as second:  # returned instance is reused, not rebuilt
+            pass
+        return first, second, pool.stats()
+
+    def grows_to_size():
+        counting_factory.n = 0
+        pool = _ModelPool("Test", counting_factory, size=2)
+        with pool.checkout() as a, pool.checkout() as b:
+            busy = pool.stats()
+        return sorted([a, b]), busy, pool.stats()
+
+    def exhausted():
+        counting_factory.n = 0
+        pool = _ModelPool("Test", counting_factory, size=1)
+        with pool.checkout():
+            try:
+                with pool.checkout(timeout=0.05):
+                    return "checked out"
+            except HTTPException as e:
+                return e.status_code
+
+    def failed_build_frees_slot():
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("model file missing")
+            return "ok"
+
+        pool = _ModelPool("Test", flaky, size=1)
+        try:
+            with pool.checkout():
+                pass
+        except RuntimeError:
+            pass
+        with pool.checkout(timeout=0.05) as inst:
+            return inst, pool.stats()["created"]
+
+    test_cases = [
+        ("instances are returned and reused", reuse, (1, 1, {"size": 2, "created": 1, "idle": 1})),
+        ("pool grows lazily up to size", grows_to_size,
+         ([1, 2], {"size": 2, "created": 2, "idle": 0}, {"size": 2, "created": 2, "idle": 2})),
+        ("exhausted pool returns 503 after timeout", exhausted, 503),
+        ("failed build releases its slot", failed_build_frees_slot, ("ok", 1)),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_face_gallery():
+    """Test 1:N gallery rows (add, search, swap-delete compaction) and snapshot fingerprint checks"""
+    print(f"\n{Colors.YELLOW}[15] Testing _FaceGallery{Colors.RESET}")
+    import tempfile
+    from pathlib import Path
+    import numpy as np
+    passed = 0
+    failed = 0
+
+    def unit(i):
+        v = np.zeros(_FaceGallery.DIM, dtype=np.float32)
+        v[i] = 1.0
+        return v
+
+    def add_search_remove():
+        gallery = _FaceGallery(Path(tempfile.mkdtemp()))
+        for i, cid in enumerate(["a", "b", "c"]):
+            gallery.upsert(cid, unit(i))
+        gallery.upsert("b", unit(3))  # replace in place: same row, new feature
+        top = gallery.search(unit(3), top_k=1)
+        removed = gallery.remove("a")  # last row ("c") moves into row 0
+        compacted = (gallery.size, gallery._ids, gallery._index, gallery.search(unit(2), top_k=1))
+        return top, removed, gallery.remove("missing"), compacted
+
+    def snapshot_fingerprint():
+        snap_dir = Path(tempfile.mkdtemp())
+        gallery = _FaceGallery(snap_dir)
+        gallery.upsert("a", unit(0))
+        gallery.upsert("b", unit(1))
+        written = {"count": 2, "latest": "2026-01-02T00:00:00+00:00"}
+        gallery.write_snapshot(written)
+        # same count, newer enrolment (a face was replaced): snapshot must be rejected
+        stale = _FaceGallery(snap_dir).load_snapshot({"count": 2, "latest": "2026-02-01T00:00:00+00:00"})
+        fresh = _FaceGallery(snap_dir)
+        current = fresh.load_snapshot(written)
+        return stale, current, fresh._ids, fresh.search(unit(1), top_k=1)
+
+    test_cases = [
+        ("add, search, remove compacts rows", add_search_remove,
+         ([("b", 1.0)], True, False, (2, ["c", "b"], {"c": 0, "b": 1}, [("c", 1.0)]))),
+        ("snapshot with a different fingerprint is rejected", snapshot_fingerprint,
+         (False, True, ["a", "b"], [("b", 1.0)])),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_ticket_cursor():
+    """Test keyset cursor round trip and that tied Created values page without overlap or gaps"""
+    print(f"\n{Colors.YELLOW}[16] Testing ticket keyset cursor{Colors.RESET}")
+    from bson import ObjectId
+    from fastapi import HTTPException
+    passed = 0
+    failed = 0
+
+    def matches(doc, query):
+        # Minimal evaluator for the filters `_ticket_cursor_query` builds
+        if "$or" in query:
+            return any(matches(doc, q) for q in query["$or"])
+        for field, cond in query.items():
+            value = doc.get(field)
+            if isinstance(cond, dict):
+                if value is None or not value < cond["$lt"]:
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    def sort_key(doc):
+        # (Created desc, _id desc) with missing Created last, as Mongo sorts nulls in a descending sort
+        return (doc["Created"] is not None, doc["Created"] or "", doc["_id"])
+
+    ids = [ObjectId() for _ in range(8)]
+    created = ["2025-03-01", "2025-03-01", "2025-03-01", "2025-02-01", "2025-02-01", None, None, "2025-04-01"]
+    rows = sorted(({"_id": i, "Created": c} for i, c in zip(ids, created)), key=sort_key, reverse=True)
+
+    def round_trip():
+        query = _ticket_cursor_query(_encode_ticket_cursor(rows[1]))
+        return query["$or"][1]
+
+    def paginate():
+        pages, query = [], {}
+        while True:
+            page = sorted((d for d in rows if matches(d, query)), key=sort_key, reverse=True)[:2]
+            if not page:
+                return pages
+            pages.append(page)
+            query = _ticket_cursor_query(_encode_ticket_cursor(page[-1]))
+
+    def invalid_cursor():
+        try:
+            _ticket_cursor_query("not-a-cursor")
+        except HTTPException as e:
+            return e.status_code
+
+    test_cases = [
+        ("cursor round trip", round_trip, {"Created": rows[1]["Created"], "_id": {"$lt": rows[1]["_id"]}}),
+        ("tied pages neither overlap nor skip", lambda: [d for page in paginate() for d in page], rows),
+        ("page sizes", lambda: [len(p) for p in paginate()], [2, 2, 2, 2]),
+        ("invalid cursor is a 400", invalid_cursor, 400),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_ticket_kpi_helpers():
+    """Test resolution-time percentiles from the day histogram and backlog age buckets"""
+    print(f"\n{Colors.YELLOW}[17] Testing _histogram_percentile / _backlog_age_buckets{Colors.RESET}")
+    from datetime import timedelta
+    passed = 0
+    failed = 0
+
+    hist = {"10": 2, "0": 5, "2": 3}  # keys are day counts; must be ordered numerically, not as strings
+    today = datetime(2026, 3, 31)
+
+    def aged(*ages):
+        return {(today - timedelta(days=a)).strftime("%Y-%m-%d"): 1 for a in ages}
+
+    empty_buckets = {"0-7d": 0, "8-30d": 0, "31-90d": 0, "91-180d": 0, "180d+": 0}
+    test_cases = [
+        ("p50", lambda: _histogram_percentile(hist, 10, 0.5), 0.0),
+        ("p80 falls in the middle bin", lambda: _histogram_percentile(hist, 10, 0.8), 2.0),
+        ("p90", lambda: _histogram_percentile(hist, 10, 0.9), 10.0),
+        ("empty histogram", lambda: _histogram_percentile({}, 0, 0.9), 0.0),
+        ("total beyond histogram caps at 365", lambda: _histogram_percentile({"1": 1}, 5, 0.95), 365.0),
+        ("bucket boundaries", lambda: _backlog_age_buckets(aged(0, 7, 8, 30, 31, 90, 91, 180, 181), today),
+         {"0-7d": 2, "8-30d": 2, "31-90d": 2, "91-180d": 2, "180d+": 1}),
+        ("counts are summed per day", lambda: _backlog_age_buckets({"2026-03-30": 4, "2025-01-01": 3}, today),
+         {**empty_buckets, "0-7d": 4, "180d+": 3}),
+        ("unparseable days are skipped", lambda: _backlog_age_buckets({"unknown": 2}, today), empty_buckets),
+        ("no open tickets", lambda: _backlog_age_buckets({}, today), empty_buckets),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_iou_tracker():
+    """Test that _IoUTracker keeps track ids across frames and only matches within a class"""
+    print(f"\n{Colors.YELLOW}[18] Testing _IoUTracker{Colors.RESET}")
+    passed = 0
+    failed = 0
+
+    def box(x, y, vehicle_class="car", w=100, h=60):
+        return {
+            "vehicle_class": vehicle_class, "coco_class": vehicle_class, "confidence": 0.9,
+            "bounding_box": {"x": x, "y": y, "width": w, "height": h},
+        }
+
+    def run(frames, predict_between=0, **kwargs):
+        tracker = _IoUTracker(**kwargs)
+        ids = []
+        for boxes in frames:
+            if predict_between:
+                tracker.predict(predict_between)
+            tracker.update(boxes)
+            ids.append(sorted(t["track_id"] for t in tracker.snapshot()))
+        return ids, dict(tracker.counts)
+
+    def predicted_x():
+        tracker = _IoUTracker()
+        tracker.update([box(10, 20)])
+        tracker.predict(5)
+        tracker.update([box(30, 20)])  # 20 px over 5 frames -> 4 px/frame
+        tracker.predict(5)
+        return tracker.snapshot()[0]["bounding_box"]["x"]
+
+    moving_car = [[box(10 + 8 * i, 20)] for i in range(4)]
+    two_lanes = [[box(10 + 8 * i, 20), box(400 - 8 * i, 300, "truck")] for i in range(3)]
+    test_cases = [
+        ("moving car keeps its id", lambda: run(moving_car), ([[1], [1], [1], [1]], {"car": 1})),
+        ("sparse detections with prediction keep the id",
+         lambda: run([[box(10 + 40 * i, 20)] for i in range(4)], predict_between=5),
+         ([[1], [1], [1], [1]], {"car": 1})),
+        ("predict advances by per-frame velocity", predicted_x, 50),
+        ("two objects keep separate ids", lambda: run(two_lanes), ([[1, 2]] * 3, {"car": 1, "truck": 1})),
+        ("overlapping box of another class starts a new track",
+         lambda: run([[box(10, 20)], [box(12, 20, "bus")]]), ([[1], [1, 2]], {"car": 1, "bus": 1})),
+        ("disjoint box is a new vehicle", lambda: run([[box(10, 20)], [box(500, 20)]]),
+         ([[1], [1, 2]], {"car": 2})),
+        ("track dropped after max_missed empty rounds",
+         lambda: run([[box(10, 20)], [], [], [box(10, 20)]], max_missed=1), ([[1], [1], [], [2]], {"car": 2})),
+        ("min_hits delays counting", lambda: run(moving_car[:1], min_hits=2), ([[1]], {})),
+        ("min_hits counts once confirmed", lambda: run(moving_car, min_hits=2), ([[1]] * 4, {"car": 1})),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_tile_merge():
+    """Test tile origins and de-duplication of detections seen by overlapping tiles"""
+    print(f"\n{Colors.YELLOW}[19] Testing _tile_starts / _merge_tile_detections{Colors.RESET}")
+    passed = 0
+    failed = 0
+
+    def boxes(merged):
+        return [(round(x), round(y), round(w), round(h), cls_id) for x, y, w, h, _score, cls_id in merged]
+
+    # Full frame plus two 640 px tiles overlapping on x = 560..640. A car straddling the seam is
+    # detected by the full-frame pass and by both tiles (each in its own crop coordinates).
+    offsets = [(0, 0), (0, 0), (560, 0)]
+    seam = [
+        [(590, 100, 80, 40, 0.70, 2)],
+        [(592, 101, 78, 40, 0.80, 2)],
+        [(29, 99, 82, 41, 0.90, 2)],
+    ]
+    truck_under_car = [[], [(592, 101, 78, 40, 0.80, 2)], [(30, 100, 80, 40, 0.60, 7)]]
+    test_cases = [
+        ("single tile for small side", lambda: _tile_starts(500, 640, 0.2), [0]),
+        ("tiles cover the full side with overlap", lambda: _tile_starts(1200, 640, 0.2), [0, 280, 560]),
+        ("seam duplicates collapse to the best box", lambda: boxes(_merge_tile_detections(offsets, seam, 0.45)),
+         [(589, 99, 82, 41, 2)]),
+        ("overlapping boxes of different classes both kept",
+         lambda: boxes(_merge_tile_detections(offsets, truck_under_car, 0.45)),
+         [(592, 101, 78, 40, 2), (590, 100, 80, 40, 7)]),
+        ("separate vehicles in different tiles both kept",
+         lambda: boxes(_merge_tile_detections(offsets, [[], [(10, 10, 50, 30, 0.9, 2)], [(10, 10, 50, 30, 0.8, 2)]], 0.45)),
+         [(10, 10, 50, 30, 2), (570, 10, 50, 30, 2)]),
+        ("no detections", lambda: _merge_tile_detections(offsets, [[], [], []], 0.45), []),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
+def test_stt_audio():
+    """Test WAV / raw PCM / compressed container parsing in _SttAudio and STT engine selection"""
+    print(f"\n{Colors.YELLOW}[20] Testing _SttAudio / _get_stt_engine{Colors.RESET}")
+    import io
+    import wave
+    import struct
+    import server
+    from fastapi import HTTPException
+    passed = 0
+    failed = 0
+
+    def make_wav(samples, rate, channels, width=2):
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(width)
+            wav.setframerate(rate)
+            fmt = "<%dh" % len(samples) if width == 2 else "<%db" % len(samples)
+            wav.writeframes(struct.pack(fmt, *samples))
+        return buf.getvalue()
+
+    def parsed(data):
+        audio = _SttAudio(data)
+        frames = len(audio.pcm) // 2 if audio.pcm is not None else None
+        return audio.encoding, audio.sample_rate, frames, round(audio.duration, 3)
+
+    def status_of(fn):
+        try:
+            fn()
+        except HTTPException as e:
+            return e.status_code
+        return None
+
+    def engine_for(name, cached=None):
+        previous_engine, previous_env = server._stt_engine, os.environ.get("STT_ENGINE")
+        server._stt_engine = cached
+        os.environ["STT_ENGINE"] = name
+        try:
+            return status_of(_get_stt_engine) if cached is None else _get_stt_engine() is cached
+        finally:
+            server._stt_engine = previous_engine
+            if previous_env is None:
+                os.environ.pop("STT_ENGINE", None)
+            else:
+                os.environ["STT_ENGINE"] = previous_env
+
+    mono_8k = make_wav([100, -100] * 400, 8000, 1)                # 800 frames
+    stereo_22k = make_wav([1000, 3000, -1000, -3000] * 2205, 22050, 2)  # 4410 frames
+    opus_head = b"OggS" + b"\x00" * 24 + b"OpusHead" + bytes([1, 1, 0, 0]) + (16000).to_bytes(4, "little")
+    test_cases = [
+        ("mono WAV rate / frames / duration", lambda: parsed(mono_8k), ("linear16", 8000, 800, 0.1)),
+        ("stereo WAV downmixed to mono", lambda: parsed(stereo_22k), ("linear16", 22050, 4410, 0.2)),
+        ("stereo downmix averages channels",
+         lambda: list(struct.unpack("<4h", _SttAudio(stereo_22k).pcm[:8])), [2000, -2000, 2000, -2000]),
+        ("WAV header stripped for engines", lambda: _SttAudio(mono_8k).data == _SttAudio(mono_8k).pcm, True),
+        ("8-bit WAV rejected", lambda: status_of(lambda: _SttAudio(make_wav([1, 2], 8000, 1, width=1))), 415),
+        ("truncated WAV rejected", lambda: status_of(lambda: _SttAudio(mono_8k[:30])), 415),
+        ("raw PCM defaults to 16 kHz", lambda: parsed(b"\x00\x01" * 1600), ("linear16", 16000, 1600, 0.1)),
+        ("Ogg Opus rate from OpusHead", lambda: parsed(opus_head), ("ogg_opus", 16000, None, 0.0)),
+        ("Opus without OpusHead defaults to 48 kHz", lambda: parsed(b"\x1a\x45\xdf\xa3" + b"\x00" * 32),
+         ("webm_opus", 48000, None, 0.0)),
+        ("MP3 rate from frame header", lambda: parsed(b"\xff\xfb\x94\x00" + b"\x00" * 32), ("mp3", 48000, None, 0.0)),
+        ("FLAC rate left to the engine", lambda: parsed(b"fLaC" + b"\x00" * 32), ("flac", None, None, 0.0)),
+        ("unknown STT_ENGINE is 503", lambda: engine_for("whisper"), 503),
+        ("configured engine is created once", lambda: engine_for("vosk", cached=object()), True),
+    ]
+
+    for name, fn, expected in test_cases:
+        try:
+            result = fn()
+            if result == expected:
+                passed += 1
+            else:
+                print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} = {result}, expected {expected}")
+                failed += 1
+        except Exception as e:
+            print(f"  {Colors.RED}✗ FAIL{Colors.RESET}: {name} raised {e}")
+            failed += 1
+
+    print(f"  {Colors.GREEN}✓ PASS{Colors.RESET}: {passed}/{len(test_cases)} tests passed")
+    return failed == 0
+
 def run_all_unit_tests():
     """Run all unit tests"""
     print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")
@@ -260,6 +1020,20 @@ def run_all_unit_tests():
     results.append(("_pct", test_pct()))
     results.append(("_get_field_value", test_get_field_value()))
     results.append(("clean_nan_values", test_clean_nan_values()))
+    results.append(("_decode_vehicle_output", test_decode_vehicle_output()))
+    results.append(("_verhoeff_check_many", test_verhoeff_check_many()))
+    results.append(("_sentiment_score", test_sentiment_score()))
+    results.append(("_route_chat_message", test_route_chat_message()))
+    results.append(("_ticket_search_match", test_ticket_search_match()))
+    results.append(("_extract_aadhaar_fields", test_extract_aadhaar_fields()))
+    results.append(("_MemoryChatSessionStore", test_memory_chat_session_store()))
+    results.append(("_ModelPool", test_model_pool()))
+    results.append(("_FaceGallery", test_face_gallery()))
+    results.append(("ticket keyset cursor", test_ticket_cursor()))
+    results.append(("ticket KPI helpers", test_ticket_kpi_helpers()))
+    results.append(("_IoUTracker", test_iou_tracker()))
+    results.append(("tile merge", test_tile_merge()))
+    results.append(("_SttAudio", test_stt_audio()))
     
     # Summary
     print(f"\n{Colors.BLUE}{'='*60}{Colors.RESET}")